@@ -1,16 +1,84 @@
-import pyautogui
 import string
 import time
 import os
 import sys
 import json
-from pynput import mouse
-import keyboard
+import re
+import importlib
+import importlib.util
 import itertools
-import pyperclip # Import pyperclip for safer special character handling
+import argparse
+import struct
+import mmap
+import bisect
+import io
+import threading
+import queue
+import collections
+import statistics
+import math
+import platform
+import contextlib
+import signal
+import gzip
+import bz2
+import lzma
+from array import array
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access (reading or setting).
+    The GUI and input libraries are slow to import, probe the display server and fail without a
+    display, so they are loaded only by the code paths that send input, listen for clicks or use
+    the clipboard; file operations (progress, lists, sharding, benchmarks) never import them.
+    """
+    def __init__(self, module_name, purpose):
+        object.__setattr__(self, '_module_name', module_name)
+        object.__setattr__(self, '_purpose', purpose)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self):
+        module = object.__getattribute__(self, '_module')
+        if module is None:
+            module_name = object.__getattribute__(self, '_module_name')
+            import_start = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+            except Exception as e: # pyautogui and pynput raise all kinds of errors when no display is available
+                raise ImportError(f"Could not load '{module_name}', which is needed for {object.__getattribute__(self, '_purpose')}: {e}. "
+                                  "Install the requirements and make sure a display is available.") from e
+            object.__setattr__(self, '_module', module)
+            debug_print(f"Imported '{module_name}' on first use in {(time.perf_counter() - import_start) * 1000:.1f} ms.")
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def is_loaded(self):
+        """True once the real module has been imported."""
+        return object.__getattribute__(self, '_module') is not None
+
+def lazy_optional_module(module_name, purpose):
+    """A LazyModule for an optional dependency if it is installed (checked without importing it), else None."""
+    return LazyModule(module_name, purpose) if importlib.util.find_spec(module_name) is not None else None
+
+# GUI and input libraries: imported on first use (see LazyModule)
+pyautogui = LazyModule('pyautogui', "typing, clicking and the fail-safe")
+mouse = LazyModule('pynput.mouse', "recording mouse clicks")
+keyboard = LazyModule('keyboard', "the stop hotkey and recording key presses")
+pyperclip = LazyModule('pyperclip', "clipboard typing methods") # Used for safer special character handling
+np = lazy_optional_module('numpy', "the batch (block) combination generator") # Optional
+zstandard = lazy_optional_module('zstandard', ".zst compressed custom lists") # Optional
+yaml = lazy_optional_module('yaml', "YAML job files") # Optional (PyYAML)
 
 # --- Global Flags and Data ---
-STOP_SCRIPT = False # Flag to signal the main loop to stop
+# Set by the stop hotkey (or an error/fail-safe) to stop a run. Waits use STOP_EVENT.wait(timeout), so a stop
+# interrupts delays immediately instead of being noticed only after they end.
+STOP_EVENT = threading.Event()
+stop_requested_by_user = False # True if STOP_EVENT was set by the stop hotkey or a signal (not by an error)
 current_coord_capture_index = 0 # Helper for the setup phase
 mouse_listener_active = False # Flag to control pynput listener
 
@@ -18,13 +86,37 @@ mouse_listener_active = False # Flag to control pynput listener
 num_macro_clicks_for_setup = 0 # Renamed for clarity to avoid conflict with future 'macro_click_data' parsing
 num_ignored_clicks_setup = 0
 
+# Shard of the combination keyspace this process works on, as (shard_number, shard_count).
+# None means the whole keyspace. Set from the --shard command line option.
+ACTIVE_SHARD = None
+
 # --- DEBUG MODE (Controlled by settings) ---
 DEBUG_MODE = False # This will be updated by load_settings based on user's saved preference
 
 # --- Performance-related Constants ---
-# Save progress only every N iterations to reduce disk I/O.
+# Default for 'checkpoint_every_items': save progress only every N iterations to reduce disk I/O.
 # Adjust this value based on how frequently you want to save progress vs. performance.
 PROGRESS_SAVE_INTERVAL = 100 
+# Checkpoints appended to the progress journal before it is compacted into the progress file.
+JOURNAL_COMPACT_INTERVAL = 50
+# Pacing waits sleep until this close to a deadline, then spin for sub-millisecond accuracy.
+PACING_SPIN_THRESHOLD = 0.002
+# Adaptive delay: per-entry emission times kept for the rolling baseline, and the lag slack on top of it.
+ADAPTIVE_DELAY_WINDOW = 200
+ADAPTIVE_DELAY_LAG_SLACK = 0.002
+# Run planner: warn when a run is projected to take longer than this (one year), and size shards to finish within a week.
+PLAN_WARNING_SECONDS = 365 * 86400
+PLAN_SHARD_TARGET_SECONDS = 7 * 86400
+# Actions of the current run kept in memory by the 'recording' backend when it has no log file (oldest dropped first).
+RECORDING_BACKEND_MAX_EVENTS = 1000000
+# Run metrics: histogram buckets per power of two (8 keeps percentiles within ~6% of the true value).
+LATENCY_HISTOGRAM_SUB_BUCKETS = 8
+# Number of combinations produced per block by the NumPy batch generator.
+COMBINATION_BLOCK_SIZE = 65536
+# The combination generator checks for a stop request once per this many combinations walked.
+GENERATOR_STOP_CHECK_INTERVAL = 4096
+# Benchmark suite: format version of the JSON results (bump when benchmarks change meaning).
+BENCHMARK_RESULTS_VERSION = 1
 
 def clear_terminal():
     """Clears the terminal screen."""
@@ -75,6 +167,7 @@ DEFAULT_SETTINGS = {
         'hotkey_failsafe_menu': "--- Hotkey & Fail-Safe Settings ---", # New: For hotkey/failsafe
         'typing_options_menu': "--- Typing Options ---", # New: For typing method
         'combo_gen_settings_menu': "--- Combination Generator Settings ---", # New: For combo gen
+        'macro_recorder_menu': "--- Macro Recorder ---", # NEW: Record and replay full macros
         # 'macro_click_settings_menu': "--- Macro Click Settings ---", # REMOVED: Macro clicks configured dynamically
     },
     'menu_options': { # New: Customizable menu options
@@ -83,7 +176,7 @@ DEFAULT_SETTINGS = {
         'main_menu_2': "2. Run Combination Generator WITHOUT Macro Clicks",
         'main_menu_3': "3. Access Settings",
         'main_menu_4': "4. Reset Combination Progress (starts from 'a')",
-        'main_menu_5': "5. Process Text File (types content from a .txt file)",
+        'main_menu_5': "5. Process Text File (types content from a .txt file, or a compressed .gz/.bz2/.xz/.zst one)",
         'main_menu_6': "6. Reset Custom List Progress (resets the 'progressforcustomlist.txt' file)",
         'main_menu_7': "7. Run Only Macro Clicks (no typing)",
         'main_menu_8': "8. View Credits",
@@ -98,6 +191,8 @@ DEFAULT_SETTINGS = {
         'settings_menu_8': "8. Combination Generator Options", # New option in settings menu
         # 'settings_menu_9': "9. Macro Click Options", # REMOVED: Macro clicks configured dynamically
         'settings_menu_9': "9. Reset All Settings to Default", # Moved reset option to here
+        'settings_menu_M': "M. Macro Recorder (record and replay moves, drags, scrolls and keys)", # NEW
+        'settings_menu_S': "S. Macro Click Schedule (clicks before/after typed entries)", # NEW
         'settings_menu_B': "B. Back to Main Menu",
         'file_paths_menu_1': "1. Current Settings File Path",
         'file_paths_menu_2': "2. Current Combination Progress File Path",
@@ -107,6 +202,9 @@ DEFAULT_SETTINGS = {
         'intervals_menu_2': "2. Delay Between Macro Clicks",
         'intervals_menu_3': "3. PyAutoGUI Write Interval",
         'intervals_menu_4': "4. Initial Delay Before Automation",
+        'intervals_menu_5': "5. Target Typing Rate",
+        'intervals_menu_6': "6. Toggle Adaptive Delay",
+        'intervals_menu_7': "7. Maximum Adaptive Delay",
         'intervals_menu_B': "B. Back to Settings Menu",
         'customization_menu_1': "1. Toggle 'Press Enter to Continue' Prompts",
         'customization_menu_2': "2. Edit Launch Message",
@@ -122,10 +220,22 @@ DEFAULT_SETTINGS = {
         'hotkey_failsafe_menu_B': "B. Back to Settings Menu",
         'typing_options_menu_1': "1. Change Typing Method",
         'typing_options_menu_2': "2. Change Global PyAutoGUI Pause",
+        'typing_options_menu_3': "3. Change Output Backend",
+        'typing_options_menu_4': "4. Change Producer Queue Depth",
+        'typing_options_menu_5': "5. Change Rate Limits",
         'typing_options_menu_B': "B. Back to Settings Menu",
+        'macro_recorder_menu_1': "1. Record a New Macro",
+        'macro_recorder_menu_2': "2. Replay a Macro",
+        'macro_recorder_menu_3': "3. Change Replay Speed",
+        'macro_recorder_menu_4': "4. Change Move Simplification Tolerance",
+        'macro_recorder_menu_B': "B. Back to Settings Menu",
         'combo_gen_settings_menu_1': "1. Set Minimum Combination Length",
         'combo_gen_settings_menu_2': "2. Set Maximum Combination Length",
         'combo_gen_settings_menu_3': "3. Select Character Set Preset",
+        'combo_gen_settings_menu_4': "4. Set Mask (per-position character sets)",
+        'combo_gen_settings_menu_5': "5. Set Custom Mask Character Sets (?1-?4)",
+        'combo_gen_settings_menu_6': "6. Show Keyspace Size and Projected Duration", # NEW
+        'combo_gen_settings_menu_7': "7. Candidate Filter (skip entries by rules)", # NEW
         'combo_gen_settings_menu_B': "B. Back to Settings Menu",
         # 'macro_click_settings_menu_1': "1. Customize Individual Macro Clicks (Type & Delay)", # REMOVED
         # 'macro_click_settings_menu_2': "2. Set Macro Click Repetitions (for 'Only Macro Clicks' mode)", # REMOVED
@@ -135,7 +245,7 @@ DEFAULT_SETTINGS = {
     'stop_hotkey': 'ctrl+shift+c+v', # Customizable stop hotkey
     'pyautogui_failsafe_enabled': True, # Enable/disable pyautogui failsafe
     'pyautogui_failsafe_corners': ['top_left', 'top_right', 'bottom_left', 'bottom_right'], # Which corners trigger failsafe
-    'typing_method': 'pyperclip_safe', # 'pyautogui_write', 'pyautogui_typewrite', 'pyperclip_safe', 'pyperclip_all'
+    'typing_method': 'pyperclip_safe', # 'pyautogui_write', 'pyautogui_typewrite', 'pyperclip_safe', 'pyperclip_all', 'pyperclip_batch'
     'pyautogui_global_pause': 0.0, # General pause for ALL pyautogui actions
     'min_combination_length': 1, # Minimum length for combination generation
     'max_combination_length': 0, # 0 means no max length (infinite)
@@ -143,7 +253,41 @@ DEFAULT_SETTINGS = {
     # Macro click data structure will change from `click_coords` to `macro_click_data`
     # each item in macro_click_data will be {'x': int, 'y': int, 'click_type': str, 'delay_after': float}
     'macro_click_data': [], # Stores detailed click information
-    'shutdown_on_completion': False # NEW: Toggle for shutting down PC after successful completion
+    # NEW: Per-item macro schedule used by runs WITH macro clicks. Each rule runs the listed clicks (1-based numbers
+    # into macro_click_data, empty = all) 'before' or 'after' every 'every'-th typed entry, e.g.
+    # [{'when': 'before', 'every': 1, 'clicks': [1]}, {'when': 'after', 'every': 500, 'clicks': [2]}].
+    # Empty list: run all clicks once before typing starts (the classic behaviour).
+    'macro_schedule': [],
+    'mask': '', # NEW: Per-position mask like '?u?l?l?l?l?d?d'. Empty means every position uses 'chars'
+    'mask_custom_charsets': {'1': '', '2': '', '3': '', '4': ''}, # NEW: Custom sets for ?1 to ?4 in the mask
+    'shutdown_on_completion': False, # NEW: Toggle for shutting down PC after successful completion
+    'clipboard_batch_size': 10, # NEW: Entries pasted per paste when typing_method is 'pyperclip_batch'
+    'producer_queue_depth': 256, # NEW: Candidates generated ahead of typing on a background thread (0 disables)
+    'output_backend': 'pyautogui', # NEW: 'pyautogui' (real input), 'recording' (logs events, no input) or 'null' (counts only)
+    'recording_backend_log_path': '', # NEW: Optional JSONL file the 'recording' backend appends events to
+    'checkpoint_every_items': PROGRESS_SAVE_INTERVAL, # NEW: Save progress after this many typed entries...
+    'checkpoint_every_seconds': 5.0, # NEW: ...or after this many seconds, whichever comes first
+    'target_items_per_second': 0.0, # NEW: Paced typing rate for combinations and custom lists. 0 uses delay_between_repetitions
+    'adaptive_delay_enabled': False, # NEW: Adjust the delay between entries automatically from observed input lag
+    'adaptive_delay_max': 1.0, # NEW: Upper bound (seconds per entry) for the adaptive delay
+    'macro_recording_path': os.path.join(USER_HOME_DIR, 'macro_recording.jsonl'), # NEW: Macro file used by the Macro Recorder
+    'macro_replay_speed': 1.0, # NEW: 1 = recorded timing, N = N times faster, 0 = as fast as possible
+    'macro_simplify_tolerance': 0.0, # NEW: Drop mouse-move points within this many pixels of the path on replay (0 = keep all)
+    'rate_limits': { # NEW: Token bucket per action class: 'rate' actions per second (0 = unlimited), bursts of up to 'burst'
+        'typed_entry': {'rate': 0.0, 'burst': 1},
+        'key_press': {'rate': 0.0, 'burst': 1},
+        'macro_click': {'rate': 0.0, 'burst': 1},
+    },
+    'candidate_filter': { # NEW: Skip useless candidates (combinations and custom list entries) before they are typed
+        'enabled': False,
+        'regex': '', # Keep only candidates this regular expression matches (searched anywhere; use ^...$ for whole strings)
+        'exclude_regex': '', # Skip candidates this regular expression matches
+        'class_limits': {}, # Min/max characters per class, e.g. {'digit': {'min': 1}, 'symbol': {'max': 0}}. Classes: lower, upper, digit, symbol
+        'max_repeat': 0, # Longest allowed run of one repeated character, e.g. 2 skips 'aaa' (0 = no limit)
+        'blocklist_path': '', # Text file with one candidate per line to skip
+    },
+    'metrics_summary_interval': 10.0, # NEW: Seconds between live stats lines (items/s, per-stage p50/p95/p99, ETA) during a run (0 = off)
+    'metrics_summary_path': os.path.join(USER_HOME_DIR, 'run_summary.json'), # NEW: JSON summary written when a run ends ('' = off)
 }
 
 # Global dictionary to hold current settings
@@ -206,9 +350,8 @@ def load_settings(file_path):
     # Update global DEBUG_MODE based on loaded settings BEFORE assigning to 'settings'
     DEBUG_MODE = settings.get('debug_mode', DEFAULT_SETTINGS['debug_mode'])
     debug_print(f"DEBUG_MODE set to {DEBUG_MODE} based on loaded settings.")
-    
-    # Re-register hotkey if it was loaded or changed
-    register_stop_hotkey()
+    # The stop hotkey is registered by the code paths that send input (main menu, macro recording/replay),
+    # so loading settings for file-only operations does not import the keyboard library.
 
     return settings
 
@@ -265,58 +408,291 @@ def reset_settings_section(section_key=None):
     handle_enter_to_continue()
 
 
+# --- Crash-Safe Checkpoints ---
+# Checkpoints are appended to a small journal next to the progress file ('<progress file>.journal',
+# one JSON record per line, fsync'd). Every JOURNAL_COMPACT_INTERVAL checkpoints (and at the end of a
+# run) the latest position is written to the progress file itself through a temp file + os.replace(),
+# so it is never left truncated, and the journal is cleared. On load the newest journal record wins
+# unless the progress file is further along (a crash between the rewrite and clearing the journal).
+def get_progress_journal_path(file_path):
+    """Returns the path of the checkpoint journal that belongs to a progress file."""
+    return file_path + '.journal'
+
+def _fsync_directory(dir_path):
+    """Flushes a rename in dir_path to disk (POSIX only; a no-op elsewhere)."""
+    if os.name != 'posix':
+        return
+    try:
+        dir_fd = os.open(dir_path or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def atomic_write_text(file_path, text):
+    """
+    Replaces file_path with text atomically: the text is written and fsync'd to a temp file in the
+    same directory, which is then renamed over file_path. A crash leaves either the old or the new file.
+    """
+    progress_dir = os.path.dirname(file_path)
+    if progress_dir and not os.path.exists(progress_dir):
+        os.makedirs(progress_dir, exist_ok=True)
+        debug_print(f"Created directory for progress file: '{progress_dir}'")
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(progress_dir)
+
+def append_progress_journal(file_path, record):
+    """Appends one checkpoint record to the progress file's journal and fsyncs it."""
+    with open(get_progress_journal_path(file_path), 'a') as f:
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_progress_journal(file_path):
+    """
+    Returns the newest complete checkpoint record in the progress file's journal, or None if there is
+    no journal. A torn last line (crash in the middle of an append) is skipped.
+    """
+    journal_path = get_progress_journal_path(file_path)
+    try:
+        with open(journal_path, 'r') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[WARNING] Could not read progress journal '{journal_path}': {e}. Using the progress file only.")
+        debug_print(f"Error reading progress journal: {e}.")
+        return None
+    for line in reversed(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            debug_print(f"Skipping incomplete progress journal record: {line!r}.")
+            continue
+        if isinstance(record, dict):
+            return record
+    return None
+
+def clear_progress_journal(file_path):
+    """Deletes the progress file's journal (after its newest record was compacted or reset)."""
+    try:
+        os.remove(get_progress_journal_path(file_path))
+    except FileNotFoundError:
+        pass
+
+class ProgressCheckpointer:
+    """
+    Decides when a run saves its progress and writes the checkpoints crash-safely.
+    record() is called after every typed batch with the latest position (a JSON-serializable dict).
+    A checkpoint is taken once 'checkpoint_every_items' entries were typed or 'checkpoint_every_seconds'
+    passed since the last one, whichever comes first. Checkpoints go to the journal; every
+    JOURNAL_COMPACT_INTERVAL-th one, and the one taken by close(), goes through
+    save_snapshot(position), which rewrites the progress file atomically and clears the journal.
+
+    With background=True the disk writes happen on a dedicated writer thread, so the typing loop
+    never waits on the filesystem. The writer only keeps the newest position that is waiting to be
+    written: if the disk falls behind, older pending checkpoints are replaced (coalesced) instead of
+    queueing up. close() hands over the final position and waits for the writer to flush it.
+    """
+    def __init__(self, file_path, save_snapshot, every_items=None, every_seconds=None, compact_every=JOURNAL_COMPACT_INTERVAL, background=True):
+        self.file_path = file_path
+        self.save_snapshot = save_snapshot
+        if every_items is None:
+            every_items = settings.get('checkpoint_every_items', DEFAULT_SETTINGS['checkpoint_every_items'])
+        if every_seconds is None:
+            every_seconds = settings.get('checkpoint_every_seconds', DEFAULT_SETTINGS['checkpoint_every_seconds'])
+        self.every_items = max(1, int(every_items))
+        self.every_seconds = float(every_seconds)
+        self.compact_every = max(1, compact_every)
+        self.background = background
+        self.pending_position = None # Typed but not yet handed to the writer (typing thread only)
+        self.last_position = None # Newest position handed to the writer (typing thread only)
+        self.items_since_checkpoint = 0
+        self.last_checkpoint_time = time.monotonic()
+        self.saved_position = None # Newest position on disk (writer only)
+        self.journal_records = 0 # Records in the journal since the last compaction (writer only)
+        self.coalesced_checkpoints = 0
+        self._writer_condition = threading.Condition()
+        self._queued_write = None # (position, compact) waiting for the writer thread
+        self._writer_closing = False
+        self._writer_thread = None
+
+    def record(self, position, items=1):
+        """Remembers the latest typed position and checkpoints it if a trigger was reached."""
+        self.pending_position = position
+        self.items_since_checkpoint += items
+        if (self.items_since_checkpoint >= self.every_items
+                or time.monotonic() - self.last_checkpoint_time >= self.every_seconds):
+            self.checkpoint()
+
+    def checkpoint(self, compact=False):
+        """Checkpoints the pending position now (to the journal, or compacted into the progress file)."""
+        position = self.pending_position
+        if position is None:
+            if not compact or self.last_position is None:
+                return
+            position = self.last_position # Nothing new, but the journal may still need compacting
+        self.pending_position = None
+        self.last_position = position
+        self.items_since_checkpoint = 0
+        self.last_checkpoint_time = time.monotonic()
+        if not self.background:
+            self._write(position, compact)
+            return
+        with self._writer_condition:
+            if self._queued_write is not None:
+                self.coalesced_checkpoints += 1
+                compact = compact or self._queued_write[1]
+            self._queued_write = (position, compact)
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._writer_loop, name="checkpoint-writer", daemon=True)
+                self._writer_thread.start()
+            self._writer_condition.notify()
+
+    def _writer_loop(self):
+        """Writer thread: writes the newest queued checkpoint until close() was called and nothing is left."""
+        while True:
+            with self._writer_condition:
+                while self._queued_write is None and not self._writer_closing:
+                    self._writer_condition.wait()
+                if self._queued_write is None:
+                    return
+                position, compact = self._queued_write
+                self._queued_write = None
+            self._write(position, compact)
+
+    def _write(self, position, compact):
+        """Writes one checkpoint to disk."""
+        if compact and not self.journal_records and position == self.saved_position:
+            return # Already in the progress file
+        try:
+            if compact or self.journal_records + 1 >= self.compact_every:
+                self.save_snapshot(position)
+                self.journal_records = 0
+            else:
+                append_progress_journal(self.file_path, position)
+                self.journal_records += 1
+            self.saved_position = position
+            debug_print(f"Checkpoint saved for '{self.file_path}': {position}.")
+        except Exception as e:
+            print(f"[ERROR] Could not save checkpoint for '{self.file_path}': {e}")
+            debug_print(f"Error saving checkpoint: {e}.")
+
+    def close(self):
+        """Saves the last typed position into the progress file (waiting for the writer thread to finish)."""
+        self.checkpoint(compact=True)
+        if self._writer_thread is not None:
+            with self._writer_condition:
+                self._writer_closing = True
+                self._writer_condition.notify()
+            self._writer_thread.join()
+            self._writer_thread = None
+            self._writer_closing = False
+        if self.coalesced_checkpoints:
+            debug_print(f"{self.coalesced_checkpoints} checkpoints for '{self.file_path}' were superseded before the disk caught up.")
+
+
 # --- Progress File Functions (for combination generation) ---
-def load_progress(file_path):
+def read_progress_record(file_path, journal_record=None):
+    """
+    Returns (combination, saved_index) as strings from the newest checkpoint: the journal record if
+    one is given, otherwise the progress file (combination on line 1, optional index on line 2).
+    A journal record at or before the progress file's index is stale (left by a crash right after
+    the progress file was rewritten) and is ignored.
+    """
+    if journal_record is None:
+        with open(file_path, 'r') as f:
+            return f.readline().strip(), f.readline().strip()
+    saved_index = journal_record.get('index')
+    journal_progress = str(journal_record.get('combination', '')).strip(), '' if saved_index is None else str(saved_index)
+    if os.path.exists(file_path):
+        with open(file_path, 'r') as f:
+            snapshot_progress = f.readline().strip(), f.readline().strip()
+        if journal_progress[1].isdigit() and snapshot_progress[1].isdigit() and int(snapshot_progress[1]) >= int(journal_progress[1]):
+            debug_print(f"Ignoring stale progress journal record {journal_record} (progress file is at index {snapshot_progress[1]}).")
+            return snapshot_progress
+    return journal_progress
+
+def load_progress(file_path, with_index=False):
     """
     Loads the last saved combination from the progress file.
     Returns None if file doesn't exist, is empty, or has invalid content.
+    If with_index is True, returns a (combination, index) tuple instead, where index is the
+    saved absolute combination index (recomputed from the combination if it was not stored).
     """
+    no_progress = (None, None) if with_index else None
     debug_print(f"Attempting to load combination progress from '{file_path}'.")
-    if not os.path.exists(file_path):
+    journal_record = read_progress_journal(file_path)
+    if journal_record is None and not os.path.exists(file_path):
         print(f"[INFO] Progress file '{file_path}' not found. Starting from 'a'.")
         debug_print("Combination progress file does not exist.")
-        return None # No previous progress
+        return no_progress # No previous progress
     
-    if os.path.getsize(file_path) == 0:
+    if journal_record is None and os.path.getsize(file_path) == 0:
         print(f"[INFO] Progress file '{file_path}' is empty. Starting from 'a'.")
         debug_print("Combination progress file is empty.")
-        return None
+        return no_progress
 
     try:
-        with open(file_path, 'r') as f:
-            last_progress = f.readline().strip()
-            if not last_progress:
-                print(f"[INFO] Progress file '{file_path}' is empty after read. Starting from 'a'.")
-                debug_print("Combination progress file empty after read.")
-                return None
-            
-            # Basic validation: ensure all chars in last_progress are in CHARS set
-            configured_chars = settings.get('chars', DEFAULT_SETTINGS['chars'])
-            if not all(char in configured_chars for char in last_progress):
-                print(f"[ERROR] Invalid characters found in progress file: '{last_progress}'. Starting from 'a'.")
-                debug_print(f"Invalid characters '{last_progress}' found in combination progress file.")
-                return None
-
-            print(f"[INFO] Resuming from last saved combination progress: '{last_progress}'")
-            debug_print(f"Loaded combination progress: '{last_progress}'.")
+        last_progress, saved_index = read_progress_record(file_path, journal_record)
+        if not last_progress:
+            print(f"[INFO] Progress file '{file_path}' is empty after read. Starting from 'a'.")
+            debug_print("Combination progress file empty after read.")
+            return no_progress
+        
+        # Basic validation: ensure all chars in last_progress are in CHARS set (or the mask's set for their position)
+        chars_set, min_len, _ = get_combination_space()
+        position_sets = _position_charsets(chars_set, len(last_progress))
+        if len(position_sets) < len(last_progress) or not all(char in position_set for char, position_set in zip(last_progress, position_sets)):
+            print(f"[ERROR] Invalid characters found in progress file: '{last_progress}'. Starting from 'a'.")
+            debug_print(f"Invalid characters '{last_progress}' found in combination progress file.")
+            return no_progress
+
+        print(f"[INFO] Resuming from last saved combination progress: '{last_progress}'")
+        debug_print(f"Loaded combination progress: '{last_progress}' (saved index: '{saved_index}').")
+        if not with_index:
             return last_progress
+
+        expected_index = combination_to_index(last_progress, chars_set, min_len)
+        if saved_index.isdigit() and int(saved_index) == expected_index:
+            return last_progress, int(saved_index)
+        if saved_index:
+            debug_print(f"Saved index '{saved_index}' does not match '{last_progress}' under current settings. Using {expected_index}.")
+        return last_progress, expected_index
     except Exception as e:
         print(f"[ERROR] Could not read combination progress file '{file_path}': {e}. Starting from 'a'.")
         debug_print(f"Error reading combination progress file: {e}.")
-        return None
+        return no_progress
 
-def save_progress(file_path, current_string):
-    """Saves the current combination to the progress file, overwriting previous content."""
-    debug_print(f"Attempting to save combination progress '{current_string}' to '{file_path}'.")
+def save_progress(file_path, current_string, index=None):
+    """
+    Saves the current combination to the progress file, atomically replacing previous content
+    (and clearing the checkpoint journal, which it supersedes).
+    If index is given, its absolute combination index is stored on the second line.
+    """
+    debug_print(f"Attempting to save combination progress '{current_string}' (index: {index}) to '{file_path}'.")
     try:
-        # Ensure the directory for the progress file exists
-        progress_dir = os.path.dirname(file_path)
-        if progress_dir and not os.path.exists(progress_dir):
-            os.makedirs(progress_dir, exist_ok=True)
-            debug_print(f"Created directory for combination progress file: '{progress_dir}'")
-
-        with open(file_path, 'w') as f: # Overwrite mode 'w'
-            f.write(current_string + '\n')
+        content = current_string + '\n'
+        if index is not None:
+            content += f"{index}\n"
+        atomic_write_text(file_path, content)
+        clear_progress_journal(file_path)
         debug_print("Combination progress successfully saved.")
     except Exception as e:
         print(f"[ERROR] Could not save combination progress to '{file_path}': {e}")
@@ -325,6 +701,11 @@ def save_progress(file_path, current_string):
 def reset_progress(file_path):
     """Resets the combination progress by deleting the progress file and immediately creating an empty one."""
     debug_print(f"Attempting to reset combination progress for '{file_path}'.")
+    try:
+        clear_progress_journal(file_path)
+    except OSError as e:
+        print(f"[ERROR] Could not delete progress journal '{get_progress_journal_path(file_path)}': {e}. Please delete it manually if needed.")
+        debug_print(f"Error deleting progress journal: {e}.")
     if os.path.exists(file_path):
         try:
             os.remove(file_path)
@@ -382,6 +763,11 @@ def reset_custom_list_progress():
     file_path = settings.get('progress_file_for_custom_list_path', DEFAULT_SETTINGS['progress_file_for_custom_list_path'])
     print("\n--- Resetting Custom List Progress ---")
     debug_print(f"Attempting to reset custom list progress for '{file_path}'.")
+    try:
+        clear_progress_journal(file_path)
+    except OSError as e:
+        print(f"[ERROR] Error deleting custom list progress journal: {get_progress_journal_path(file_path)}: {e}")
+        debug_print(f"Error deleting custom list progress journal: {e}")
     if os.path.exists(file_path):
         try:
             os.remove(file_path)
@@ -397,6 +783,284 @@ def reset_custom_list_progress():
         initialize_custom_list_progress_file() # Ensure it's created if it didn't exist
     handle_enter_to_continue() # Pause for user to read
 
+def load_custom_list_progress(list_path):
+    """
+    Loads the custom list resume point as a dict with 'byte_offset' (where the next entry starts),
+    'line_number' (last typed line) and 'last_line' (last typed entry).
+    Returns None if there is no usable progress. Old progress files that only hold the last typed
+    line, or progress saved for a different/changed file, are resolved by scanning the list once.
+    """
+    progress_file = settings.get('progress_file_for_custom_list_path', DEFAULT_SETTINGS['progress_file_for_custom_list_path'])
+    debug_print(f"Attempting to load custom list progress from '{progress_file}'.")
+    journal_progress = read_progress_journal(progress_file)
+    progress = None
+    if not os.path.exists(progress_file) or os.path.getsize(progress_file) == 0:
+        if journal_progress is None:
+            print("[INFO] No custom list progress found. Starting from beginning of list.")
+            return None
+    else:
+        try:
+            with open(progress_file, 'r') as f:
+                content = f.read().strip()
+        except Exception as e:
+            if journal_progress is None:
+                print(f"[WARNING] Could not read custom list progress file: {e}. Starting from beginning of list.")
+                debug_print(f"Error reading custom list progress: {e}.")
+                return None
+            content = ''
+
+        if content:
+            try:
+                progress = json.loads(content)
+                if not isinstance(progress, dict):
+                    raise ValueError("not a progress record")
+            except ValueError:
+                progress = {'last_line': content.splitlines()[0].strip()} # Old format: just the last typed line
+                debug_print("Custom list progress file uses the old 'last line' format.")
+    if journal_progress is not None:
+        # The journal is newer unless a crash hit right after the progress file was rewritten
+        stale_journal = (progress is not None and progress.get('list_path') == journal_progress.get('list_path')
+                         and isinstance(progress.get('byte_offset'), int) and isinstance(journal_progress.get('byte_offset'), int)
+                         and progress['byte_offset'] >= journal_progress['byte_offset'])
+        if stale_journal:
+            debug_print(f"Ignoring stale custom list progress journal record {journal_progress}.")
+        else:
+            debug_print("Using the newest checkpoint from the custom list progress journal.")
+            progress = journal_progress
+    if progress is None:
+        print("[INFO] No custom list progress found. Starting from beginning of list.")
+        return None
+
+    last_line = progress.get('last_line')
+    same_file = (progress.get('list_path') == os.path.abspath(list_path)
+                 and progress.get('file_size') == os.path.getsize(list_path)
+                 and isinstance(progress.get('byte_offset'), int)
+                 and isinstance(progress.get('line_number'), int))
+    if same_file:
+        print(f"[INFO] Resuming custom list from after line {progress['line_number']}: '{last_line}'.")
+        debug_print(f"Loaded custom list progress: {progress}.")
+        return progress
+
+    if not last_line:
+        print("[INFO] No usable custom list progress found. Starting from beginning of list.")
+        return None
+    print(f"[INFO] Custom list progress was not saved for this exact file. Searching for last typed line '{last_line}'...")
+    for entry, line_number, next_offset in iter_custom_list_entries(list_path):
+        if entry == last_line:
+            print(f"[INFO] Resuming custom list from after line {line_number}: '{last_line}'.")
+            return {'byte_offset': next_offset, 'line_number': line_number, 'last_line': last_line}
+    print(f"[WARNING] Last typed line '{last_line}' not found in the custom list. Starting from beginning.")
+    debug_print(f"Last typed line '{last_line}' not found in current custom list. Starting from 0.")
+    return None
+
+def make_custom_list_progress(list_path, byte_offset, line_number, last_line, file_size=None):
+    """Builds the custom list progress record (byte offset of the next entry plus the last typed line)."""
+    return {
+        'list_path': os.path.abspath(list_path),
+        'file_size': os.path.getsize(list_path) if file_size is None else file_size,
+        'byte_offset': byte_offset,
+        'line_number': line_number,
+        'last_line': last_line,
+    }
+
+def write_custom_list_progress(progress):
+    """Atomically writes a custom list progress record to the progress file and clears its journal."""
+    progress_file = settings.get('progress_file_for_custom_list_path', DEFAULT_SETTINGS['progress_file_for_custom_list_path'])
+    try:
+        atomic_write_text(progress_file, json.dumps(progress))
+        clear_progress_journal(progress_file)
+        debug_print(f"Saved custom list progress: {progress}.")
+    except Exception as e:
+        print(f"[ERROR] Could not save custom list progress: {e}")
+        debug_print(f"Error saving custom list progress: {e}.")
+
+COMPRESSED_LIST_EXTENSIONS = ('.gz', '.bz2', '.xz', '.lzma', '.zst', '.zstd')
+
+def is_compressed_list(list_path):
+    """Returns True if the custom list is a compressed file (by extension)."""
+    return list_path.lower().endswith(COMPRESSED_LIST_EXTENSIONS)
+
+def open_custom_list_file(list_path):
+    """
+    Opens a custom list for binary reading, transparently decompressing .gz, .bz2, .xz/.lzma
+    and (if the zstandard package is installed) .zst/.zstd files as a stream.
+    Offsets, seek() and tell() on the result refer to the decompressed text.
+    """
+    lower_path = list_path.lower()
+    if lower_path.endswith('.gz'):
+        return gzip.open(list_path, 'rb')
+    if lower_path.endswith('.bz2'):
+        return bz2.open(list_path, 'rb')
+    if lower_path.endswith(('.xz', '.lzma')):
+        return lzma.open(list_path, 'rb')
+    if lower_path.endswith(('.zst', '.zstd')):
+        if zstandard is None:
+            raise RuntimeError("Reading .zst lists requires the zstandard package (pip install zstandard).")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(list_path, 'rb'), closefd=True))
+    return open(list_path, 'rb')
+
+def custom_list_read_errors(list_path):
+    """The exceptions reading or decompressing a custom list can raise (for 'except' clauses)."""
+    errors = (OSError, EOFError, lzma.LZMAError)
+    if list_path.lower().endswith(('.zst', '.zstd')):
+        errors += (RuntimeError,) if zstandard is None else (zstandard.ZstdError,)
+    return errors
+
+def _seek_custom_list(f, offset):
+    """Moves a custom list stream to 'offset', reading forward if the stream cannot seek."""
+    if f.seekable():
+        f.seek(offset)
+        return
+    remaining = offset
+    while remaining > 0:
+        chunk = f.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+
+def iter_custom_list_entries(list_path, start_offset=0, start_line_number=0):
+    """
+    Streams the non-empty, stripped entries of a custom list file one line at a time.
+    Yields (entry, line_number, next_offset) where next_offset is the byte offset right after
+    the entry's line, so a run can later resume with start_offset=next_offset.
+    For compressed lists the offsets are positions in the decompressed text; resuming decompresses
+    forward to the offset in memory (nothing is written to disk).
+    Memory use does not depend on the file size.
+    """
+    with open_custom_list_file(list_path) as f:
+        _seek_custom_list(f, start_offset)
+        offset = start_offset
+        line_number = start_line_number
+        for raw_line in f:
+            offset += len(raw_line)
+            line_number += 1
+            entry = raw_line.decode('utf-8', errors='replace').strip()
+            if entry:
+                yield entry, line_number, offset
+
+# --- Custom List Line Index (sidecar '.idx' file) ---
+# Header: magic, size and mtime (ns) of the indexed list, number of entries. Followed by one
+# little-endian uint64 per non-empty entry holding the byte offset where it starts, so an index
+# built on one machine can be used on any other.
+CUSTOM_LIST_INDEX_MAGIC = b'BOOTYIX1'
+CUSTOM_LIST_INDEX_HEADER = struct.Struct('<8sQQQ')
+
+def get_custom_list_index_path(list_path):
+    """Returns the path of the sidecar line index for a custom list (e.g. 'list.txt.idx')."""
+    return list_path + '.idx'
+
+def _write_index_offsets(index_file, offsets):
+    """Writes an array('Q') of offsets to the index file in little-endian order."""
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    offsets.tofile(index_file)
+
+def build_custom_list_index(list_path):
+    """
+    One-time streaming pass that writes the sidecar line index for a custom list.
+    Returns the number of indexed entries.
+    """
+    index_path = get_custom_list_index_path(list_path)
+    temp_path = index_path + '.tmp'
+    list_stat = os.stat(list_path)
+    print(f"[INFO] Building line index for '{list_path}'...")
+    entry_count = 0
+    offsets = array('Q')
+    with open_custom_list_file(list_path) as list_file, open(temp_path, 'wb') as index_file:
+        index_file.write(CUSTOM_LIST_INDEX_HEADER.pack(CUSTOM_LIST_INDEX_MAGIC, 0, 0, 0)) # Placeholder, rewritten below
+        offset = 0
+        for raw_line in list_file:
+            if raw_line.strip():
+                offsets.append(offset)
+                if len(offsets) >= 65536:
+                    _write_index_offsets(index_file, offsets)
+                    entry_count += len(offsets)
+                    offsets = array('Q')
+            offset += len(raw_line)
+        _write_index_offsets(index_file, offsets)
+        entry_count += len(offsets)
+        index_file.seek(0)
+        index_file.write(CUSTOM_LIST_INDEX_HEADER.pack(CUSTOM_LIST_INDEX_MAGIC, list_stat.st_size, list_stat.st_mtime_ns, entry_count))
+    os.replace(temp_path, index_path)
+    print(f"[INFO] Indexed {entry_count} entries into '{index_path}'.")
+    debug_print(f"Custom list index written: {entry_count} entries, list size {list_stat.st_size}.")
+    return entry_count
+
+class CustomListIndex:
+    """
+    Memory-mapped view of a custom list's sidecar line index. Gives the entry count, the byte
+    offset of entry K and random access to entry K without reading the whole list.
+    """
+
+    def __init__(self, list_path, index_file, index_map, entry_count):
+        self.list_path = list_path
+        self.count = entry_count
+        self._index_file = index_file
+        self._index_map = index_map
+        if not entry_count:
+            self._offsets = []
+        elif sys.byteorder == 'little':
+            self._offsets = memoryview(index_map)[CUSTOM_LIST_INDEX_HEADER.size:].cast('Q') # Zero-copy
+        else:
+            # Big-endian hosts: copy the little-endian offsets into native order
+            self._offsets = array('Q', index_map[CUSTOM_LIST_INDEX_HEADER.size:])
+            self._offsets.byteswap()
+
+    def offset(self, entry_number):
+        """Returns the byte offset where entry 'entry_number' (0-based) starts."""
+        return self._offsets[entry_number]
+
+    def entry(self, entry_number):
+        """
+        Reads entry 'entry_number' (0-based) straight from the list file.
+        Compressed lists have to be decompressed up to the entry, so this is only fast for plain text.
+        """
+        with open_custom_list_file(self.list_path) as f:
+            _seek_custom_list(f, self._offsets[entry_number])
+            return f.readline().decode('utf-8', errors='replace').strip()
+
+    def entries_before(self, byte_offset):
+        """Returns how many entries start before byte_offset (i.e. the 0-based number of the next entry)."""
+        return bisect.bisect_left(self._offsets, byte_offset)
+
+    def close(self):
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._index_map.close()
+        self._index_file.close()
+
+def open_custom_list_index(list_path):
+    """
+    Opens the sidecar line index of a custom list if there is one and it still matches the list's
+    size and modification time. Returns a CustomListIndex, or None if it is missing or stale.
+    """
+    index_path = get_custom_list_index_path(list_path)
+    if not os.path.isfile(index_path):
+        return None
+    index_file = open(index_path, 'rb')
+    try:
+        header = index_file.read(CUSTOM_LIST_INDEX_HEADER.size)
+        if len(header) != CUSTOM_LIST_INDEX_HEADER.size:
+            raise ValueError("truncated header")
+        magic, file_size, mtime_ns, entry_count = CUSTOM_LIST_INDEX_HEADER.unpack(header)
+        list_stat = os.stat(list_path)
+        if magic != CUSTOM_LIST_INDEX_MAGIC:
+            raise ValueError("not a custom list index")
+        if (file_size, mtime_ns) != (list_stat.st_size, list_stat.st_mtime_ns):
+            print(f"[WARNING] Line index '{index_path}' is out of date (the list changed). Ignoring it; rebuild it with --index-list.")
+            index_file.close()
+            return None
+        if os.path.getsize(index_path) != CUSTOM_LIST_INDEX_HEADER.size + entry_count * 8:
+            raise ValueError("size does not match entry count")
+        index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[WARNING] Could not use line index '{index_path}': {e}. Ignoring it.")
+        debug_print(f"Error opening custom list index: {e}.")
+        index_file.close()
+        return None
+    debug_print(f"Using custom list index '{index_path}' ({entry_count} entries).")
+    return CustomListIndex(list_path, index_file, index_map, entry_count)
+
 # --- Mouse Listener Callback for Setup ---
 def on_click_for_setup(x, y, button, pressed):
     """
@@ -517,149 +1181,1961 @@ def get_clicks_for_setup():
         # No save_settings here, as the full automation loop will handle it.
         return True
 
-# --- Combination Generator ---
-def generate_all_combinations(start_combination=None):
+# --- Mask (Per-Position Character Set) Parsing ---
+# Built-in mask placeholders, e.g. '?u?l?l?l?l?d?d' = 1 uppercase, 4 lowercase, 2 digits.
+MASK_CHARSETS = {
+    'l': string.ascii_lowercase,
+    'u': string.ascii_uppercase,
+    'd': string.digits,
+    's': ' ' + string.punctuation,
+    'a': string.ascii_lowercase + string.ascii_uppercase + string.digits + ' ' + string.punctuation,
+    'h': string.digits + 'abcdef',
+    'H': string.digits + 'ABCDEF',
+}
+MASK_CUSTOM_CHARSET_KEYS = ('1', '2', '3', '4')
+
+def parse_mask(mask, custom_charsets=None):
     """
-    Generates all string combinations lexicographically, starting from length 1.
-    If start_combination is provided, it resumes from that point.
-    This generator runs indefinitely, but respects min/max length settings.
+    Parses a mask into a list with one character set per position.
+    '?l', '?u', '?d', '?s', '?a', '?h' and '?H' are built-in sets, '?1' to '?4' are the
+    custom sets from custom_charsets, '??' is a literal '?' and any other character stands for itself.
+    Raises ValueError on an invalid mask.
+    """
+    custom_charsets = custom_charsets or {}
+    position_charsets = []
+    pos = 0
+    while pos < len(mask):
+        char = mask[pos]
+        if char != '?':
+            position_charsets.append(char)
+            pos += 1
+            continue
+        if pos + 1 >= len(mask):
+            raise ValueError(f"Mask '{mask}' ends with an incomplete '?' placeholder.")
+        key = mask[pos + 1]
+        if key == '?':
+            position_charsets.append('?')
+        elif key in MASK_CHARSETS:
+            position_charsets.append(MASK_CHARSETS[key])
+        elif key in MASK_CUSTOM_CHARSET_KEYS:
+            custom_set = custom_charsets.get(key, '')
+            if not custom_set:
+                raise ValueError(f"Mask '{mask}' uses '?{key}' but custom character set {key} is empty.")
+            # Keep the first occurrence of every character so ranking stays unambiguous
+            position_charsets.append(''.join(dict.fromkeys(custom_set)))
+        else:
+            raise ValueError(f"Unknown mask placeholder '?{key}' in mask '{mask}'.")
+        pos += 2
+    if not position_charsets:
+        raise ValueError("Mask cannot be empty.")
+    return position_charsets
+
+def get_combination_space():
+    """
+    Returns the effective (chars_set, min_len, max_len) used for combination generation.
+    chars_set is the configured character set string, or a list of per-position character
+    sets when a mask is configured. In mask mode, max_len never exceeds the mask length.
     """
-    chars_set = settings.get('chars', DEFAULT_SETTINGS['chars']) # Use configured chars
     min_len = settings.get('min_combination_length', DEFAULT_SETTINGS['min_combination_length'])
     max_len = settings.get('max_combination_length', DEFAULT_SETTINGS['max_combination_length'])
-    
-    debug_print(f"Character set for combination generation: '{chars_set}'. Min Length: {min_len}, Max Length: {max_len if max_len > 0 else 'Infinite'}.")
-    
-    # Flag to indicate if we have reached or passed the start_combination
-    started_yielding = False
+    mask = settings.get('mask', DEFAULT_SETTINGS['mask'])
+    if not mask:
+        return settings.get('chars', DEFAULT_SETTINGS['chars']), min_len, max_len
+    position_charsets = parse_mask(mask, settings.get('mask_custom_charsets', DEFAULT_SETTINGS['mask_custom_charsets']))
+    if max_len <= 0 or max_len > len(position_charsets):
+        max_len = len(position_charsets)
+    return position_charsets, min_len, max_len
 
-    actual_start_length_for_gen = min_len
+# --- Combination Generator ---
+def _position_charsets(chars_set, length):
+    """Returns the list of character sets for each position of a combination of 'length'."""
+    if isinstance(chars_set, str):
+        return [chars_set] * length
+    return chars_set[:length]
 
-    if start_combination:
-        start_length = len(start_combination)
-        actual_start_length_for_gen = max(min_len, start_length) # Start from current length or min_len
-        debug_print(f"Attempting to resume from start_combination: '{start_combination}' (length {start_length}). Actual start length for gen: {actual_start_length_for_gen}.")
-        
-        # Iterate up to the starting length to find the start_combination
-        for length_iter in itertools.count(min_len):
-            if STOP_SCRIPT: 
-                debug_print("STOP_SCRIPT detected during resume search.")
-                return
-            if max_len > 0 and length_iter > max_len:
-                debug_print(f"Max length ({max_len}) reached during resume search. Stopping generator.")
-                return # Exceeded max length while searching
+def count_combinations_for_length(length, chars_set):
+    """
+    Returns how many combinations of exactly 'length' characters exist for chars_set
+    (a character set string, or a list of per-position character sets from a mask).
+    """
+    if isinstance(chars_set, str):
+        return len(chars_set) ** length
+    if length > len(chars_set):
+        return 0
+    total = 1
+    for position_set in chars_set[:length]:
+        total *= len(position_set)
+    return total
+
+def get_keyspace_size(chars_set, min_len, max_len):
+    """
+    Returns the total number of combinations between min_len and max_len (inclusive).
+    Returns None if max_len is 0 (infinite keyspace).
+    """
+    if max_len <= 0:
+        return None
+    return sum(count_combinations_for_length(length, chars_set) for length in range(min_len, max_len + 1))
 
-            if length_iter < start_length: # Skip lengths shorter than the start_combination's length
-                debug_print(f"Skipping length {length_iter} (shorter than start_combination length).")
-                continue # Move to the next length
+def combination_to_index(combination, chars_set, min_len):
+    """
+    Converts a combination into its absolute position in the generator's output.
+    All shorter lengths (from min_len upwards) come first, then the combination's
+    mixed-radix value over chars_set. Returns None if the combination cannot be produced.
+    """
+    if len(combination) < min_len or not isinstance(chars_set, str) and len(combination) > len(chars_set):
+        return None
+    index = sum(count_combinations_for_length(length, chars_set) for length in range(min_len, len(combination)))
+    value = 0
+    for char, position_set in zip(combination, _position_charsets(chars_set, len(combination))):
+        digit = position_set.find(char)
+        if digit < 0:
+            return None
+        value = value * len(position_set) + digit
+    return index + value
+
+def index_to_combination(index, chars_set, min_len):
+    """Inverse of combination_to_index: returns the combination at an absolute position."""
+    if index < 0:
+        raise ValueError(f"Combination index cannot be negative: {index}")
+    length = min_len
+    while index >= count_combinations_for_length(length, chars_set):
+        if not isinstance(chars_set, str) and length >= len(chars_set):
+            raise ValueError("Combination index is beyond the end of the mask keyspace.")
+        index -= count_combinations_for_length(length, chars_set)
+        length += 1
+    digits = []
+    for position_set in reversed(_position_charsets(chars_set, length)):
+        index, digit = divmod(index, len(position_set))
+        digits.append(position_set[digit])
+    return ''.join(reversed(digits))
+
+def _combinations_from(chars_set, start_combination):
+    """
+    Yields combinations of len(start_combination) in lexicographic order, starting at
+    start_combination itself. The remaining range is split into whole itertools.product
+    blocks (one per suffix length), so no earlier combination is ever built.
+    """
+    length = len(start_combination)
+    position_sets = _position_charsets(chars_set, length)
+    for suffix_length in range(length):
+        pivot = length - 1 - suffix_length
+        prefix = start_combination[:pivot]
+        pivot_set = position_sets[pivot]
+        first_pos = pivot_set.index(start_combination[pivot]) + (0 if suffix_length == 0 else 1)
+        for pivot_char in pivot_set[first_pos:]:
+            head = prefix + pivot_char
+            if suffix_length == 0:
+                yield head
+                continue
+            for tail in itertools.product(*position_sets[pivot + 1:]):
+                yield head + ''.join(tail)
 
-            for combo_tuple in itertools.product(chars_set, repeat=length_iter):
-                if STOP_SCRIPT: 
-                    debug_print("STOP_SCRIPT detected during resume search inner loop.")
-                    return
-                current_combo_str = ''.join(combo_tuple)
-                debug_print(f"Checking combo '{current_combo_str}' against resume point '{start_combination}'.")
-
-                # If we are at the start_combination, start yielding from here
-                if current_combo_str == start_combination:
-                    print(f"[INFO] Found resume point: '{start_combination}'. Resuming generation from next combination.")
-                    debug_print("Resume point found. Setting started_yielding to True.")
-                    started_yielding = True
-                    break # Break inner loop (combinations for this length)
-
-            if started_yielding:
-                debug_print("Breaking outer loop as resume point was found.")
-                break # Break outer loop (lengths)
-            
-            if length_iter >= start_length and not started_yielding:
-                print(f"[WARNING] Resume point '{start_combination}' was not found in generated sequence (it might be invalid or deleted from character set). Starting from 'a'.")
-                debug_print("Resume point not found after searching. Resetting start_combination.")
-                start_combination = None # Reset to start from the beginning
-                started_yielding = True # Force yielding from now on, starting with 'a'
-                break # Break here to start main generation loop from length 1
+def generate_all_combinations(start_combination=None, start_index=None, end_index=None, candidate_filter=None):
+    """
+    Generates all string combinations lexicographically, starting from min length.
+    If start_combination (or its absolute start_index) is provided, generation resumes
+    from the combination right after it without re-walking the earlier ones.
+    If end_index is provided, generation stops before the combination at that index.
+    If a CandidateFilter is given, only accepted combinations are yielded (pruning whole
+    subtrees of the product space when its rules allow).
+    Uses the configured mask (one character set per position) if one is set.
+    This generator runs indefinitely, but respects min/max length settings.
+    """
+    chars_set, min_len, max_len = get_combination_space()
+    
+    if isinstance(chars_set, str):
+        debug_print(f"Character set for combination generation: '{chars_set}'. Min Length: {min_len}, Max Length: {max_len if max_len > 0 else 'Infinite'}.")
+    else:
+        keyspace_size = get_keyspace_size(chars_set, min_len, max_len)
+        announce(f"[INFO] Using mask '{settings['mask']}' ({len(chars_set)} positions). Lengths {min_len}-{max_len}, keyspace size: {keyspace_size}.")
+        debug_print(f"Mask position character sets: {chars_set}.")
 
-        if not started_yielding and start_combination: # This case is if start_combination was provided but somehow not found (e.g., too long for current chars, or invalid)
-             print(f"[WARNING] Resume point '{start_combination}' was not found (invalid or already passed). Starting from 'a'.")
-             debug_print("Resume point not found and started_yielding is false. Resetting.")
-             start_combination = None
-             started_yielding = True # Force yielding from now on, starting with 'a'
+    if start_combination:
+        start_index = combination_to_index(start_combination, chars_set, min_len)
+        if start_index is None or (max_len > 0 and len(start_combination) > max_len):
+            announce(f"[WARNING] Resume point '{start_combination}' is not part of the current combination space (it might be invalid or deleted from character set). Starting from 'a'.")
+            debug_print("Resume point could not be ranked. Starting from the beginning.")
+            start_index = None
+
+    # The combination to start yielding from: one past the resume point
+    first_combination = None
+    if start_index is not None:
+        try:
+            first_combination = index_to_combination(start_index + 1, chars_set, min_len)
+        except ValueError:
+            announce("\n[INFO] The resume point is the last combination of the mask. Nothing left to generate.")
+            return
+        announce(f"[INFO] Resuming generation at combination #{start_index + 2}: '{first_combination}'.")
+        debug_print(f"Resume index {start_index} unranked to next combination '{first_combination}'.")
 
+    actual_start_length_for_gen = len(first_combination) if first_combination else min_len
+    next_index = start_index + 1 if start_index is not None else 0
+    # Absolute index of the first combination of the current length
+    length_start_index = get_keyspace_size(chars_set, min_len, actual_start_length_for_gen - 1) if actual_start_length_for_gen > min_len else 0
 
-    # Main generation loop (either from beginning or after resuming)
     for length in itertools.count(actual_start_length_for_gen):
-        if STOP_SCRIPT: 
-            debug_print(f"STOP_SCRIPT detected during generation for length {length}.")
+        if STOP_EVENT.is_set():
+            debug_print(f"Stop requested during generation for length {length}.")
             return
         
         if max_len > 0 and length > max_len:
-            print(f"\n[INFO] Maximum combination length ({max_len}) reached. Stopping generation.")
+            announce(f"\n[INFO] Maximum combination length ({max_len}) reached. Stopping generation.")
             debug_print("Max length reached. Stopping generator.")
             return # Stop if max length is set and reached
 
-        print(f"\n[INFO] Generating combinations for length: {length} (Total possible: {len(chars_set)**length})")
-        debug_print(f"Generating combinations for length {length}.")
+        length_size = count_combinations_for_length(length, chars_set)
+        announce(f"\n[INFO] Generating combinations for length: {length} (Total possible: {length_size})")
+        debug_print(f"Generating combinations for length {length}.")
+
+        if candidate_filter is not None and candidate_filter.can_prune:
+            # Walk the product tree, skipping subtrees the filter rules out
+            end_rank = end_index - length_start_index if end_index is not None else None
+            for _, current_combo_str in candidate_filter.iter_product(_position_charsets(chars_set, length), next_index - length_start_index, end_rank):
+                yield current_combo_str
+            length_start_index += length_size
+            next_index = length_start_index
+            if end_index is not None and next_index >= end_index:
+                announce(f"\n[INFO] Reached the end of the assigned combination range (index {end_index}). Stopping generation.")
+                debug_print(f"End index {end_index} reached. Stopping generator.")
+                return
+            continue
+
+        if first_combination and length == len(first_combination):
+            combinations = _combinations_from(chars_set, first_combination)
+        else:
+            combinations = (''.join(combo_tuple) for combo_tuple in itertools.product(*_position_charsets(chars_set, length)))
+        accepts = candidate_filter.accepts if candidate_filter is not None else None
+
+        for current_combo_str in combinations:
+            if end_index is not None and next_index >= end_index:
+                announce(f"\n[INFO] Reached the end of the assigned combination range (index {end_index}). Stopping generation.")
+                debug_print(f"End index {end_index} reached. Stopping generator.")
+                return
+            next_index += 1
+            if next_index % GENERATOR_STOP_CHECK_INTERVAL == 0 and STOP_EVENT.is_set():
+                debug_print(f"Stop requested during generation at combination index {next_index}.")
+                return
+            if accepts is None or accepts(current_combo_str):
+                yield current_combo_str
+        length_start_index += length_size
+
+# --- Candidate Filter ---
+CANDIDATE_CHAR_CLASSES = ('lower', 'upper', 'digit', 'symbol')
+
+def get_char_class(char):
+    """Index into CANDIDATE_CHAR_CLASSES of a character's class (anything not a letter or digit is a symbol)."""
+    if char.islower():
+        return 0
+    if char.isupper():
+        return 1
+    if char.isdigit():
+        return 2
+    return 3
+
+class CandidateFilter:
+    """
+    The 'candidate_filter' rules compiled once per run. accepts() tests a single candidate (custom
+    list entries, or combinations when only the regexes and the blocklist are set). The structural
+    rules (character class min/max and max_repeat) only depend on the characters so far, so
+    iter_product() checks them on every prefix while walking a length's product tree and skips a
+    whole subtree as soon as a prefix can no longer lead to an accepted combination.
+    'rejected' counts every skipped candidate, including those in pruned subtrees.
+    """
+    def __init__(self, regex='', exclude_regex='', class_limits=None, max_repeat=0, blocklist=()):
+        self.regex = re.compile(regex) if regex else None
+        self.exclude_regex = re.compile(exclude_regex) if exclude_regex else None
+        self.class_min = [0] * len(CANDIDATE_CHAR_CLASSES)
+        self.class_max = [None] * len(CANDIDATE_CHAR_CLASSES)
+        for class_name, limits in (class_limits or {}).items():
+            class_index = CANDIDATE_CHAR_CLASSES.index(class_name)
+            self.class_min[class_index] = limits.get('min') or 0
+            self.class_max[class_index] = limits.get('max')
+        self.max_repeat = max_repeat
+        self.blocklist = frozenset(blocklist)
+        self.can_prune = any(self.class_min) or any(limit is not None for limit in self.class_max) or max_repeat > 0
+        self.passed = 0
+        self.rejected = 0
+
+    def _passes_structure(self, candidate):
+        counts = [0] * len(CANDIDATE_CHAR_CLASSES)
+        last_char, run_length = None, 0
+        for char in candidate:
+            counts[get_char_class(char)] += 1
+            run_length = run_length + 1 if char == last_char else 1
+            if self.max_repeat and run_length > self.max_repeat:
+                return False
+            last_char = char
+        for count, minimum, maximum in zip(counts, self.class_min, self.class_max):
+            if count < minimum or (maximum is not None and count > maximum):
+                return False
+        return True
+
+    def _passes_patterns(self, candidate):
+        if self.regex is not None and not self.regex.search(candidate):
+            return False
+        if self.exclude_regex is not None and self.exclude_regex.search(candidate):
+            return False
+        return candidate not in self.blocklist
+
+    def accepts(self, candidate):
+        """True if the candidate passes every rule. Counts it as passed or rejected."""
+        if (not self.can_prune or self._passes_structure(candidate)) and self._passes_patterns(candidate):
+            self.passed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def filter_entries(self, entries, key=None):
+        """Yields the entries whose candidate (key(entry), or the entry itself) is accepted. Stops early on a stop request."""
+        accepts = self.accepts
+        for entry in entries:
+            if accepts(entry if key is None else key(entry)):
+                yield entry
+            elif self.rejected % GENERATOR_STOP_CHECK_INTERVAL == 0 and STOP_EVENT.is_set():
+                return # Nothing reaches the typing loop (and its stop check) while everything is rejected
+
+    def iter_product(self, position_sets, start_rank=0, end_rank=None):
+        """
+        Yields (rank, combination) for the accepted combinations of one length (one character set
+        per position), in the same order as itertools.product, restricted to ranks
+        [start_rank, end_rank). A prefix is abandoned (its whole subtree skipped) when a class
+        maximum or max_repeat is exceeded, or when the remaining positions can no longer supply a
+        class minimum. Stops early on a stop request.
+        """
+        length = len(position_sets)
+        sizes = [len(position_set) for position_set in position_sets]
+        subtree_sizes = [1] * (length + 1) # subtree_sizes[d]: combinations below one choice at depth d - 1
+        for depth in range(length - 1, -1, -1):
+            subtree_sizes[depth] = subtree_sizes[depth + 1] * sizes[depth]
+        end_rank = subtree_sizes[0] if end_rank is None else min(end_rank, subtree_sizes[0])
+        if length == 0 or start_rank >= end_rank:
+            return
+        start_digits = [start_rank // subtree_sizes[depth + 1] % sizes[depth] for depth in range(length)]
+        position_classes = [[get_char_class(char) for char in position_set] for position_set in position_sets]
+        # supply[d][c]: positions from depth d on that can still hold a character of class c
+        supply = [[0] * len(CANDIDATE_CHAR_CLASSES) for _ in range(length + 1)]
+        for depth in range(length - 1, -1, -1):
+            classes_here = set(position_classes[depth])
+            for class_index in range(len(CANDIDATE_CHAR_CLASSES)):
+                supply[depth][class_index] = supply[depth + 1][class_index] + (class_index in classes_here)
+        class_min, class_max, max_repeat = self.class_min, self.class_max, self.max_repeat
+        min_classes = [class_index for class_index, minimum in enumerate(class_min) if minimum]
+        counts = [0] * len(CANDIDATE_CHAR_CLASSES)
+        passes_patterns = self._passes_patterns
+        last_depth = length - 1
+        visited = 0 # Prefixes and leaves looked at, for the periodic stop check
+
+        def walk(depth, prefix, prefix_rank, on_start_path, last_char, run_length):
+            nonlocal visited
+            position_set, classes, size = position_sets[depth], position_classes[depth], sizes[depth]
+            child_size = subtree_sizes[depth + 1]
+            remaining_supply = supply[depth + 1]
+            first = start_digits[depth] if on_start_path else 0
+            for i in range(first, size):
+                rank = prefix_rank * size + i
+                subtree_start = rank * child_size
+                if subtree_start >= end_rank:
+                    return
+                visited += 1
+                if visited % GENERATOR_STOP_CHECK_INTERVAL == 0 and STOP_EVENT.is_set():
+                    return
+                char = position_set[i]
+                class_index = classes[i]
+                run = run_length + 1 if char == last_char else 1
+                counts[class_index] += 1
+                viable = (class_max[class_index] is None or counts[class_index] <= class_max[class_index]) and (not max_repeat or run <= max_repeat)
+                if viable:
+                    deficit = 0
+                    for min_class in min_classes:
+                        missing = class_min[min_class] - counts[min_class]
+                        if missing > remaining_supply[min_class]:
+                            viable = False
+                            break
+                        if missing > 0:
+                            deficit += missing
+                    viable = viable and deficit <= last_depth - depth
+                if not viable:
+                    # Skip the subtree; count the part of it inside [start_rank, end_rank)
+                    self.rejected += max(min(subtree_start + child_size, end_rank) - max(subtree_start, start_rank), 0)
+                elif depth == last_depth:
+                    candidate = prefix + char
+                    if passes_patterns(candidate):
+                        self.passed += 1
+                        yield rank, candidate
+                    else:
+                        self.rejected += 1
+                else:
+                    yield from walk(depth + 1, prefix + char, rank, on_start_path and i == first, char, run)
+                    if STOP_EVENT.is_set():
+                        return # The subtree was cut short by a stop request
+                counts[class_index] -= 1
+
+        yield from walk(0, '', 0, True, None, 0)
+
+    def report(self, seconds_per_item=None):
+        """Prints how many candidates were skipped and roughly how much typing time that saved."""
+        total = self.passed + self.rejected
+        if not total:
+            return
+        saved_text = f", saving about {format_duration(self.rejected * seconds_per_item)} of typing" if seconds_per_item else ""
+        print(f"[INFO] Candidate filter: skipped {self.rejected:,} of {total:,} candidates ({100.0 * self.rejected / total:.2f}%){saved_text}.")
+
+def _is_whole_number(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def compile_candidate_filter(rules=None):
+    """
+    Compiles the 'candidate_filter' rules (default: from settings) into a CandidateFilter, or
+    returns None if the filter is disabled or has no rules. Raises ValueError for invalid rules.
+    """
+    if rules is None:
+        rules = settings.get('candidate_filter', DEFAULT_SETTINGS['candidate_filter'])
+    if not isinstance(rules, dict):
+        raise ValueError("The candidate_filter setting must be an object of rules.")
+    if not rules.get('enabled'):
+        return None
+    for key in ('regex', 'exclude_regex', 'blocklist_path'):
+        if not isinstance(rules.get(key) or '', str):
+            raise ValueError(f"The candidate filter's {key} must be text, got {rules[key]!r}.")
+    class_limits = rules.get('class_limits') or {}
+    if not isinstance(class_limits, dict):
+        raise ValueError("The candidate filter's class_limits must map class names to {'min': n, 'max': n}.")
+    for class_name, limits in class_limits.items():
+        if class_name not in CANDIDATE_CHAR_CLASSES:
+            raise ValueError(f"Unknown character class '{class_name}' in the candidate filter. Use: {', '.join(CANDIDATE_CHAR_CLASSES)}.")
+        if not isinstance(limits, dict) or set(limits) - {'min', 'max'}:
+            raise ValueError(f"Invalid limits for '{class_name}' in the candidate filter: expected {{'min': n, 'max': n}}, got {limits!r}.")
+        minimum, maximum = limits.get('min') or 0, limits.get('max')
+        if not _is_whole_number(minimum) or not (maximum is None or _is_whole_number(maximum)) or (maximum is not None and maximum < minimum):
+            raise ValueError(f"Invalid limits for '{class_name}' in the candidate filter: min {minimum!r}, max {maximum!r} (use whole numbers >= 0, max >= min).")
+    max_repeat = rules.get('max_repeat') or 0
+    if not _is_whole_number(max_repeat):
+        raise ValueError(f"Invalid max_repeat {max_repeat!r} in the candidate filter: use a whole number >= 0 (0 = no limit).")
+    blocklist = ()
+    blocklist_path = rules.get('blocklist_path')
+    if blocklist_path:
+        try:
+            with open(blocklist_path, 'r', encoding='utf-8', errors='replace') as f:
+                blocklist = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            raise ValueError(f"Could not read the candidate filter blocklist '{blocklist_path}': {e}.")
+    try:
+        candidate_filter = CandidateFilter(rules.get('regex', ''), rules.get('exclude_regex', ''), class_limits, max_repeat, blocklist)
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression in the candidate filter: {e}.")
+    if not (candidate_filter.can_prune or candidate_filter.regex or candidate_filter.exclude_regex or candidate_filter.blocklist):
+        return None
+    return candidate_filter
+
+# --- Batch (Block) Combination Generator ---
+def generate_combination_blocks(start_index=0, end_index=None, block_size=COMBINATION_BLOCK_SIZE):
+    """
+    Generates combinations in blocks instead of one string at a time (requires NumPy).
+    Yields (first_index, digits) tuples, where digits is a (count, length) array of positions
+    into each position's character set (uint8, or uint32 for sets larger than 256 characters).
+    Every block holds combinations of a single length, so it stays fixed-width; use
+    decode_combination_block to turn a block into strings when they are actually needed.
+    Covers absolute indexes [start_index, end_index), respecting min/max length and mask settings.
+    """
+    if np is None:
+        raise RuntimeError("The batch combination generator requires NumPy (pip install numpy).")
+    chars_set, min_len, max_len = get_combination_space()
+    max_radix = len(chars_set) if isinstance(chars_set, str) else max(len(position_set) for position_set in chars_set)
+    digit_dtype = np.uint8 if max_radix <= 256 else np.uint32
+
+    def to_digits(value, radices):
+        digits = [0] * len(radices)
+        for pos in range(len(radices) - 1, -1, -1):
+            value, digits[pos] = divmod(value, radices[pos])
+        return digits
+
+    length = min_len
+    length_offset = 0 # Absolute index of the first combination of 'length'
+    while start_index >= length_offset + count_combinations_for_length(length, chars_set):
+        if max_len > 0 and length >= max_len:
+            return
+        length_offset += count_combinations_for_length(length, chars_set)
+        length += 1
+
+    index = start_index
+    while end_index is None or index < end_index:
+        if STOP_EVENT.is_set():
+            debug_print("Stop requested during block generation.")
+            return
+        if max_len > 0 and length > max_len:
+            debug_print("Max length reached. Stopping block generator.")
+            return
+        radices = [len(position_set) for position_set in _position_charsets(chars_set, length)]
+        # Fewest low (rightmost) digits whose range exceeds a block, so a block carries at most once into the high digits
+        low_digits = 0
+        low_modulus = 1
+        while low_digits < length and low_modulus <= block_size:
+            low_digits += 1
+            low_modulus *= radices[length - low_digits]
+        high_width = length - low_digits
+
+        length_end = length_offset + count_combinations_for_length(length, chars_set)
+        block_end = min(index + block_size, length_end)
+        if end_index is not None:
+            block_end = min(block_end, end_index)
+        count = block_end - index
+
+        # Mixed-radix decomposition of (index - length_offset) + arange(count), done on machine-sized
+        # low digits plus a Python big-int high part so lengths beyond uint64 range still work.
+        high, low = divmod(index - length_offset, low_modulus)
+        low_values = np.arange(low, low + count, dtype=np.uint64)
+        carry = low_values >= low_modulus
+        low_values[carry] -= low_modulus
+        digits = np.empty((count, length), dtype=digit_dtype)
+        for pos in range(length - 1, high_width - 1, -1):
+            digits[:, pos] = low_values % radices[pos]
+            low_values //= radices[pos]
+        if high_width:
+            digits[:, :high_width] = np.array(to_digits(high, radices[:high_width]), dtype=digit_dtype)
+            if carry.any():
+                digits[carry, :high_width] = np.array(to_digits(high + 1, radices[:high_width]), dtype=digit_dtype)
+
+        yield index, digits
+
+        index = block_end
+        if index == length_end:
+            length_offset = length_end
+            length += 1
+
+def decode_combination_block(digits, chars_set=None):
+    """Decodes a block from generate_combination_blocks into a list of strings."""
+    if chars_set is None:
+        chars_set = get_combination_space()[0]
+    count, length = digits.shape
+    if length == 0:
+        return [''] * count
+    if isinstance(chars_set, str):
+        code_points = np.array([ord(char) for char in chars_set], dtype='<u4')
+        block_code_points = code_points[digits]
+    else:
+        # One code point table per position, padded to the widest position set
+        position_sets = chars_set[:length]
+        table = np.zeros((length, max(len(position_set) for position_set in position_sets)), dtype='<u4')
+        for pos, position_set in enumerate(position_sets):
+            table[pos, :len(position_set)] = [ord(char) for char in position_set]
+        block_code_points = table[np.arange(length), digits]
+    # Fixed-width UTF-32 code points can be reinterpreted directly as a NumPy unicode array
+    return np.ascontiguousarray(block_code_points).view(f'<U{length}').ravel().tolist()
+
+# --- Keyspace Sharding (for parallel workers) ---
+def parse_shard_spec(shard_spec):
+    """
+    Parses a shard spec like '3/16' (shard 3 of 16, 1-based) into a (shard_number, shard_count) tuple.
+    Raises ValueError if the spec is malformed or out of range.
+    """
+    try:
+        number_str, count_str = shard_spec.strip().split('/')
+        shard_number, shard_count = int(number_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard spec '{shard_spec}'. Expected the form K/N, e.g. 3/16.")
+    if shard_count < 1 or not 1 <= shard_number <= shard_count:
+        raise ValueError(f"Invalid shard spec '{shard_spec}'. Shard number must be between 1 and {max(shard_count, 1)}.")
+    return shard_number, shard_count
+
+def get_shard_range(shard_number, shard_count, keyspace_size):
+    """
+    Returns the half-open (start_index, end_index) range of combination indexes owned by a shard.
+    Shards are disjoint, contiguous and together cover the whole keyspace.
+    """
+    start_index = keyspace_size * (shard_number - 1) // shard_count
+    end_index = keyspace_size * shard_number // shard_count
+    return start_index, end_index
+
+def get_combination_progress_file_path(shard=None):
+    """
+    Returns the combination progress file path. Each shard gets its own file next to the
+    configured one, e.g. 'progress.shard3of16.txt' for shard 3/16.
+    """
+    base_path = settings.get('progress_file_path', DEFAULT_SETTINGS['progress_file_path'])
+    if shard is None:
+        return base_path
+    root, ext = os.path.splitext(base_path)
+    return f"{root}.shard{shard[0]}of{shard[1]}{ext}"
+
+def read_checkpoint_index(file_path, chars_set, min_len):
+    """
+    Returns the absolute index of the last typed combination saved in a progress file (or its
+    journal), or None if there is no progress yet. Raises on unreadable files.
+    """
+    journal_record = read_progress_journal(file_path)
+    if journal_record is None and not os.path.exists(file_path):
+        return None
+    last_combo, saved_index = read_progress_record(file_path, journal_record)
+    if saved_index.isdigit():
+        return int(saved_index)
+    if last_combo:
+        return combination_to_index(last_combo, chars_set, min_len)
+    return None
+
+def show_shard_status(shard_count):
+    """Reports the progress of every shard and the total coverage of the keyspace."""
+    try:
+        chars_set, min_len, max_len = get_combination_space()
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return False
+    keyspace_size = get_keyspace_size(chars_set, min_len, max_len)
+    if keyspace_size is None:
+        print("[ERROR] Sharding requires a maximum combination length. Set one in the Combination Generator Options.")
+        return False
+
+    print(f"\n--- Shard Status ({shard_count} shards, keyspace size: {keyspace_size}) ---")
+    total_done = 0
+    completed_shards = 0
+    for shard_number in range(1, shard_count + 1):
+        start_index, end_index = get_shard_range(shard_number, shard_count, keyspace_size)
+        shard_size = end_index - start_index
+        file_path = get_combination_progress_file_path((shard_number, shard_count))
+        try:
+            last_index = read_checkpoint_index(file_path, chars_set, min_len)
+        except Exception as e:
+            last_index = None
+            print(f"[WARNING] Could not read progress for shard {shard_number}/{shard_count} ('{file_path}'): {e}")
+            debug_print(f"Error reading shard progress file: {e}.")
+
+        done = 0
+        if last_index is not None:
+            done = min(max(last_index + 1 - start_index, 0), shard_size)
+        total_done += done
+        if shard_size == 0 or done == shard_size:
+            state = "COMPLETE"
+            completed_shards += 1
+        elif done > 0:
+            state = "IN PROGRESS"
+        else:
+            state = "NOT STARTED"
+        percent = 100.0 * done / shard_size if shard_size else 100.0
+        print(f"  Shard {shard_number}/{shard_count}: indexes [{start_index}, {end_index}) - {done}/{shard_size} ({percent:.2f}%) {state}")
+
+    print(f"\n[INFO] {completed_shards}/{shard_count} shards complete. Total coverage: {total_done}/{keyspace_size} ({100.0 * total_done / keyspace_size:.4f}%).")
+    return True
+
+
+# --- Candidate Producer (background prefetch) ---
+_PRODUCER_DONE = object() # Queue marker: the source is exhausted
+_PRODUCER_STATE = threading.local() # Set on the producer thread: 'announce' queues messages instead of printing them
+
+class _ProducerMessage:
+    """Queue item: a message from the candidate source, printed when the consumer reaches it."""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+def announce(message):
+    """
+    Prints a message from a candidate source (length transitions, end of range, ...). On the producer
+    thread the message is queued behind the candidates generated before it, so it is printed when the
+    typing loop gets there instead of up to a full queue ahead of it.
+    """
+    sink = getattr(_PRODUCER_STATE, 'announce', None)
+    if sink is None:
+        print(message)
+    else:
+        sink(message)
+
+def prefetch_candidates(candidates, queue_depth):
+    """
+    Runs the 'candidates' iterable (combination generator, custom list reader, ...) on a background
+    producer thread that keeps a bounded queue of up to queue_depth items filled ahead of the typing
+    loop, and yields them in order. Slow generation steps (length transitions, file reads) then
+    overlap with typing instead of stalling it. A queue_depth of 0 disables prefetching.
+    Errors raised by the source are re-raised in the consumer.
+    """
+    if queue_depth <= 0:
+        yield from candidates
+        return
+
+    buffer = queue.Queue(maxsize=queue_depth)
+    stop_producing = threading.Event()
+
+    def put(item):
+        # Retry with a timeout so the producer notices when the consumer has gone away
+        while not stop_producing.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        _PRODUCER_STATE.announce = lambda message: put(_ProducerMessage(message))
+        try:
+            for item in candidates:
+                if not put(item):
+                    return
+            put(_PRODUCER_DONE)
+        except Exception as e:
+            debug_print(f"Candidate producer failed: {e}.")
+            put(e)
+        finally:
+            if hasattr(candidates, 'close'):
+                candidates.close()
+
+    producer = threading.Thread(target=produce, name='candidate-producer', daemon=True)
+    producer.start()
+    debug_print(f"Started candidate producer thread with queue depth {queue_depth}.")
+    try:
+        while True:
+            try:
+                item = buffer.get(timeout=0.1)
+            except queue.Empty:
+                if STOP_EVENT.is_set():
+                    debug_print("Stop requested while waiting for the candidate producer.")
+                    return
+                continue
+            if item is _PRODUCER_DONE:
+                return
+            if isinstance(item, _ProducerMessage):
+                print(item.text)
+                continue
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop_producing.set()
+        # Free the queue so a producer blocked in put() wakes up and exits right away
+        while True:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                break
+        producer.join(timeout=1.0)
+        if producer.is_alive():
+            print("[WARNING] The candidate producer thread did not stop within 1 second. It is left running in the background.")
+
+# --- Output Backends ---
+class FailSafeTriggered(Exception):
+    """Raised by an output backend when its fail-safe stops the automation."""
+
+@contextlib.contextmanager
+def _pyautogui_failsafe():
+    """Turns pyautogui's fail-safe exception (mouse moved to a corner) into FailSafeTriggered."""
+    try:
+        yield
+    except pyautogui.FailSafeException as e:
+        raise FailSafeTriggered() from e
+
+class PyAutoGUIBackend:
+    """Default output backend: sends keystrokes and clicks through pyautogui, clipboard through pyperclip."""
+    name = 'pyautogui'
+
+    def start_run(self, failsafe_enabled):
+        pyautogui.FAILSAFE = failsafe_enabled
+        pyautogui.HIGHSPEED = False # The easter egg that was missed! Re-added.
+
+    def finish_run(self):
+        pass
+
+    def failsafe_enabled(self):
+        return pyautogui.FAILSAFE
+
+    def set_pause(self, seconds):
+        """Sets the pause applied after every action and returns the previous one."""
+        previous_pause = pyautogui.PAUSE
+        pyautogui.PAUSE = seconds
+        return previous_pause
+
+    def write(self, text, interval=0.0):
+        with _pyautogui_failsafe():
+            pyautogui.write(text, interval=interval)
+
+    def typewrite(self, text, interval=0.0):
+        with _pyautogui_failsafe():
+            pyautogui.typewrite(text, interval=interval)
+
+    def press(self, key):
+        with _pyautogui_failsafe():
+            pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        with _pyautogui_failsafe():
+            pyautogui.hotkey(*keys)
+
+    def paste(self):
+        """Pastes the clipboard into the focused window."""
+        self.hotkey('ctrl', 'v')
+
+    def click(self, x, y, button='left'):
+        with _pyautogui_failsafe():
+            pyautogui.click(x=x, y=y, button=button)
+
+    def screen_size(self):
+        """Returns the (width, height) of the primary screen."""
+        width, height = pyautogui.size()
+        return width, height
+
+    def move_to(self, x, y):
+        with _pyautogui_failsafe():
+            pyautogui.moveTo(x, y)
+
+    def mouse_down(self, x, y, button='left'):
+        with _pyautogui_failsafe():
+            pyautogui.mouseDown(x=x, y=y, button=button)
+
+    def mouse_up(self, x, y, button='left'):
+        with _pyautogui_failsafe():
+            pyautogui.mouseUp(x=x, y=y, button=button)
+
+    def scroll(self, x, y, dx, dy):
+        with _pyautogui_failsafe():
+            if dy:
+                pyautogui.scroll(dy, x=x, y=y)
+            if dx:
+                pyautogui.hscroll(dx, x=x, y=y)
+
+    def key_down(self, key):
+        with _pyautogui_failsafe():
+            pyautogui.keyDown(key)
+
+    def key_up(self, key):
+        with _pyautogui_failsafe():
+            pyautogui.keyUp(key)
+
+    def read_clipboard(self):
+        return pyperclip.paste()
+
+    def write_clipboard(self, text):
+        pyperclip.copy(text)
+
+class RecordingBackend:
+    """
+    Headless output backend that performs no real input. Every action is recorded with a
+    time.perf_counter() timestamp in memory (if keep_events; the last RECORDING_BACKEND_MAX_EVENTS
+    of the current run) and/or appended as a JSON line to log_path, so the generator-to-typing
+    pipeline can run at full speed without a display. The clipboard is simulated in memory.
+    """
+    name = 'recording'
+
+    def __init__(self, log_path=None, keep_events=True):
+        self.log_path = log_path
+        self.keep_events = keep_events
+        self.events = collections.deque(maxlen=RECORDING_BACKEND_MAX_EVENTS)
+        self.action_counts = {}
+        self.clipboard = ''
+        self.pause = 0.0
+        self._log_file = None
+        self._run_start_time = None
+
+    def _record(self, action, *args):
+        timestamp = time.perf_counter()
+        self.action_counts[action] = self.action_counts.get(action, 0) + 1
+        if self.keep_events:
+            self.events.append((timestamp, action, args))
+        if self._log_file:
+            self._log_file.write(json.dumps({'t': timestamp, 'action': action, 'args': args}) + '\n')
+
+    def start_run(self, failsafe_enabled):
+        # The backend is reused across runs: keep only this run's events and counts
+        self.events.clear()
+        self.action_counts = {}
+        if self.log_path and self._log_file is None:
+            self._log_file = open(self.log_path, 'a')
+        self._run_start_time = time.perf_counter()
+        self._record('start_run', failsafe_enabled)
+
+    def finish_run(self):
+        self._record('finish_run')
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
+        elapsed = time.perf_counter() - self._run_start_time if self._run_start_time else 0.0
+        total_actions = sum(self.action_counts.values())
+        print(f"[INFO] {self.name.capitalize()} backend: {total_actions} actions in {elapsed:.3f}s "
+              f"({total_actions / elapsed if elapsed else 0:,.0f} actions/s). Counts: {self.action_counts}")
+
+    def failsafe_enabled(self):
+        return False
+
+    def set_pause(self, seconds):
+        previous_pause = self.pause
+        self.pause = seconds
+        return previous_pause
+
+    def write(self, text, interval=0.0):
+        self._record('write', text)
+
+    def typewrite(self, text, interval=0.0):
+        self._record('typewrite', text)
+
+    def press(self, key):
+        self._record('press', key)
+
+    def hotkey(self, *keys):
+        self._record('hotkey', *keys)
+
+    def paste(self):
+        self._record('paste', self.clipboard)
+
+    def click(self, x, y, button='left'):
+        self._record('click', x, y, button)
+
+    def screen_size(self):
+        """There is no real screen, so coordinates are not bounds-checked."""
+        return None
+
+    def move_to(self, x, y):
+        self._record('move_to', x, y)
+
+    def mouse_down(self, x, y, button='left'):
+        self._record('mouse_down', x, y, button)
+
+    def mouse_up(self, x, y, button='left'):
+        self._record('mouse_up', x, y, button)
+
+    def scroll(self, x, y, dx, dy):
+        self._record('scroll', x, y, dx, dy)
+
+    def key_down(self, key):
+        self._record('key_down', key)
+
+    def key_up(self, key):
+        self._record('key_up', key)
+
+    def read_clipboard(self):
+        self._record('read_clipboard')
+        return self.clipboard
+
+    def write_clipboard(self, text):
+        self._record('write_clipboard', text)
+        self.clipboard = text
+
+class NullBackend(RecordingBackend):
+    """Headless output backend that only counts actions (nothing is kept or logged)."""
+    name = 'null'
+
+    def __init__(self):
+        super().__init__(keep_events=False)
+
+OUTPUT_BACKEND_NAMES = ('pyautogui', 'recording', 'null')
+_output_backend = None # Active backend instance, created on first use from settings
+_output_backend_setting = None # 'output_backend' value the active backend was created from (None if installed directly)
+
+def create_output_backend(backend_name):
+    """Creates an output backend by name: 'pyautogui', 'recording' (logs events) or 'null' (only counts them)."""
+    if backend_name == 'recording':
+        log_path = settings.get('recording_backend_log_path') or None
+        return RecordingBackend(log_path=log_path, keep_events=not log_path) # Events logged to a file are not also kept in memory
+    if backend_name == 'null':
+        return NullBackend()
+    if backend_name != 'pyautogui':
+        print(f"[WARNING] Unknown output backend '{backend_name}'. Using 'pyautogui'.")
+    return PyAutoGUIBackend()
+
+def get_output_backend():
+    """Returns the active output backend, (re)creating it from the 'output_backend' setting if needed."""
+    global _output_backend, _output_backend_setting
+    backend_name = settings.get('output_backend', DEFAULT_SETTINGS['output_backend'])
+    if _output_backend is None or (_output_backend_setting is not None and _output_backend_setting != backend_name):
+        _output_backend = create_output_backend(backend_name)
+        _output_backend_setting = backend_name
+        debug_print(f"Created '{backend_name}' output backend.")
+    return _output_backend
+
+def set_output_backend(backend):
+    """
+    Installs a specific backend instance (e.g. a RecordingBackend for benchmarks), overriding the
+    'output_backend' setting. Pass None to go back to the backend from settings.
+    """
+    global _output_backend, _output_backend_setting
+    _output_backend = backend
+    _output_backend_setting = None
+
+# --- Pacing Scheduler and Rate Limits ---
+def wait_until(deadline, spin_threshold=PACING_SPIN_THRESHOLD):
+    """
+    Waits until time.perf_counter() reaches deadline: sleeps (interruptibly, on STOP_EVENT) until
+    spin_threshold before it, then spins for the rest so the wake-up is sub-millisecond accurate.
+    Returns False if a stop was requested, True otherwise.
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > spin_threshold and STOP_EVENT.wait(remaining - spin_threshold):
+        return False
+    while time.perf_counter() < deadline:
+        if STOP_EVENT.is_set():
+            return False
+        time.sleep(0) # Let the producer and checkpoint threads run while spinning
+    return not STOP_EVENT.is_set()
+
+class PacingScheduler:
+    """
+    Paces a loop against absolute deadlines on the monotonic perf_counter clock.
+    Each pace(period) moves the deadline 'period' seconds past the previous deadline (not past
+    "now") and waits for it, so time already spent typing, clicking or printing is subtracted
+    and small overruns are made up by the next wait instead of accumulating as drift. After a
+    stall longer than one period the schedule restarts from now rather than bursting to catch up.
+    Deadlines are only used for a target rate; wait(period) is a plain minimum wait from now, for
+    delays that must separate two actions (click delays, delay_between_repetitions).
+    """
+    def __init__(self, spin_threshold=PACING_SPIN_THRESHOLD):
+        self.spin_threshold = spin_threshold
+        self.start_time = time.perf_counter()
+        self.deadline = self.start_time
+        self.items = 0
+        self.scheduled_time = 0.0 # Sum of all periods (what the items should have taken)
+        self.late_items = 0
+
+    def pace(self, period, items=1):
+        """Schedules 'items' items into the next 'period' seconds and waits for the deadline. Returns False on stop."""
+        self.items += items
+        self.scheduled_time += period
+        self.deadline += period
+        now = time.perf_counter()
+        if now >= self.deadline:
+            if period > 0:
+                self.late_items += items
+            if now - self.deadline > period:
+                self.deadline = now # Too far behind: don't burst to catch up
+            return not STOP_EVENT.is_set()
+        return wait_until(self.deadline, self.spin_threshold)
+
+    def wait(self, period, items=1):
+        """Waits 'period' seconds from now (at least that long after the last action). Returns False on stop."""
+        self.items += items
+        self.scheduled_time += period
+        self.deadline = time.perf_counter() + period # A later pace() continues from here
+        return wait_until(self.deadline, self.spin_threshold)
+
+    def achieved_rate(self):
+        """Items per second actually achieved since the scheduler was created."""
+        elapsed = time.perf_counter() - self.start_time
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+    def target_rate(self):
+        """Items per second the periods asked for, or None if nothing was paced."""
+        return self.items / self.scheduled_time if self.scheduled_time > 0 else None
+
+    def report(self):
+        """Prints the achieved vs. target rate."""
+        target_rate = self.target_rate()
+        if not self.items or target_rate is None:
+            return
+        achieved_rate = self.achieved_rate()
+        print(f"[INFO] Pacing: {achieved_rate:.2f} items/s achieved vs {target_rate:.2f} items/s target "
+              f"({100.0 * achieved_rate / target_rate:.1f}%, {self.late_items} items behind schedule).")
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: allows bursts of up to 'burst' actions, then 'rate' actions per second.
+    Taking more tokens than are available puts the bucket in debt and waits until it is repaid,
+    so batches larger than the burst size are still allowed, just paced.
+    """
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst # Start full, so a run may begin with a burst
+        self.updated = time.perf_counter()
+
+    def acquire(self, tokens=1):
+        """Takes 'tokens' tokens, waiting (interruptibly) until they are available. Returns False on stop."""
+        now = time.perf_counter()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= tokens
+        if self.tokens >= 0:
+            return True
+        return wait_until(now - self.tokens / self.rate)
+
+RATE_LIMIT_ACTION_CLASSES = ('typed_entry', 'key_press', 'macro_click')
+_rate_limiters = {} # Action class -> TokenBucket, rebuilt from 'rate_limits' at the start of every run
+
+def reset_rate_limiters():
+    """(Re)creates the token buckets from the 'rate_limits' setting, full. Classes with rate 0 are unlimited."""
+    _rate_limiters.clear()
+    rate_limits = settings.get('rate_limits', DEFAULT_SETTINGS['rate_limits'])
+    for action_class in RATE_LIMIT_ACTION_CLASSES:
+        limit = rate_limits.get(action_class) or {}
+        if float(limit.get('rate', 0)) > 0:
+            _rate_limiters[action_class] = TokenBucket(limit['rate'], limit.get('burst', 1))
+            debug_print(f"Rate limit for '{action_class}': {limit['rate']}/s, burst {limit.get('burst', 1)}.")
+
+def acquire_rate_limit(action_class, tokens=1):
+    """Waits until the action class's token bucket allows 'tokens' more actions. Returns False on stop."""
+    bucket = _rate_limiters.get(action_class)
+    if not bucket:
+        return True
+    wait_start = time.perf_counter()
+    acquired = bucket.acquire(tokens)
+    record_stage_time('sleep', time.perf_counter() - wait_start)
+    return acquired
+
+class AdaptiveDelayController:
+    """
+    Closed-loop (AIMD) delay between typed entries. observe() is fed how long each typed batch took
+    to emit (typing, clipboard round trips, Enter). A short moving average of the per-entry emission
+    time is compared with the median of the last ADAPTIVE_DELAY_WINDOW entries: when it rises above
+    that baseline by more than lag_tolerance (plus ADAPTIVE_DELAY_LAG_SLACK) the target is lagging
+    and the delay is multiplied by backoff_factor; while emission stays stable the delay shrinks by
+    decrease_step per batch (default: 1% of max_delay, so a full backoff recovers in ~100 batches).
+    """
+    def __init__(self, initial_delay, max_delay, min_delay=0.0, lag_tolerance=1.5, backoff_factor=2.0, backoff_floor=0.005, decrease_step=None, cooldown=5):
+        self.min_delay = min_delay
+        self.max_delay = max(max_delay, min_delay)
+        self.delay = min(max(initial_delay, self.min_delay), self.max_delay)
+        self.lag_tolerance = lag_tolerance
+        self.backoff_factor = backoff_factor
+        self.backoff_floor = backoff_floor
+        self.decrease_step = decrease_step if decrease_step is not None else (self.max_delay - self.min_delay) / 100.0
+        self.cooldown = cooldown # Batches to wait after a backoff before judging again
+        self.samples = collections.deque(maxlen=ADAPTIVE_DELAY_WINDOW)
+        self.recent_emission_time = None
+        self.batches_until_next_check = 0
+        self.backoffs = 0
+
+    def baseline(self):
+        """Median per-entry emission time over the rolling window (None until there are enough samples)."""
+        if len(self.samples) < 10:
+            return None
+        return statistics.median(self.samples)
+
+    def observe(self, emission_time, items=1):
+        """Feeds one batch's emission time and returns the updated per-entry delay."""
+        per_entry = emission_time / max(items, 1)
+        if self.recent_emission_time is None:
+            self.recent_emission_time = per_entry
+        else:
+            self.recent_emission_time += 0.3 * (per_entry - self.recent_emission_time)
+        baseline = self.baseline()
+        self.samples.append(per_entry)
+        if baseline is None:
+            return self.delay
+        if self.batches_until_next_check > 0:
+            self.batches_until_next_check -= 1
+            return self.delay
+
+        if self.recent_emission_time > baseline * self.lag_tolerance + ADAPTIVE_DELAY_LAG_SLACK:
+            self.delay = min(self.max_delay, max(self.delay * self.backoff_factor, self.backoff_floor))
+            self.backoffs += 1
+            self.batches_until_next_check = self.cooldown
+            debug_print(f"Input lag detected ({self.recent_emission_time * 1000:.2f} ms vs baseline {baseline * 1000:.2f} ms per entry). Delay raised to {self.delay:.4f}s.")
+        else:
+            self.delay = max(self.min_delay, self.delay - self.decrease_step)
+        return self.delay
+
+    def report(self):
+        """Prints where the delay settled."""
+        baseline = self.baseline()
+        baseline_text = f"{baseline * 1000:.2f} ms" if baseline is not None else "n/a"
+        print(f"[INFO] Adaptive delay: {self.delay * 1000:.1f} ms per entry at the end of the run "
+              f"(baseline emission time {baseline_text} per entry, {self.backoffs} backoffs).")
+
+def get_item_period():
+    """Seconds budgeted per typed item: 1/'target_items_per_second' if set, else 'delay_between_repetitions'."""
+    target_items_per_second = float(settings.get('target_items_per_second', DEFAULT_SETTINGS['target_items_per_second']))
+    if target_items_per_second > 0:
+        return 1.0 / target_items_per_second
+    return settings.get('delay_between_repetitions', DEFAULT_SETTINGS['delay_between_repetitions'])
+
+
+# --- Run Metrics (per-stage timings) ---
+RUN_METRIC_STAGES = ('generate', 'clipboard', 'type', 'paste', 'enter', 'macro_clicks', 'checkpoint', 'sleep')
+_active_run_metrics = None # RunMetrics of the run in progress (set by run_automation_loop), None outside runs
+
+def record_stage_time(stage, seconds):
+    """Adds one timing to the current run's stage histogram. Does nothing outside a run."""
+    if _active_run_metrics is not None:
+        _active_run_metrics.stages[stage].record(seconds)
+
+def format_duration(seconds):
+    """Formats a duration in seconds as e.g. '45s', '12m 05s', '3h 02m', '4d 07h' or '12.3 years'."""
+    if seconds is None:
+        return "unknown"
+    if seconds == math.inf:
+        return "forever"
+    if seconds >= 1e6 * 365.25 * 86400:
+        return f"{seconds / (365.25 * 86400):.2e} years"
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    if seconds < 86400:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds < 365 * 86400:
+        return f"{seconds // 86400}d {seconds % 86400 // 3600:02d}h"
+    return f"{seconds / (365.25 * 86400):,.1f} years"
+
+class LatencyHistogram:
+    """
+    Log-scale histogram of durations: LATENCY_HISTOGRAM_SUB_BUCKETS buckets per power of two,
+    so record() is a frexp and a dictionary increment and percentiles are accurate to a few percent
+    whatever the range (microseconds to seconds), without keeping every sample.
+    """
+    def __init__(self):
+        self.buckets = {} # Bucket key -> count. Key None holds zero durations
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """Adds one duration in seconds."""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds > 0:
+            mantissa, exponent = math.frexp(seconds) # mantissa is in [0.5, 1)
+            key = exponent * LATENCY_HISTOGRAM_SUB_BUCKETS + int((mantissa - 0.5) * 2 * LATENCY_HISTOGRAM_SUB_BUCKETS)
+        else:
+            key = None
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    @staticmethod
+    def _bucket_upper_bound(key):
+        if key is None:
+            return 0.0
+        exponent, sub_bucket = divmod(key, LATENCY_HISTOGRAM_SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub_bucket + 1) / (2.0 * LATENCY_HISTOGRAM_SUB_BUCKETS), exponent)
+
+    def percentile(self, percent):
+        """Returns the duration below which 'percent' % of the recorded durations fall (0.0 if empty)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100.0))
+        seen = self.buckets.get(None, 0)
+        if seen >= rank:
+            return 0.0
+        for key in sorted(key for key in self.buckets if key is not None):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return min(self._bucket_upper_bound(key), self.max)
+        return self.max
+
+    def summary(self):
+        """Count, total, mean, p50/p95/p99 and max in seconds, as a dictionary."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+class RunMetrics:
+    """
+    Per-stage timings of one automation run (see RUN_METRIC_STAGES), the typed item count and the
+    remaining work. add_items() prints a live stats line every 'summary_interval' seconds;
+    write_summary() saves everything as JSON so runs can be compared across settings and hosts.
+    """
+    def __init__(self, summary_interval=0.0):
+        self.stages = {stage: LatencyHistogram() for stage in RUN_METRIC_STAGES}
+        self.summary_interval = summary_interval
+        self.start_time = time.perf_counter()
+        self.next_summary_time = self.start_time + summary_interval
+        self.items = 0
+        self.remaining = None # Items left to the end of the keyspace, shard or list (None = unknown/infinite)
+        self.remaining_function = None
+
+    def add_items(self, items, remaining=None):
+        """
+        Counts typed items. 'remaining' is a callable returning the items left (or None); it is
+        only called when a stats line is due, so it may be relatively expensive.
+        """
+        self.items += items
+        self.remaining_function = remaining
+        if self.summary_interval > 0 and time.perf_counter() >= self.next_summary_time:
+            self.next_summary_time = time.perf_counter() + self.summary_interval
+            print(f"[INFO] Stats: {self.live_summary()}")
+
+    def update_remaining(self):
+        """Refreshes 'remaining' from the callable given to the last add_items()."""
+        if self.remaining_function is not None:
+            self.remaining = self.remaining_function()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def items_per_second(self):
+        elapsed = self.elapsed()
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self):
+        """Seconds left at the current rate, or None if the remaining work or the rate is unknown."""
+        rate = self.items_per_second()
+        if self.remaining is None or rate <= 0:
+            return None
+        return self.remaining / rate
+
+    def live_summary(self):
+        """One line: items, items/s, ETA and p50/p95/p99 (ms) of every stage that was timed."""
+        self.update_remaining()
+        parts = [f"{self.items:,} items", f"{self.items_per_second():.1f} items/s", f"ETA {format_duration(self.eta_seconds())}"]
+        for stage, histogram in self.stages.items():
+            if histogram.count:
+                parts.append(f"{stage} {histogram.percentile(50) * 1000:.2f}/{histogram.percentile(95) * 1000:.2f}/{histogram.percentile(99) * 1000:.2f} ms")
+        return " | ".join(parts)
+
+    def summary(self, extra=None):
+        """The run summary as a JSON-serialisable dictionary (stage times in seconds)."""
+        self.update_remaining()
+        summary = {
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host': platform.node(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'items': self.items,
+            'elapsed_seconds': self.elapsed(),
+            'items_per_second': self.items_per_second(),
+            'remaining_items': self.remaining,
+            'eta_seconds': self.eta_seconds(),
+            'stages': {stage: histogram.summary() for stage, histogram in self.stages.items() if histogram.count},
+        }
+        summary.update(extra or {})
+        return summary
+
+    def write_summary(self, file_path, extra=None):
+        """Writes summary(extra) to file_path as JSON (atomically). Returns True on success."""
+        try:
+            atomic_write_text(file_path, json.dumps(self.summary(extra), indent=4))
+            return True
+        except Exception as e:
+            print(f"[ERROR] Could not write the run summary to '{file_path}': {e}")
+            debug_print(f"Error writing run summary: {e}.")
+            return False
+
+def _timed_batches(batches, stage='generate'):
+    """Yields from 'batches', recording how long each next() took (generation or waiting on the producer) under 'stage'."""
+    iterator = iter(batches)
+    perf_counter = time.perf_counter
+    while True:
+        start = perf_counter()
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return
+        record_stage_time(stage, perf_counter() - start)
+        yield batch
+
+
+# --- Run Planner (keyspace size and ETA) ---
+def get_configured_items_per_second():
+    """
+    The rate the settings ask for: 'target_items_per_second' if set, else 1/'delay_between_repetitions'.
+    Both are upper bounds (time spent typing is not included). None if neither limits the rate.
+    """
+    target_items_per_second = float(settings.get('target_items_per_second', DEFAULT_SETTINGS['target_items_per_second']))
+    if target_items_per_second > 0:
+        return target_items_per_second
+    delay_between_repetitions = settings.get('delay_between_repetitions', DEFAULT_SETTINGS['delay_between_repetitions'])
+    return 1.0 / delay_between_repetitions if delay_between_repetitions > 0 else None
+
+def get_measured_items_per_second(mode):
+    """Items per second achieved by the last run of 'mode', from the JSON run summary, as (rate, finished_at) or (None, None)."""
+    summary_path = settings.get('metrics_summary_path', DEFAULT_SETTINGS['metrics_summary_path'])
+    if not summary_path or not os.path.isfile(summary_path):
+        return None, None
+    try:
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError) as e:
+        debug_print(f"Could not read run summary '{summary_path}': {e}.")
+        return None, None
+    if summary.get('mode') != mode or not summary.get('items_per_second'):
+        return None, None
+    return float(summary['items_per_second']), summary.get('finished_at')
+
+def plan_combination_run(shard=None, repetitions=0):
+    """
+    Plans a combination run: the exact keyspace size (Python ints, so any size is exact), the index
+    range of the shard, what the checkpoint says is already done and how many combinations remain
+    ('repetitions' caps them). Raises ValueError if the mask is invalid.
+    """
+    chars_set, min_len, max_len = get_combination_space()
+    plan = {'mode': 'combinations', 'min_length': min_len, 'max_length': max_len, 'shard': shard, 'repetitions': repetitions}
+    keyspace_size = get_keyspace_size(chars_set, min_len, max_len)
+    plan['keyspace_size'] = keyspace_size
+    plan['length_sizes'] = {length: count_combinations_for_length(length, chars_set) for length in range(min_len, max_len + 1)} if keyspace_size is not None else {}
+    range_start, range_end = 0, keyspace_size
+    if shard is not None and keyspace_size is not None:
+        range_start, range_end = get_shard_range(shard[0], shard[1], keyspace_size)
+    plan['range_start'], plan['range_end'] = range_start, range_end
+
+    last_index = read_checkpoint_index(get_combination_progress_file_path(shard), chars_set, min_len)
+    next_index = max(last_index + 1, range_start) if last_index is not None else range_start
+    plan['done'] = next_index - range_start
+    remaining = max(range_end - next_index, 0) if range_end is not None else None
+    if repetitions > 0:
+        remaining = min(remaining, repetitions) if remaining is not None else repetitions
+    plan['remaining'] = remaining
+    return plan
+
+def plan_custom_list_run(list_path, offset=0, line_number=0):
+    """
+    Plans a custom list run: entries in the list and entries left after the resume point, the
+    'byte_offset' and 'line_number' of load_custom_list_progress() (estimated from bytes without a line index).
+    """
+    file_size = os.path.getsize(list_path)
+    plan = {'mode': 'custom_list', 'list_path': list_path, 'file_size': file_size, 'estimated': False}
+    list_index = open_custom_list_index(list_path)
+    if list_index:
+        try:
+            plan['total'] = list_index.count
+            plan['done'] = list_index.entries_before(offset)
+        finally:
+            list_index.close()
+    elif is_compressed_list(list_path):
+        plan['done'], plan['total'], plan['estimated'] = line_number, None, True
+    else:
+        # No index: estimate from the average line length of the first megabyte
+        with open(list_path, 'rb') as f:
+            sample = f.read(1024 * 1024)
+        bytes_per_line = len(sample) / max(sample.count(b'\n'), 1)
+        plan['done'] = line_number
+        plan['total'] = plan['done'] + int((file_size - offset) / bytes_per_line) if sample else 0
+        plan['estimated'] = True
+    plan['remaining'] = max(plan['total'] - plan['done'], 0) if plan['total'] is not None else None
+    return plan
+
+def format_count(count):
+    """Formats a (possibly huge) integer count: '1,234,567', or '8.140e+399 (400 digits)' past 15 digits."""
+    digits = str(count)
+    if len(digits) <= 15:
+        return f"{count:,}"
+    return f"{digits[0]}.{digits[1:4]}e+{len(digits) - 1} ({len(digits)} digits)"
+
+def print_run_plan(plan):
+    """Prints the plan (keyspace, checkpoint, rate, projected duration) and warns about runs that would take years. Returns the projected seconds (or None)."""
+    print("\n--- Run Plan ---")
+    if plan['mode'] == 'combinations':
+        if plan['keyspace_size'] is None:
+            print(f"  Keyspace: infinite (lengths {plan['min_length']} and up, no maximum length).")
+        else:
+            print(f"  Keyspace: {format_count(plan['keyspace_size'])} combinations (lengths {plan['min_length']}-{plan['max_length']}).")
+            for length, count in plan['length_sizes'].items():
+                debug_print(f"Length {length}: {count:,} combinations.")
+        if plan['shard']:
+            print(f"  Shard {plan['shard'][0]}/{plan['shard'][1]}: indexes [{format_count(plan['range_start'])}, {format_count(plan['range_end'])}).")
+        if plan['done']:
+            print(f"  Already done (from the checkpoint): {format_count(plan['done'])} combinations.")
+        if plan['repetitions']:
+            print(f"  Limited to {plan['repetitions']:,} combinations by the repetitions.")
+    else:
+        total_text = f"{'about ' if plan['estimated'] else ''}{plan['total']:,}" if plan['total'] is not None else "an unknown number of"
+        print(f"  List: {total_text} entries ({plan['file_size']:,} bytes), {plan['done']:,} already done.")
+    remaining = plan['remaining']
+    if remaining is not None:
+        print(f"  Remaining: {format_count(remaining)}")
+    if settings.get('candidate_filter', DEFAULT_SETTINGS['candidate_filter']).get('enabled'):
+        print("  Candidate filter is enabled: these counts are before filtering, so the run will type fewer entries.")
+
+    configured_rate = get_configured_items_per_second()
+    measured_rate, measured_at = get_measured_items_per_second(plan['mode'])
+    if configured_rate:
+        print(f"  Configured rate: {configured_rate:,.2f} entries/s (upper bound, typing time not included).")
+    if measured_rate:
+        print(f"  Measured rate: {measured_rate:,.2f} entries/s (last run, {measured_at}).")
+    rate = min(measured_rate, configured_rate) if measured_rate and configured_rate else measured_rate or configured_rate
+    if remaining is None:
+        if plan['mode'] == 'combinations':
+            print("  Projected duration: forever (set a maximum length, a shard or repetitions to bound the run).")
+        else:
+            print("  Projected duration: unknown (build a line index for compressed lists to count their entries).")
+        return None
+    if not rate:
+        print("  Projected duration: unknown (no rate is configured and no run was measured yet).")
+        return None
+    try:
+        projected_seconds = remaining / rate
+    except OverflowError: # Keyspaces beyond ~1e308 do not fit a float
+        projected_seconds = math.inf
+    print(f"  Projected duration: {format_duration(projected_seconds)} at {rate:,.2f} entries/s.")
+    if projected_seconds > PLAN_WARNING_SECONDS:
+        advice = "Use a smaller keyspace (mask, lengths) or a higher rate"
+        if plan['mode'] == 'combinations' and projected_seconds != math.inf:
+            shards_needed = math.ceil(projected_seconds / PLAN_SHARD_TARGET_SECONDS)
+            advice += f", or split it into about {shards_needed:,} shards to finish each within {format_duration(PLAN_SHARD_TARGET_SECONDS)}"
+        print(f"[WARNING] This run would take {format_duration(projected_seconds)} and will most likely never finish. {advice}.")
+    return projected_seconds
+
+def plan_run(process_custom_list=False, custom_list_path=None, repetitions=0, shard=None, custom_list_progress=None):
+    """
+    Plans a run with the same arguments as run_automation_loop and prints the plan. Returns the projected
+    seconds (or None). custom_list_progress is the run's load_custom_list_progress() result (None = from the start).
+    """
+    try:
+        if process_custom_list:
+            progress = custom_list_progress or {'byte_offset': 0, 'line_number': 0}
+            return print_run_plan(plan_custom_list_run(custom_list_path, progress['byte_offset'], progress['line_number']))
+        return print_run_plan(plan_combination_run(shard, repetitions))
+    except (ValueError, OSError) as e: # The run itself reports invalid settings or files
+        debug_print(f"Could not plan the run: {e}.")
+        return None
+
+
+# --- Compiled Macro Plans ---
+# A macro plan is the click list compiled once into an immutable tuple of MacroStep tuples, so
+# replaying it needs no validation, defaults or dictionary lookups per click.
+MacroStep = collections.namedtuple('MacroStep', ['x', 'y', 'button', 'delay_after'])
+MACRO_CLICK_BUTTONS = ('left', 'right', 'middle')
+
+def compile_macro_plan(click_data=None, default_delay=None, screen_size=None):
+    """
+    Validates a macro click list (default: settings['macro_click_data']) once and returns it as a
+    tuple of MacroStep(x, y, button, delay_after). Entries that were never captured (None) are
+    skipped with a warning. Raises ValueError for malformed entries, unknown buttons, negative
+    delays or coordinates outside screen_size (width, height), if given.
+    """
+    if click_data is None:
+        click_data = settings.get('macro_click_data', DEFAULT_SETTINGS['macro_click_data'])
+    if default_delay is None:
+        default_delay = settings.get('delay_between_macro_clicks', DEFAULT_SETTINGS['delay_between_macro_clicks'])
+    steps = []
+    for i, click in enumerate(click_data):
+        if click is None:
+            print(f"[WARNING] Macro click {i+1} has no coordinates defined. Skipping this click.")
+            debug_print(f"Macro click {i+1} has no data.")
+            continue
+        try:
+            x, y = int(click['x']), int(click['y'])
+            delay_after = float(click.get('delay_after', default_delay))
+        except KeyError as e:
+            raise ValueError(f"Macro click {i+1} is missing {e}.")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Macro click {i+1} is malformed ({click!r}): {e}.")
+        button = click.get('click_type', 'left')
+        if button not in MACRO_CLICK_BUTTONS:
+            raise ValueError(f"Macro click {i+1} has an unknown click type '{button}' (use {', '.join(MACRO_CLICK_BUTTONS)}).")
+        if delay_after < 0:
+            raise ValueError(f"Macro click {i+1} has a negative delay ({delay_after}s).")
+        if screen_size and not (0 <= x < screen_size[0] and 0 <= y < screen_size[1]):
+            raise ValueError(f"Macro click {i+1} at ({x}, {y}) is outside the screen ({screen_size[0]}x{screen_size[1]}). Record it again.")
+        steps.append(MacroStep(x, y, button, delay_after))
+    debug_print(f"Compiled macro plan with {len(steps)} clicks.")
+    return tuple(steps)
+
+# --- Macro Click Schedule (per typed entry) ---
+MACRO_SCHEDULE_WHEN = ('before', 'after')
+
+def parse_macro_schedule(text):
+    """
+    Parses a schedule like 'before 1: 1; after 1: 2 3; after 500: 4' (clicks 1 before every entry,
+    clicks 2 and 3 after every entry, click 4 after every 500th) into 'macro_schedule' rules.
+    Leaving out the click numbers ('after 500') means all clicks. Raises ValueError on bad input.
+    """
+    rules = []
+    for part in text.split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        head, _, click_text = part.partition(':')
+        words = head.split()
+        if len(words) != 2 or words[0].lower() not in MACRO_SCHEDULE_WHEN or not words[1].isdigit() or int(words[1]) < 1:
+            raise ValueError(f"Invalid schedule rule '{part}'. Use 'before|after <every N entries>: <click numbers>'.")
+        clicks = click_text.replace(',', ' ').split()
+        if not all(click.isdigit() and int(click) >= 1 for click in clicks):
+            raise ValueError(f"Invalid click numbers in schedule rule '{part}'.")
+        rules.append({'when': words[0].lower(), 'every': int(words[1]), 'clicks': [int(click) for click in clicks]})
+    return rules
+
+def format_macro_schedule(rules):
+    """Formats 'macro_schedule' rules in the syntax accepted by parse_macro_schedule."""
+    return '; '.join(f"{rule['when']} {rule['every']}: {' '.join(str(click) for click in rule.get('clicks', []))}".rstrip(': ')
+                     for rule in rules)
+
+class MacroSchedule:
+    """
+    A 'macro_schedule' compiled once per run: (every, plan) pairs run before or after typed entries.
+    Item numbers are 1-based: a 'before' rule fires before entries 1, every+1, 2*every+1, ...
+    and an 'after' rule fires after entries every, 2*every, ...
+    """
+    def __init__(self, before_rules=(), after_rules=()):
+        self.before_rules = tuple(before_rules)
+        self.after_rules = tuple(after_rules)
+
+    def __bool__(self):
+        return bool(self.before_rules or self.after_rules)
+
+    def run_before(self, item_number, pacer=None):
+        """Runs the clicks due before entry item_number. Returns False if they were interrupted."""
+        for every, plan in self.before_rules:
+            if (item_number - 1) % every == 0 and not perform_macro_clicks(plan, pacer):
+                return False
+        return True
+
+    def run_after(self, item_number, pacer=None):
+        """Runs the clicks due after entry item_number. Returns False if they were interrupted."""
+        for every, plan in self.after_rules:
+            if item_number % every == 0 and not perform_macro_clicks(plan, pacer):
+                return False
+        return True
+
+def compile_macro_schedule(rules=None, click_data=None, screen_size=None):
+    """
+    Compiles 'macro_schedule' rules (default: from settings) into a MacroSchedule, validating every
+    referenced click once (see compile_macro_plan). Raises ValueError for invalid rules or clicks.
+    """
+    if rules is None:
+        rules = settings.get('macro_schedule', DEFAULT_SETTINGS['macro_schedule'])
+    if click_data is None:
+        click_data = settings.get('macro_click_data', DEFAULT_SETTINGS['macro_click_data'])
+    compiled = {'before': [], 'after': []}
+    for rule_number, rule in enumerate(rules, start=1):
+        when, every = rule.get('when'), rule.get('every', 1)
+        if when not in MACRO_SCHEDULE_WHEN or not isinstance(every, int) or every < 1:
+            raise ValueError(f"Macro schedule rule {rule_number} ({rule!r}) is invalid.")
+        clicks = rule.get('clicks') or range(1, len(click_data) + 1)
+        missing = [click for click in clicks if not 1 <= click <= len(click_data) or click_data[click - 1] is None]
+        if missing:
+            raise ValueError(f"Macro schedule rule {rule_number} uses click(s) {missing}, which are not defined ({len(click_data)} clicks recorded).")
+        plan = compile_macro_plan([click_data[click - 1] for click in clicks], screen_size=screen_size)
+        if plan:
+            compiled[when].append((every, plan))
+    debug_print(f"Compiled macro schedule: {len(compiled['before'])} 'before' and {len(compiled['after'])} 'after' rules.")
+    return MacroSchedule(compiled['before'], compiled['after'])
+
+# --- Macro Recorder and Replay ---
+# A recorded macro is a list of events (t, kind, *args), t being seconds since the recording started:
+#   (t, 'move', x, y)  (t, 'down', x, y, button)  (t, 'up', x, y, button)  (t, 'scroll', x, y, dx, dy)
+#   (t, 'key_down', key)  (t, 'key_up', key)
+# Drags are a 'down', the moves while the button is held, and an 'up'. Macro files are JSONL: a
+# header object on the first line, then one compact JSON array per event.
+MACRO_FILE_FORMAT = 'booty-macro'
+MACRO_FILE_VERSION = 1
+MACRO_EVENT_ARG_COUNTS = {'move': 2, 'down': 3, 'up': 3, 'scroll': 4, 'key_down': 1, 'key_up': 1}
+# 'keyboard' key names that pyautogui spells differently
+_PYAUTOGUI_KEY_NAMES = {
+    'left windows': 'winleft', 'right windows': 'winright', 'windows': 'win',
+    'right shift': 'shiftright', 'right ctrl': 'ctrlright', 'right alt': 'altright', 'alt gr': 'altright',
+    'page up': 'pageup', 'page down': 'pagedown', 'caps lock': 'capslock', 'num lock': 'numlock',
+    'scroll lock': 'scrolllock', 'print screen': 'printscreen',
+}
+
+class MacroRecorder:
+    """
+    Records mouse moves, clicks/drags, scrolls and key presses with their real timestamps
+    (pynput for the mouse, the 'keyboard' hook for keys) until the stop hotkey is pressed.
+    """
+    def __init__(self):
+        self.events = []
+        self.start_time = None
+        self._keys_down = set()
+
+    def _add(self, kind, *args):
+        self.events.append((round(time.perf_counter() - self.start_time, 4), kind) + args)
+
+    def on_move(self, x, y):
+        self._add('move', int(x), int(y))
+
+    def on_click(self, x, y, button, pressed):
+        self._add('down' if pressed else 'up', int(x), int(y), button.name)
+
+    def on_scroll(self, x, y, dx, dy):
+        self._add('scroll', int(x), int(y), int(dx), int(dy))
+
+    def on_key(self, event):
+        key = _PYAUTOGUI_KEY_NAMES.get(event.name, event.name)
+        if event.event_type == 'down':
+            if key in self._keys_down:
+                return # Auto-repeat while held: the replayed key_down repeats the same way
+            self._keys_down.add(key)
+            self._add('key_down', key)
+        else:
+            if key not in self._keys_down:
+                return # Released before recording started (e.g. the Enter that chose the menu option)
+            self._keys_down.discard(key)
+            self._add('key_up', key)
+
+    def record(self):
+        """Records until STOP_EVENT is set (the stop hotkey) and returns the events. The caller clears STOP_EVENT first."""
+        self.events = []
+        self._keys_down = set()
+        self.start_time = time.perf_counter()
+        key_hook = keyboard.hook(self.on_key)
+        try:
+            with mouse.Listener(on_move=self.on_move, on_click=self.on_click, on_scroll=self.on_scroll):
+                STOP_EVENT.wait()
+        finally:
+            keyboard.unhook(key_hook)
+        # Drop the key presses of the stop hotkey itself from the end of the recording
+        hotkey_keys = {_PYAUTOGUI_KEY_NAMES.get(key, key) for key in settings.get('stop_hotkey', DEFAULT_SETTINGS['stop_hotkey']).split('+')}
+        while self.events and self.events[-1][1] in ('key_down', 'key_up') and self.events[-1][2] in hotkey_keys:
+            self.events.pop()
+        return self.events
+
+def save_macro_recording(file_path, events, screen_size=None):
+    """Writes a recorded macro to a JSONL macro file (atomically)."""
+    lines = [json.dumps({'format': MACRO_FILE_FORMAT, 'version': MACRO_FILE_VERSION,
+                         'screen': list(screen_size) if screen_size else None, 'events': len(events)})]
+    lines.extend(json.dumps(list(event), separators=(',', ':')) for event in events)
+    atomic_write_text(file_path, '\n'.join(lines) + '\n')
+    debug_print(f"Saved {len(events)} macro events to '{file_path}'.")
+
+def load_macro_recording(file_path):
+    """Reads a JSONL macro file. Returns (events, header). Raises ValueError if it is not a valid macro file."""
+    with open(file_path, 'r') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != MACRO_FILE_FORMAT:
+            raise ValueError(f"'{file_path}' is not a macro file.")
+        if header.get('version') != MACRO_FILE_VERSION:
+            raise ValueError(f"Macro file '{file_path}' has unsupported version {header.get('version')}.")
+        events = []
+        for line_number, line in enumerate(f, start=2):
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+                t, kind = float(event[0]), event[1]
+                if MACRO_EVENT_ARG_COUNTS.get(kind) != len(event) - 2:
+                    raise ValueError(f"unknown event {event!r}")
+            except (ValueError, TypeError, IndexError) as e:
+                raise ValueError(f"Macro file '{file_path}' line {line_number} is invalid: {e}.")
+            events.append((t, kind) + tuple(event[2:]))
+    return events, header
+
+def _simplify_path(points, tolerance):
+    """
+    Ramer-Douglas-Peucker: returns the indexes of the points to keep so that no dropped point is
+    more than 'tolerance' pixels from the simplified path. The first and last points are always kept.
+    """
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        segment_length = (dx * dx + dy * dy) ** 0.5
+        farthest, farthest_distance = None, tolerance
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if segment_length:
+                distance = abs(dy * (px - x1) - dx * (py - y1)) / segment_length
+            else:
+                distance = ((px - x1) ** 2 + (py - y1) ** 2) ** 0.5
+            if distance > farthest_distance:
+                farthest, farthest_distance = i, distance
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [i for i, kept in enumerate(keep) if kept]
+
+def simplify_macro_moves(events, tolerance):
+    """
+    Simplifies every run of consecutive mouse moves with Ramer-Douglas-Peucker. Clicks, drags'
+    press/release points, scrolls and keys are untouched, so everything lands where it was recorded.
+    """
+    if tolerance <= 0:
+        return list(events)
+    simplified = []
+    run = []
+    for event in itertools.chain(events, [None]):
+        if event is not None and event[1] == 'move':
+            run.append(event)
+            continue
+        if run:
+            if len(run) > 2:
+                run = [run[i] for i in _simplify_path([(e[2], e[3]) for e in run], tolerance)]
+            simplified.extend(run)
+            run = []
+        if event is not None:
+            simplified.append(event)
+    return simplified
+
+def _release_held_input(release, *args):
+    """Releases a mouse button or key an interrupted replay left held. Failures are reported, not raised."""
+    try:
+        release(*args)
+    except Exception as e:
+        print(f"[WARNING] Could not release '{args[-1]}' after the macro replay stopped: {e or type(e).__name__}")
+        debug_print(f"Error releasing held input {args}: {e!r}.")
 
-        for combo_tuple in itertools.product(chars_set, repeat=length):
-            if STOP_SCRIPT: 
-                debug_print(f"STOP_SCRIPT detected inside combination generation for length {length}.")
-                return
-            
-            current_combo_str = ''.join(combo_tuple)
-            
-            # If we are resuming, skip until we pass the start_combination
-            if start_combination and not started_yielding:
-                if current_combo_str == start_combination:
-                    started_yielding = True
-                    debug_print(f"Passed start_combination '{start_combination}', starting to yield.")
-                continue # Keep skipping until we've passed it
-            
-            yield current_combo_str
+def replay_macro(events, speed=1.0):
+    """
+    Replays recorded macro events through the output backend. speed 1 keeps the recorded timing,
+    N plays N times faster and 0 plays as fast as possible. Events are scheduled against absolute
+    deadlines, so timing does not drift over long macros.
+    Returns True when finished, False if interrupted by the stop hotkey, Fail-Safe or an error.
+    Mouse buttons and keys pressed by the replay and not released yet are released when it stops.
+    """
+    backend = get_output_backend()
+    dispatch = {'move': backend.move_to, 'down': backend.mouse_down, 'up': backend.mouse_up,
+                'scroll': backend.scroll, 'key_down': backend.key_down, 'key_up': backend.key_up}
+    original_pause = backend.set_pause(0) # The timing comes from the recording
+    held_buttons = {} # Button -> (x, y) of the last mouse event, for buttons pressed and not released yet
+    held_keys = {} # Keys pressed and not released yet (a dict keeps them in press order)
+    start_time = time.perf_counter()
+    try:
+        for t, kind, *args in events:
+            if speed > 0:
+                if not wait_until(start_time + t / speed):
+                    return False
+            elif STOP_EVENT.is_set():
+                return False
+            dispatch[kind](*args)
+            if kind == 'down':
+                held_buttons[args[2]] = args[:2]
+            elif kind == 'up':
+                held_buttons.pop(args[2], None)
+            elif kind == 'key_down':
+                held_keys[args[0]] = None
+            elif kind == 'key_up':
+                held_keys.pop(args[0], None)
+            elif kind == 'move':
+                for button in held_buttons:
+                    held_buttons[button] = args # A drag: release where the mouse is now
+        return True
+    except FailSafeTriggered:
+        print("\n[INFO] PyAutoGUI Fail-Safe triggered during macro replay. Replay stopped.")
+        debug_print("PyAutoGUI Fail-Safe triggered during macro replay.")
+        return False
+    except Exception as e:
+        print(f"[ERROR] An error occurred during macro replay: {e}")
+        debug_print(f"Error during macro replay: {e}.")
+        return False
+    finally:
+        for button, (x, y) in held_buttons.items():
+            _release_held_input(backend.mouse_up, x, y, button)
+        for key in reversed(list(held_keys)):
+            _release_held_input(backend.key_up, key)
+        backend.set_pause(original_pause)
+
+def record_macro_to_file(file_path):
+    """Records a macro (after the initial delay) until the stop hotkey is pressed and saves it. Returns True on success."""
+    initial_delay = settings.get('initial_delay_before_automation', DEFAULT_SETTINGS['initial_delay_before_automation'])
+    stop_hotkey_display = settings.get('stop_hotkey', DEFAULT_SETTINGS['stop_hotkey'])
+    print(f"\n[INFO] Recording starts in {initial_delay} seconds. Press '{stop_hotkey_display}' to finish recording.")
+    clear_stop_request()
+    if STOP_EVENT.wait(initial_delay): # Cut short by the stop hotkey
+        print("[INFO] Recording cancelled before it started.")
+        debug_print("Stop requested during the macro recording delay.")
+        return False
+    print("[INFO] Recording... (mouse moves, clicks, drags, scrolls and keys)")
+    events = MacroRecorder().record()
+    try:
+        save_macro_recording(file_path, events, get_output_backend().screen_size())
+    except Exception as e:
+        print(f"[ERROR] Could not save macro to '{file_path}': {e}")
+        debug_print(f"Error saving macro recording: {e}.")
+        return False
+    counts = collections.Counter(event[1] for event in events)
+    duration = events[-1][0] if events else 0.0
+    print(f"[INFO] Recorded {len(events)} events in {duration:.1f}s to '{file_path}': {dict(counts)}.")
+    return True
+
+def replay_macro_file(file_path, speed=None, simplify_tolerance=None, repetitions=1):
+    """Loads a macro file and replays it 'repetitions' times (0 = until stopped). Returns True if it finished."""
+    if speed is None:
+        speed = float(settings.get('macro_replay_speed', DEFAULT_SETTINGS['macro_replay_speed']))
+    if simplify_tolerance is None:
+        simplify_tolerance = float(settings.get('macro_simplify_tolerance', DEFAULT_SETTINGS['macro_simplify_tolerance']))
+    try:
+        events, header = load_macro_recording(file_path)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Could not load macro: {e}")
+        return False
+    backend = get_output_backend()
+    recorded_screen, screen_size = header.get('screen'), backend.screen_size()
+    if recorded_screen and screen_size and tuple(recorded_screen) != tuple(screen_size):
+        print(f"[WARNING] Macro was recorded on a {recorded_screen[0]}x{recorded_screen[1]} screen, this one is {screen_size[0]}x{screen_size[1]}. Positions are replayed unchanged.")
+    replay_events = simplify_macro_moves(events, simplify_tolerance)
+    if len(replay_events) != len(events):
+        print(f"[INFO] Move simplification: {len(events)} -> {len(replay_events)} events.")
+
+    initial_delay = settings.get('initial_delay_before_automation', DEFAULT_SETTINGS['initial_delay_before_automation'])
+    speed_text = "as fast as possible" if speed <= 0 else f"at {speed}x speed"
+    print(f"\n[INFO] Replaying '{file_path}' {speed_text} in {initial_delay} seconds...")
+    print(f"[INFO] Press '{settings.get('stop_hotkey', DEFAULT_SETTINGS['stop_hotkey'])}' to stop the replay at any time.")
+    STOP_EVENT.clear()
+    backend.start_run(settings.get('pyautogui_failsafe_enabled', DEFAULT_SETTINGS['pyautogui_failsafe_enabled']))
+    STOP_EVENT.wait(initial_delay)
+    completed = 0
+    finished = not STOP_EVENT.is_set()
+    while finished and (repetitions == 0 or completed < repetitions):
+        finished = replay_macro(replay_events, speed)
+        if finished:
+            completed += 1
+    backend.finish_run()
+    print(f"[INFO] Macro replayed {completed} time(s).{'' if finished else ' Replay was stopped.'}")
+    return finished
 
 
 # --- Automation Core Functions ---
-def perform_macro_clicks():
-    """Performs the sequence of macro clicks defined in settings."""
-    debug_print(f"Starting macro clicks. Total clicks: {len(settings['macro_click_data'])}.")
-    
-    # Cache settings for performance within the loop
-    default_delay_between_macro_clicks = settings.get('delay_between_macro_clicks', DEFAULT_SETTINGS['delay_between_macro_clicks'])
+# Outcome of a run, returned by run_automation_loop and run_macro_clicks_only
+RUN_COMPLETED = 'completed' # The keyspace, shard, list or requested repetitions were finished
+RUN_STOPPED = 'stopped' # Stopped by the stop hotkey or a signal (progress is saved; the next run resumes)
+RUN_FAILED = 'failed' # Stopped by an error, the fail-safe or invalid settings
+
+def request_stop():
+    """Stops the current run on behalf of the user (stop hotkey, Ctrl+C or a termination signal)."""
+    global stop_requested_by_user
+    stop_requested_by_user = True
+    STOP_EVENT.set()
+
+def clear_stop_request():
+    """Resets the stop signal at the start of a run."""
+    global stop_requested_by_user
+    stop_requested_by_user = False
+    STOP_EVENT.clear()
+
+def get_run_outcome(completed):
+    """RUN_COMPLETED if the run finished its work, else RUN_STOPPED (user stop) or RUN_FAILED."""
+    if completed:
+        return RUN_COMPLETED
+    return RUN_STOPPED if stop_requested_by_user else RUN_FAILED
+
+def perform_macro_clicks(plan=None, pacer=None):
+    """
+    Performs the sequence of macro clicks. 'plan' is a compiled macro plan (see compile_macro_plan);
+    if not given, the clicks in settings are compiled first. 'pacer' is the run's PacingScheduler,
+    so click delays are scheduled on the same timeline as typing (a new one is used if not given).
+    Returns True on success, False if interrupted by Fail-Safe, the stop hotkey or an error.
+    """
+    backend = get_output_backend()
+    if plan is None:
+        try:
+            plan = compile_macro_plan(screen_size=backend.screen_size())
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return False
+    debug_print(f"Starting macro clicks. Total clicks: {len(plan)}.")
 
-    if not settings['macro_click_data']:
+    if not plan:
         print("[WARNING] No macro click coordinates are defined. Skipping macro clicks.")
         return True # Consider it successful if there's nothing to do
 
-    for i, click_data in enumerate(settings['macro_click_data']):
-        if STOP_SCRIPT:
-            debug_print(f"STOP_SCRIPT detected during macro click {i+1}. Stopping.")
-            return False # Indicate interruption
-        if click_data is None:
-            print(f"[WARNING] Macro click {i+1} has no coordinates defined. Skipping this click.")
-            debug_print(f"Macro click {i+1} has no data.")
-            continue
-        # Directly access click_data fields, using .get for defaults
-        x, y = click_data['x'], click_data['y']
-        click_type = click_data.get('click_type', 'left')
-        delay_after = click_data.get('delay_after', default_delay_between_macro_clicks)
-
-        try:
-            debug_print(f"Performing {click_type} click at ({x}, {y}). Delay after: {delay_after}s.")
-            pyautogui.click(x=x, y=y, button=click_type)
-            time.sleep(delay_after)
-        except pyautogui.FailSafeException:
-            print("\n[INFO] PyAutoGUI Fail-Safe triggered during macro clicks. Automation stopped.")
-            debug_print("PyAutoGUI Fail-Safe triggered during macro clicks.")
-            return False # Indicate Fail-Safe
-        except Exception as e:
-            print(f"[ERROR] An error occurred during macro click {i+1} at ({x}, {y}): {e}")
-            debug_print(f"Error during macro click: {e}.")
-            return False # Indicate error
-    debug_print("All macro clicks completed.")
-    return True # Indicate success
+    if pacer is None:
+        pacer = PacingScheduler()
+    click = backend.click
+    clicks_start = time.perf_counter()
+    try:
+        for x, y, button, delay_after in plan:
+            if not acquire_rate_limit('macro_click'):
+                break
+            click(x, y, button)
+            if not pacer.wait(delay_after, 0): # Returns as soon as the stop hotkey is pressed
+                break
+        else:
+            debug_print("All macro clicks completed.")
+            return True # Indicate success
+        debug_print("Stop requested during macro clicks. Stopping.")
+        return False # Indicate interruption
+    except FailSafeTriggered:
+        print("\n[INFO] PyAutoGUI Fail-Safe triggered during macro clicks. Automation stopped.")
+        debug_print("PyAutoGUI Fail-Safe triggered during macro clicks.")
+        return False # Indicate Fail-Safe
+    except Exception as e:
+        print(f"[ERROR] An error occurred during macro clicks: {e}")
+        debug_print(f"Error during macro click: {e}.")
+        return False # Indicate error
+    finally:
+        record_stage_time('macro_clicks', time.perf_counter() - clicks_start) # Includes the delays after clicks
 
 def type_string(text_to_type):
     """
     Types a given string using the configured typing method.
-    Returns True on success, False if interrupted by Fail-Safe or STOP_SCRIPT.
+    Returns True on success, False if interrupted by Fail-Safe or the stop hotkey.
     """
     debug_print(f"Attempting to type: '{text_to_type}'. Method: '{settings['typing_method']}'.")
     # Cache settings at function entry
@@ -667,39 +3143,57 @@ def type_string(text_to_type):
     pyautogui_write_interval = settings.get('pyautogui_write_interval', DEFAULT_SETTINGS['pyautogui_write_interval'])
     pyautogui_global_pause = settings.get('pyautogui_global_pause', DEFAULT_SETTINGS['pyautogui_global_pause'])
     
-    original_pyautogui_pause = pyautogui.PAUSE # Store original to restore later
+    if not acquire_rate_limit('typed_entry'):
+        return False # Stopped while waiting for the rate limit
+    backend = get_output_backend()
+    original_pause = backend.set_pause(pyautogui_global_pause) # Store original to restore later
+    perf_counter = time.perf_counter
     try:
-        pyautogui.PAUSE = pyautogui_global_pause
+        stage_start = perf_counter()
         if typing_method == 'pyautogui_write':
-            pyautogui.write(text_to_type, interval=pyautogui_write_interval)
+            backend.write(text_to_type, interval=pyautogui_write_interval)
+            record_stage_time('type', perf_counter() - stage_start)
             debug_print("Used pyautogui.write.")
         elif typing_method == 'pyautogui_typewrite':
             # pyautogui.typewrite is generally slower and handles special chars directly
-            pyautogui.typewrite(text_to_type, interval=pyautogui_write_interval)
+            backend.typewrite(text_to_type, interval=pyautogui_write_interval)
+            record_stage_time('type', perf_counter() - stage_start)
             debug_print("Used pyautogui.typewrite.")
         elif typing_method == 'pyperclip_safe':
             # Copy to clipboard, paste, then restore original clipboard content
-            original_clipboard = pyperclip.paste()
-            pyperclip.copy(text_to_type)
-            pyautogui.hotkey('ctrl', 'v')
-            pyperclip.copy(original_clipboard) # Restore original clipboard
+            original_clipboard = backend.read_clipboard()
+            backend.write_clipboard(text_to_type)
+            paste_start = perf_counter()
+            backend.paste()
+            paste_end = perf_counter()
+            backend.write_clipboard(original_clipboard) # Restore original clipboard
+            record_stage_time('clipboard', paste_start - stage_start + perf_counter() - paste_end)
+            record_stage_time('paste', paste_end - paste_start)
             debug_print("Used pyperclip_safe.")
         elif typing_method == 'pyperclip_all':
             # Copy to clipboard and paste, leaving the text on clipboard
-            pyperclip.copy(text_to_type)
-            pyautogui.hotkey('ctrl', 'v')
+            backend.write_clipboard(text_to_type)
+            paste_start = perf_counter()
+            backend.paste()
+            record_stage_time('clipboard', paste_start - stage_start)
+            record_stage_time('paste', perf_counter() - paste_start)
             debug_print("Used pyperclip_all.")
         else:
             print(f"[WARNING] Unknown typing method '{typing_method}'. Defaulting to 'pyautogui_write'.")
-            pyautogui.write(text_to_type, interval=pyautogui_write_interval)
+            backend.write(text_to_type, interval=pyautogui_write_interval)
+            record_stage_time('type', perf_counter() - stage_start)
             debug_print("Used default pyautogui.write due to unknown method.")
         
         # ADD THIS LINE TO PRESS ENTER AFTER TYPING
-        pyautogui.press('enter') 
+        if not acquire_rate_limit('key_press'):
+            return False # Stopped while waiting for the rate limit
+        stage_start = perf_counter()
+        backend.press('enter') 
+        record_stage_time('enter', perf_counter() - stage_start)
         debug_print("Pressed 'enter' after typing.")
 
         return True # Typing successful
-    except pyautogui.FailSafeException:
+    except FailSafeTriggered:
         print("\n[INFO] PyAutoGUI Fail-Safe triggered during typing. Automation stopped.")
         debug_print("PyAutoGUI Fail-Safe triggered during typing.")
         return False # Indicate Fail-Safe
@@ -708,198 +3202,410 @@ def type_string(text_to_type):
         debug_print(f"Error during typing: {e}.")
         return False # Indicate error
     finally:
-        pyautogui.PAUSE = original_pyautogui_pause # Restore original pause after action
+        backend.set_pause(original_pause) # Restore original pause after action
+
+def get_typing_batch_size():
+    """Returns how many entries are typed per action: 'clipboard_batch_size' for pyperclip_batch, otherwise 1."""
+    if settings.get('typing_method', DEFAULT_SETTINGS['typing_method']) != 'pyperclip_batch':
+        return 1
+    return max(1, int(settings.get('clipboard_batch_size', DEFAULT_SETTINGS['clipboard_batch_size'])))
+
+def _batched(iterable, batch_size):
+    """Yields lists of up to batch_size consecutive items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def type_batch(texts_to_type):
+    """
+    Types several entries with a single paste: joins them with newlines, pastes once and presses
+    Enter once, restoring the original clipboard a single time per batch. Only suitable for targets
+    that accept newline-separated input. Falls back to type_string for non-batch typing methods.
+    Returns True on success, False if interrupted by Fail-Safe or an error.
+    """
+    if settings.get('typing_method', DEFAULT_SETTINGS['typing_method']) != 'pyperclip_batch':
+        return all(type_string(text) for text in texts_to_type)
+    debug_print(f"Attempting to type a batch of {len(texts_to_type)} entries with one paste.")
+    pyautogui_global_pause = settings.get('pyautogui_global_pause', DEFAULT_SETTINGS['pyautogui_global_pause'])
+    if not acquire_rate_limit('typed_entry', len(texts_to_type)):
+        return False # Stopped while waiting for the rate limit
+    backend = get_output_backend()
+    original_pause = backend.set_pause(pyautogui_global_pause)
+    perf_counter = time.perf_counter
+    try:
+        stage_start = perf_counter()
+        original_clipboard = backend.read_clipboard()
+        backend.write_clipboard('\n'.join(texts_to_type))
+        paste_start = perf_counter()
+        backend.paste()
+        paste_end = perf_counter()
+        backend.write_clipboard(original_clipboard) # Restore original clipboard once per batch
+        record_stage_time('clipboard', paste_start - stage_start + perf_counter() - paste_end)
+        record_stage_time('paste', paste_end - paste_start)
+        if not acquire_rate_limit('key_press'):
+            return False # Stopped while waiting for the rate limit
+        stage_start = perf_counter()
+        backend.press('enter')
+        record_stage_time('enter', perf_counter() - stage_start)
+        debug_print("Used pyperclip_batch.")
+        return True
+    except FailSafeTriggered:
+        print("\n[INFO] PyAutoGUI Fail-Safe triggered during typing. Automation stopped.")
+        debug_print("PyAutoGUI Fail-Safe triggered during batch typing.")
+        return False
+    except Exception as e:
+        print(f"[ERROR] An error occurred during typing: {e}")
+        debug_print(f"Error during batch typing: {e}.")
+        return False
+    finally:
+        backend.set_pause(original_pause)
+
+def _remaining_combinations(range_end, last_index, repetitions=0, iteration_count=0):
+    """Combinations left after last_index: to range_end and/or the repetition limit. None if unbounded."""
+    remaining = None
+    if range_end is not None and last_index is not None:
+        remaining = max(range_end - last_index - 1, 0)
+    if repetitions > 0:
+        remaining = min(remaining, repetitions - iteration_count) if remaining is not None else repetitions - iteration_count
+    return remaining
+
+def get_run_summary_settings(process_custom_list, shard, completed):
+    """The run description stored next to the timings in the JSON run summary, so runs can be compared."""
+    return {
+        'mode': 'custom_list' if process_custom_list else 'combinations',
+        'shard': list(shard) if shard else None,
+        'completed': completed,
+        'settings': {key: settings.get(key, DEFAULT_SETTINGS[key]) for key in (
+            'typing_method', 'output_backend', 'clipboard_batch_size', 'producer_queue_depth',
+            'delay_between_repetitions', 'target_items_per_second', 'adaptive_delay_enabled',
+            'pyautogui_global_pause', 'pyautogui_write_interval', 'checkpoint_every_items',
+            'checkpoint_every_seconds', 'rate_limits', 'candidate_filter')},
+    }
 
-def run_automation_loop(include_macro_clicks, process_custom_list=False, custom_list_path=None, repetitions=0):
+def run_automation_loop(include_macro_clicks, process_custom_list=False, custom_list_path=None, repetitions=0, shard=None):
     """
     Main automation loop. If process_custom_list is True, it reads and types lines from a file.
     Otherwise, it generates combinations. 'repetitions' defines how many times the whole loop should repeat (0 for infinite).
+    'shard' is an optional (shard_number, shard_count) tuple restricting the generator to that shard's index range.
+    Returns the run outcome: RUN_COMPLETED, RUN_STOPPED or RUN_FAILED.
     """
-    global STOP_SCRIPT
-    STOP_SCRIPT = False # Reset flag for a new run
+    clear_stop_request() # Reset the stop signal for a new run
     automation_completed_naturally = False # Flag to track natural completion
 
     # Cache frequently used settings values at the start of the loop for performance
     initial_delay = settings.get('initial_delay_before_automation', DEFAULT_SETTINGS['initial_delay_before_automation'])
     delay_between_repetitions = settings.get('delay_between_repetitions', DEFAULT_SETTINGS['delay_between_repetitions'])
+    item_period = get_item_period()
+    target_items_per_second = float(settings.get('target_items_per_second', DEFAULT_SETTINGS['target_items_per_second']))
+    batch_size = get_typing_batch_size()
+    producer_queue_depth = settings.get('producer_queue_depth', DEFAULT_SETTINGS['producer_queue_depth'])
     pyautogui_failsafe_enabled = settings.get('pyautogui_failsafe_enabled', DEFAULT_SETTINGS['pyautogui_failsafe_enabled'])
     pyautogui_global_pause = settings.get('pyautogui_global_pause', DEFAULT_SETTINGS['pyautogui_global_pause'])
     stop_hotkey_display = settings.get('stop_hotkey', DEFAULT_SETTINGS['stop_hotkey'])
-    configured_failsafe_corners = settings.get('pyautogui_failsafe_corners', DEFAULT_SETTINGS['pyautogui_failsafe_corners'])
     shutdown_on_completion_enabled = settings.get('shutdown_on_completion', DEFAULT_SETTINGS['shutdown_on_completion']) # NEW: Get shutdown setting
 
-    pyautogui.FAILSAFE = pyautogui_failsafe_enabled
-    pyautogui.HIGHSPEED = False # The easter egg that was missed! Re-added.
-
-    # Set PyAutoGUI failsafe corners
-    corner_map = {
-        'top_left': (0, 0),
-        'top_right': (pyautogui.size().width - 1, 0),
-        'bottom_left': (0, pyautogui.size().height - 1),
-        'bottom_right': (pyautogui.size().width - 1, pyautogui.size().height - 1)
-    }
-    # Clear failsafe points and add only the configured ones
-    """
-    pyautogui.DEFAULTS['failSafePoints'] = []
-    for corner_name in configured_failsafe_corners:
-        if corner_name in corner_map:
-            pyautogui.DEFAULTS['failSafePoints'].append(corner_map[corner_name])
-            debug_print(f"Added failsafe corner: {corner_name} {corner_map[corner_name]}")
-        else:
-            debug_print(f"[WARNING] Unknown failsafe corner: {corner_name}")
-    """
+    backend = get_output_backend()
+    macro_plan = ()
+    macro_schedule = MacroSchedule()
+    if include_macro_clicks:
+        try:
+            # Validated once for the whole run
+            if settings.get('macro_schedule', DEFAULT_SETTINGS['macro_schedule']):
+                macro_schedule = compile_macro_schedule(screen_size=backend.screen_size())
+            else:
+                macro_plan = compile_macro_plan(screen_size=backend.screen_size())
+        except ValueError as e:
+            print(f"[ERROR] {e} Returning to main menu.")
+            handle_enter_to_continue()
+            return RUN_FAILED
+        if macro_schedule and batch_size > 1:
+            print("[INFO] A macro click schedule is set: typing one entry at a time instead of batches.")
+            batch_size = 1
+    try:
+        candidate_filter = compile_candidate_filter() # Compiled once for the whole run (None = no filter)
+    except ValueError as e:
+        print(f"[ERROR] {e} Fix it in the Combination Generator Options. Returning to main menu.")
+        handle_enter_to_continue()
+        return RUN_FAILED
+    if candidate_filter:
+        print("[INFO] Candidate filter is ENABLED: entries that fail its rules are skipped, not typed.")
+    backend.start_run(pyautogui_failsafe_enabled) # Fail-safe corners are applied by update_pyautogui_failsafe_points()
+
+    custom_list_progress = None
+    if process_custom_list:
+        custom_list_path = custom_list_path or settings.get('progress_file_for_custom_list_path', DEFAULT_SETTINGS['progress_file_for_custom_list_path'])
+        if os.path.isfile(custom_list_path):
+            custom_list_progress = load_custom_list_progress(custom_list_path) # Loaded once, for the plan and the run
+    # Size of the job and how long it will take, shown during the initial delay so a hopeless run can be stopped
+    plan_run(process_custom_list, custom_list_path, repetitions, shard, custom_list_progress)
     print(f"\n[INFO] Starting automation in {initial_delay} seconds...")
     print(f"[INFO] Press '{stop_hotkey_display}' to stop the script at any time.")
-    if pyautogui.FAILSAFE:
+    if backend.name != 'pyautogui':
+        print(f"[INFO] Output backend: '{settings['output_backend']}' (no real keystrokes or clicks are sent).")
+    elif backend.failsafe_enabled():
         print("[INFO] PyAutoGUI Fail-Safe is ENABLED. Move your mouse to a corner of the screen to stop.")
     else:
         print("[INFO] PyAutoGUI Fail-Safe is DISABLED. Be cautious!")
-    debug_print(f"Initial delay: {initial_delay}s. Repetition delay: {delay_between_repetitions}s.")
-    time.sleep(initial_delay)
+    debug_print(f"Initial delay: {initial_delay}s. Repetition delay: {delay_between_repetitions}s. Target rate: {target_items_per_second} items/s.")
+    STOP_EVENT.wait(initial_delay) # Cut short by the stop hotkey
+    reset_rate_limiters()
+    pacer = PacingScheduler()
+    global _active_run_metrics
+    metrics = _active_run_metrics = RunMetrics(float(settings.get('metrics_summary_interval', DEFAULT_SETTINGS['metrics_summary_interval'])))
+    delay_controller = None
+    if settings.get('adaptive_delay_enabled', DEFAULT_SETTINGS['adaptive_delay_enabled']):
+        delay_controller = AdaptiveDelayController(delay_between_repetitions, settings.get('adaptive_delay_max', DEFAULT_SETTINGS['adaptive_delay_max']))
+        print("[INFO] Adaptive delay is ENABLED: the delay between entries follows the target's input lag.")
+
+    def pace_after_batch(items, emission_time, default_period):
+        """
+        Waits before the next batch: adaptive delay if enabled, else the target rate (paced against
+        deadlines), else a plain wait of default_period after the batch (None = no wait).
+        """
+        sleep_start = time.perf_counter()
+        if delay_controller:
+            delay_controller.observe(emission_time, items)
+            paced = pacer.wait(delay_controller.delay * items, items)
+        elif target_items_per_second > 0:
+            paced = pacer.pace(item_period * items, items)
+        elif default_period is not None:
+            paced = pacer.wait(default_period, items)
+        else:
+            return True
+        record_stage_time('sleep', time.perf_counter() - sleep_start)
+        return paced
 
     iteration_count = 0
     while repetitions == 0 or iteration_count < repetitions:
-        if STOP_SCRIPT:
+        if STOP_EVENT.is_set():
             print("\n[INFO] Script stopped by user hotkey.")
-            debug_print("STOP_SCRIPT detected, breaking repetition loop.")
-            break # Exit the loop if STOP_SCRIPT is True
+            debug_print("Stop requested, breaking repetition loop.")
+            break # Exit the loop if a stop was requested
 
         if process_custom_list:
-            file_path = custom_list_path or settings.get('progress_file_for_custom_list_path', DEFAULT_SETTINGS['progress_file_for_custom_list_path'])
+            file_path = custom_list_path
             debug_print(f"Processing custom list from: '{file_path}'.")
-            try:
-                with open(file_path, 'r') as f:
-                    lines = f.readlines()
-                lines = [line.strip() for line in lines if line.strip()]
-                debug_print(f"Loaded {len(lines)} lines from custom list file.")
-            except FileNotFoundError:
+            if not os.path.isfile(file_path):
                 print(f"[ERROR] Custom list file not found at '{file_path}'. Returning to main menu.")
                 debug_print(f"Custom list file not found: {file_path}.")
                 handle_enter_to_continue()
                 break # Exit if file not found
-
-            # Find the starting line based on progress file
-            custom_list_progress_file = settings.get('progress_file_for_custom_list_path', DEFAULT_SETTINGS['progress_file_for_custom_list_path'])
-            last_typed_line = None
-            if os.path.exists(custom_list_progress_file) and os.path.getsize(custom_list_progress_file) > 0:
-                try:
-                    with open(custom_list_progress_file, 'r') as f:
-                        last_typed_line = f.readline().strip()
-                    print(f"[INFO] Resuming custom list from after: '{last_typed_line}'.")
-                    debug_print(f"Loaded last typed line: '{last_typed_line}'.")
-                except Exception as e:
-                    print(f"[WARNING] Could not read custom list progress file: {e}. Starting from beginning of list.")
-                    debug_print(f"Error reading custom list progress: {e}.")
-                    last_typed_line = None
-            else:
-                print("[INFO] No custom list progress found. Starting from beginning of list.")
-
-            start_index = 0
-            if last_typed_line:
-                try:
-                    start_index = lines.index(last_typed_line) + 1
-                    print(f"[INFO] Starting custom list processing from line {start_index + 1}.")
-                except ValueError:
-                    print(f"[WARNING] Last typed line '{last_typed_line}' not found in the custom list. Starting from beginning.")
-                    debug_print(f"Last typed line '{last_typed_line}' not found in current custom list. Starting from 0.")
-                    start_index = 0
-            
-            if start_index >= len(lines):
+            file_size = os.path.getsize(file_path)
+            compressed_list = is_compressed_list(file_path)
+            list_index = open_custom_list_index(file_path)
+            if list_index:
+                print(f"[INFO] Using line index: {list_index.count} entries in the custom list.")
+
+            # Find the starting point based on progress file (loaded before the plan)
+            progress = custom_list_progress
+            start_offset, start_line_number = 0, 0
+            if progress:
+                start_offset, start_line_number = progress['byte_offset'], progress['line_number']
+                if start_offset > file_size and not compressed_list:
+                    print("[WARNING] Saved custom list position is past the end of the file. Starting from beginning.")
+                    start_offset, start_line_number = 0, 0
+                else:
+                    print(f"[INFO] Starting custom list processing from line {start_line_number + 1}.")
+                    if compressed_list and start_offset:
+                        print("[INFO] Decompressing the list up to the saved position (in memory, nothing is written to disk)...")
+
+            typed_any = False
+            typed_count = 0 # Entries typed in this pass, for the macro click schedule
+            entry_number = list_index.entries_before(start_offset) if list_index else 0
+            checkpointer = ProgressCheckpointer(settings.get('progress_file_for_custom_list_path', DEFAULT_SETTINGS['progress_file_for_custom_list_path']), write_custom_list_progress)
+            entries = iter_custom_list_entries(file_path, start_offset, start_line_number)
+            if candidate_filter:
+                entries = candidate_filter.filter_entries(entries, key=lambda entry: entry[0]) # Runs on the producer thread
+            entries = prefetch_candidates(entries, producer_queue_depth)
+            try:
+                for batch in _timed_batches(_batched(entries, batch_size)):
+                    if STOP_EVENT.is_set():
+                        print("\n[INFO] Script stopped by user hotkey during custom list processing.")
+                        debug_print("Stop requested during custom list processing.")
+                        break # Exit inner loop if a stop was requested
+
+                    typed_any = True
+                    for line_to_type, line_number, next_offset in batch:
+                        if list_index:
+                            entry_number += 1
+                            print(f"[{entry_number}/{list_index.count}] Typing custom list entry: {line_to_type}")
+                        elif compressed_list:
+                            print(f"[Line {line_number}] Typing custom list entry: {line_to_type}")
+                        else:
+                            percent_done = 100.0 * next_offset / file_size if file_size else 100.0
+                            print(f"[Line {line_number} | {percent_done:.2f}%] Typing custom list entry: {line_to_type}")
+                        debug_print(f"Typing custom list entry: '{line_to_type}'.")
+
+                    if macro_schedule and not macro_schedule.run_before(typed_count + 1, pacer):
+                        STOP_EVENT.set()
+                        print("[INFO] Macro clicks interrupted. Returning to main menu.")
+                        break
+                    emission_start = time.perf_counter()
+                    if not type_batch([entry[0] for entry in batch]):
+                        # type_batch returns False if Fail-Safe or other error occurred
+                        STOP_EVENT.set() # Ensure the stop signal is set for the outer loop to break
+                        print("[INFO] Typing interrupted. Returning to main menu.")
+                        break # Break the inner loop
+                    emission_time = time.perf_counter() - emission_start
+                    typed_count += len(batch)
+
+                    # Record progress after each line (or batch of lines) typed; the checkpointer decides when to write it
+                    line_to_type, line_number, next_offset = batch[-1]
+                    checkpoint_start = time.perf_counter()
+                    checkpointer.record(make_custom_list_progress(file_path, next_offset, line_number, line_to_type, file_size), len(batch))
+                    record_stage_time('checkpoint', time.perf_counter() - checkpoint_start)
+                    if list_index:
+                        metrics.add_items(len(batch), lambda: list_index.count - entry_number)
+                    elif not compressed_list and next_offset > start_offset:
+                        # Estimate the lines left from the average line length typed so far
+                        metrics.add_items(len(batch), lambda: int((file_size - next_offset) * typed_count / (next_offset - start_offset)))
+                    else:
+                        metrics.add_items(len(batch))
+
+                    if macro_schedule and not macro_schedule.run_after(typed_count, pacer):
+                        STOP_EVENT.set()
+                        print("[INFO] Macro clicks interrupted. Returning to main menu.")
+                        break
+                    pace_after_batch(len(batch), emission_time, None)
+            except custom_list_read_errors(file_path) as e:
+                print(f"[ERROR] Could not read custom list file '{file_path}': {e}. Returning to main menu.")
+                debug_print(f"Error reading custom list file: {e}.")
+                STOP_EVENT.set()
+            except Exception as e:
+                print(f"[ERROR] An unexpected error occurred during automation: {e}")
+                debug_print(f"Unexpected error during automation: {e}.")
+                STOP_EVENT.set()
+            finally:
+                entries.close() # Stops the producer thread if we left early
+                checkpointer.close() # Saves the last typed line, also when stopped or interrupted
+                if list_index:
+                    list_index.close()
+
+            if not STOP_EVENT.is_set() and not typed_any:
                 print("[INFO] All lines in the custom list have already been processed. Returning to main menu.")
                 debug_print("All lines in custom list processed.")
                 handle_enter_to_continue()
                 automation_completed_naturally = True # Consider natural completion for this mode
                 break # All lines processed, exit loop
 
-            for i in range(start_index, len(lines)):
-                if STOP_SCRIPT:
-                    print("\n[INFO] Script stopped by user hotkey during custom list processing.")
-                    debug_print("STOP_SCRIPT detected during custom list processing.")
-                    break # Exit inner loop if STOP_SCRIPT is True
-                
-                line_to_type = lines[i]
-                print(f"[{i+1}/{len(lines)}] Typing custom list entry: {line_to_type}")
-                debug_print(f"Typing custom list entry: '{line_to_type}'.")
-                
-                if not type_string(line_to_type):
-                    # type_string returns False if Fail-Safe or other error occurred
-                    STOP_SCRIPT = True # Ensure STOP_SCRIPT is set for the outer loop to break
-                    print("[INFO] Typing interrupted. Returning to main menu.")
-                    break # Break the inner loop
-
-                # Save progress after each line typed
-                try:
-                    with open(custom_list_progress_file, 'w') as f:
-                        f.write(line_to_type + '\n')
-                    debug_print(f"Saved custom list progress: '{line_to_type}'.")
-                except Exception as e:
-                    print(f"[ERROR] Could not save custom list progress: {e}")
-                    debug_print(f"Error saving custom list progress: {e}.")
-
-                if STOP_SCRIPT:
-                    break # If typing was interrupted, break outer loop too
-
-            if not STOP_SCRIPT and (start_index + (len(lines) - start_index)) == len(lines):
+            if not STOP_EVENT.is_set():
                 print("\n[INFO] Finished processing all entries in the custom list.")
                 debug_print("Finished processing all custom list entries.")
                 automation_completed_naturally = True # This mode completed naturally
                 handle_enter_to_continue()
                 break # All lines processed, exit loop
 
-            if STOP_SCRIPT: # Check again after inner loop
+            if STOP_EVENT.is_set(): # Check again after inner loop
                 break
 
         else: # Combination Generator or Only Macro Clicks
-            if include_macro_clicks:
-                if not perform_macro_clicks(): # Perform clicks first
-                    STOP_SCRIPT = True # Set flag if clicks were interrupted
+            if include_macro_clicks and not macro_schedule:
+                if not perform_macro_clicks(macro_plan, pacer): # Perform clicks first
+                    STOP_EVENT.set() # Set flag if clicks were interrupted
                     print("[INFO] Macro clicks interrupted. Returning to main menu.")
                     break # Exit the main loop if clicks failed
 
-            if not STOP_SCRIPT: # Only proceed with typing if not stopped by clicks
-                current_progress = load_progress(settings['progress_file_path'])
-                combination_generator = generate_all_combinations(start_combination=current_progress)
+            if not STOP_EVENT.is_set(): # Only proceed with typing if not stopped by clicks
+                try:
+                    chars_set, min_len, max_len = get_combination_space()
+                except ValueError as e:
+                    print(f"[ERROR] {e} Please fix the mask in the Combination Generator Options.")
+                    STOP_EVENT.set()
+                    break
+                progress_file_path = get_combination_progress_file_path(shard)
+                current_progress, current_index = load_progress(progress_file_path, with_index=True)
+                end_index = None
+                if shard is not None:
+                    keyspace_size = get_keyspace_size(chars_set, min_len, max_len)
+                    if keyspace_size is None:
+                        print("[ERROR] Sharding requires a maximum combination length. Set one in the Combination Generator Options.")
+                        STOP_EVENT.set()
+                        break
+                    shard_start, end_index = get_shard_range(shard[0], shard[1], keyspace_size)
+                    print(f"[INFO] Running shard {shard[0]}/{shard[1]}: combination indexes [{shard_start}, {end_index}).")
+                    if current_index is None or current_index < shard_start:
+                        current_progress = None
+                        current_index = shard_start - 1 if shard_start > 0 else None
+                if current_progress is not None:
+                    combination_generator = generate_all_combinations(start_combination=current_progress, end_index=end_index, candidate_filter=candidate_filter)
+                else:
+                    combination_generator = generate_all_combinations(start_index=current_index, end_index=end_index, candidate_filter=candidate_filter)
+
+                if repetitions > 0:
+                    # Never pull more combinations than the remaining repetitions into a batch
+                    combination_generator = itertools.islice(combination_generator, max(repetitions - iteration_count, 0))
+                combination_generator = prefetch_candidates(combination_generator, producer_queue_depth)
 
-                # Iterate through combinations and type them
+                range_end = end_index if end_index is not None else get_keyspace_size(chars_set, min_len, max_len) # For the ETA (None = infinite)
+                checkpointer = ProgressCheckpointer(progress_file_path, lambda position: save_progress(progress_file_path, position['combination'], position['index']))
+                # Iterate through combinations (one batch at a time) and type them
                 try:
-                    for combo in combination_generator:
-                        if STOP_SCRIPT:
+                    for batch in _timed_batches(_batched(combination_generator, batch_size)):
+                        if STOP_EVENT.is_set():
                             print("\n[INFO] Script stopped by user hotkey during combination generation.")
-                            debug_print("STOP_SCRIPT detected during combination generation.")
+                            debug_print("Stop requested during combination generation.")
                             break # Exit inner loop
                         
-                        print(f"Typing: {combo} (Iteration: {iteration_count + 1})")
-                        debug_print(f"Typing combo: '{combo}'.")
-
-                        if not type_string(combo):
-                            # type_string returns False if Fail-Safe or other error occurred
-                            STOP_SCRIPT = True # Ensure STOP_SCRIPT is set for the outer loop to break
+                        for batch_position, combo in enumerate(batch):
+                            print(f"Typing: {combo} (Iteration: {iteration_count + batch_position + 1})")
+                            debug_print(f"Typing combo: '{combo}'.")
+
+                        if macro_schedule and not macro_schedule.run_before(iteration_count + 1, pacer):
+                            STOP_EVENT.set()
+                            print("[INFO] Macro clicks interrupted. Returning to main menu.")
+                            break
+                        emission_start = time.perf_counter()
+                        if not type_batch(batch):
+                            # type_batch returns False if Fail-Safe or other error occurred
+                            STOP_EVENT.set() # Ensure the stop signal is set for the outer loop to break
                             print("[INFO] Typing interrupted. Returning to main menu.")
                             break # Break the inner loop
+                        emission_time = time.perf_counter() - emission_start
+                        last_combo = batch[-1]
                         
-                        # Save progress periodically to reduce disk I/O
-                        if (iteration_count + 1) % PROGRESS_SAVE_INTERVAL == 0:
-                            save_progress(settings['progress_file_path'], combo)
-
-                        # Pause between repetitions
-                        time.sleep(delay_between_repetitions)
+                        # Record progress at batch boundaries; the checkpointer saves it every N entries or T seconds
+                        checkpoint_start = time.perf_counter()
+                        last_index = combination_to_index(last_combo, chars_set, min_len)
+                        checkpointer.record({'combination': last_combo, 'index': last_index}, len(batch))
+                        record_stage_time('checkpoint', time.perf_counter() - checkpoint_start)
+                        iteration_count += len(batch)
+                        metrics.add_items(len(batch), lambda: _remaining_combinations(range_end, last_index, repetitions, iteration_count))
+
+                        if macro_schedule and not macro_schedule.run_after(iteration_count, pacer):
+                            STOP_EVENT.set()
+                            print("[INFO] Macro clicks interrupted. Returning to main menu.")
+                            break
+
+                        # Wait for this batch's deadline (time spent typing is already subtracted); cut short by the stop hotkey
+                        pace_after_batch(len(batch), emission_time, delay_between_repetitions) # Once per batch, as before
 
-                        iteration_count += 1
                         if repetitions > 0 and iteration_count >= repetitions:
                             print(f"\n[INFO] Reached desired number of repetitions: {repetitions}.")
                             debug_print(f"Reached {repetitions} repetitions.")
                             automation_completed_naturally = True # Natural completion if repetitions are met
                             break # Exit the combination loop
-                except pyautogui.FailSafeException:
+                    else:
+                        # The generator ran out (max length or end of shard); the final position is saved below
+                        if not STOP_EVENT.is_set():
+                            print("\n[INFO] All combinations in the configured range have been typed.")
+                            automation_completed_naturally = True
+                            break
+                except FailSafeTriggered:
                     print("\n[INFO] PyAutoGUI Fail-Safe triggered during combination generation. Automation stopped.")
                     debug_print("PyAutoGUI Fail-Safe triggered during combination generation.")
-                    STOP_SCRIPT = True # Set flag to break outer loop
+                    STOP_EVENT.set() # Set flag to break outer loop
                 except Exception as e:
                     print(f"[ERROR] An unexpected error occurred during automation: {e}")
                     debug_print(f"Unexpected error during automation: {e}.")
-                    STOP_SCRIPT = True # Set flag to break outer loop
+                    STOP_EVENT.set() # Set flag to break outer loop
+                finally:
+                    combination_generator.close() # Stops the producer thread if we left early
+                    checkpointer.close() # Saves the last typed combination, also when stopped or interrupted
 
-            if STOP_SCRIPT: # Check after combination generator loop
+            if STOP_EVENT.is_set(): # Check after combination generator loop
                 break # Exit the main while loop
 
         # If repetitions are set and reached, or if custom list finished, break the overall loop
@@ -910,15 +3616,38 @@ def run_automation_loop(include_macro_clicks, process_custom_list=False, custom_
         elif process_custom_list and automation_completed_naturally: # If custom list finished, automation_completed_naturally already set
             debug_print("Outer loop condition: custom list completed naturally.")
             break
-        elif process_custom_list and STOP_SCRIPT: # If custom list was stopped prematurely
+        elif process_custom_list and STOP_EVENT.is_set(): # If custom list was stopped prematurely
             debug_print("Outer loop condition: custom list stopped by user.")
             break
 
+    backend.finish_run()
+    _active_run_metrics = None
+    pacer.report()
+    if delay_controller:
+        delay_controller.report()
+    if candidate_filter:
+        # Time saved is estimated at this run's own pace (typing, clicks and delays per entry)
+        candidate_filter.report(1.0 / metrics.items_per_second() if metrics.items_per_second() > 0 else None)
+    if metrics.items:
+        print(f"[INFO] Run stats: {metrics.live_summary()}")
+        metrics_summary_path = settings.get('metrics_summary_path', DEFAULT_SETTINGS['metrics_summary_path'])
+        run_summary_settings = get_run_summary_settings(process_custom_list, shard, automation_completed_naturally)
+        if candidate_filter:
+            run_summary_settings['filtered'] = {'passed': candidate_filter.passed, 'rejected': candidate_filter.rejected}
+        if metrics_summary_path and metrics.write_summary(metrics_summary_path, run_summary_settings):
+            print(f"[INFO] Run summary saved to '{metrics_summary_path}'.")
+
+    outcome = get_run_outcome(automation_completed_naturally)
+
     # --- Post-Automation Actions ---
     if automation_completed_naturally and shutdown_on_completion_enabled:
         print("\n[INFO] Automation completed successfully and 'Shutdown PC on Completion' is enabled.")
-        print("[INFO] Shutting down your PC in 5 seconds...")
-        time.sleep(5) # Give user a moment to see the message
+        print(f"[INFO] Shutting down your PC in 5 seconds... Press '{stop_hotkey_display}' to cancel.")
+        if STOP_EVENT.wait(5): # Give user a moment to see the message (and to cancel)
+            print("[INFO] Shutdown cancelled.")
+            debug_print("Shutdown cancelled by the stop hotkey.")
+            handle_enter_to_continue()
+            return outcome
         try:
             # Use appropriate shutdown command for the OS
             if os.name == 'nt': # For Windows
@@ -933,12 +3662,55 @@ def run_automation_loop(include_macro_clicks, process_custom_list=False, custom_
         except Exception as e:
             print(f"[ERROR] Failed to execute shutdown command: {e}")
             debug_print(f"Error executing shutdown command: {e}.")
-    elif STOP_SCRIPT:
+    elif STOP_EVENT.is_set():
         print("[INFO] Script was manually stopped. Returning to main menu.")
     else:
         print("[INFO] Automation finished. Returning to main menu.")
 
     handle_enter_to_continue()
+    return outcome
+
+def run_macro_clicks_only(repetitions=0):
+    """
+    Performs the macro clicks 'repetitions' times (0 = until stopped) without typing anything,
+    waiting 'delay_between_repetitions' between rounds. Returns RUN_COMPLETED, RUN_STOPPED or RUN_FAILED.
+    """
+    clear_stop_request()
+    backend = get_output_backend()
+    try:
+        plan = compile_macro_plan(screen_size=backend.screen_size())
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        handle_enter_to_continue()
+        return RUN_FAILED
+    if not plan:
+        print("[ERROR] No macro clicks are defined. Record them in the Macro Click Settings first.")
+        handle_enter_to_continue()
+        return RUN_FAILED
+    initial_delay = settings.get('initial_delay_before_automation', DEFAULT_SETTINGS['initial_delay_before_automation'])
+    delay_between_repetitions = settings.get('delay_between_repetitions', DEFAULT_SETTINGS['delay_between_repetitions'])
+
+    backend.start_run(settings.get('pyautogui_failsafe_enabled', DEFAULT_SETTINGS['pyautogui_failsafe_enabled']))
+    print(f"\n[INFO] Starting macro clicks ({len(plan)} per round) in {initial_delay} seconds...")
+    STOP_EVENT.wait(initial_delay)
+    reset_rate_limiters()
+    pacer = PacingScheduler()
+    rounds = 0
+    while (repetitions == 0 or rounds < repetitions) and not STOP_EVENT.is_set():
+        if not perform_macro_clicks(plan, pacer):
+            break
+        rounds += 1
+        print(f"[INFO] Macro click round {rounds}{f'/{repetitions}' if repetitions else ''} done.")
+        if (repetitions == 0 or rounds < repetitions) and not pacer.wait(delay_between_repetitions, 0):
+            break
+    backend.finish_run()
+    outcome = get_run_outcome(repetitions > 0 and rounds >= repetitions)
+    if STOP_EVENT.is_set():
+        print("[INFO] Macro clicks stopped. Returning to main menu.")
+    else:
+        print("[INFO] Macro clicks finished. Returning to main menu.")
+    handle_enter_to_continue()
+    return outcome
 
 
 # --- Menu Functions ---
@@ -993,6 +3765,8 @@ def show_settings_menu():
         print(settings['menu_options']['settings_menu_8']) # Combination Generator Options
         # print(settings['menu_options']['settings_menu_9']) # Macro Click Options - REMOVED
         print(settings['menu_options']['settings_menu_9']) # Reset All Settings to Default
+        print(settings['menu_options']['settings_menu_M']) # Macro Recorder
+        print(settings['menu_options']['settings_menu_S']) # Macro Click Schedule
         print(settings['menu_options']['settings_menu_B'])
 
         choice = input("Enter your choice: ").strip().upper()
@@ -1023,6 +3797,10 @@ def show_settings_menu():
                 print("[INFO] Settings reset cancelled.")
                 debug_print("Settings reset cancelled by user.")
                 handle_enter_to_continue()
+        elif choice == 'M':
+            show_macro_recorder_menu()
+        elif choice == 'S':
+            change_macro_schedule()
         elif choice == 'B':
             break # Go back to main menu
         else:
@@ -1083,13 +3861,21 @@ def show_intervals_menu():
         print(f"{settings['menu_options']['intervals_menu_2']}: {settings['delay_between_macro_clicks']} seconds")
         print(f"{settings['menu_options']['intervals_menu_3']}: {settings['pyautogui_write_interval']} seconds per character")
         print(f"{settings['menu_options']['intervals_menu_4']}: {settings['initial_delay_before_automation']} seconds")
+        print(f"{settings['menu_options']['intervals_menu_5']}: {settings['target_items_per_second']} items per second (0 = use Delay Between Repetitions)")
+        print(f"{settings['menu_options']['intervals_menu_6']}: {'ENABLED' if settings['adaptive_delay_enabled'] else 'DISABLED'}")
+        print(f"{settings['menu_options']['intervals_menu_7']}: {settings['adaptive_delay_max']} seconds per entry")
         print(settings['menu_options']['intervals_menu_B'])
 
-        choice = input("Enter your choice (1-4 to change, B to go back): ").strip().upper()
+        choice = input("Enter your choice (1-7 to change, B to go back): ").strip().upper()
         
-        if choice in ['1', '2', '3', '4']:
+        if choice == '6':
+            toggle_setting_boolean('adaptive_delay_enabled', "Adaptive Delay")
+        elif choice in ['1', '2', '3', '4', '5', '7']:
             try:
-                new_delay = float(input("Enter new delay (seconds): ").strip())
+                if choice == '5':
+                    new_delay = float(input("Enter target items per second (0 to use Delay Between Repetitions): ").strip())
+                else:
+                    new_delay = float(input("Enter new delay (seconds): ").strip())
                 if new_delay < 0:
                     print("[ERROR] Delay cannot be negative.")
                     debug_print("Negative delay entered.")
@@ -1107,6 +3893,12 @@ def show_intervals_menu():
                 elif choice == '4':
                     settings['initial_delay_before_automation'] = new_delay
                     print(f"[INFO] Initial delay before automation set to {new_delay} seconds.")
+                elif choice == '5':
+                    settings['target_items_per_second'] = new_delay
+                    print(f"[INFO] Target typing rate set to {new_delay} items per second.")
+                elif choice == '7':
+                    settings['adaptive_delay_max'] = new_delay
+                    print(f"[INFO] Maximum adaptive delay set to {new_delay} seconds per entry.")
                 save_settings(settings['settings_file_path'], settings)
             except ValueError:
                 print("[ERROR] Invalid input. Please enter a number.")
@@ -1445,13 +4237,17 @@ def show_typing_options_menu():
         'pyautogui_write': "PyAutoGUI .write() (general purpose, respects interval)",
         'pyautogui_typewrite': "PyAutoGUI .typewrite() (slower, better for special chars, respects interval)",
         'pyperclip_safe': "Pyperclip Safe (fastest, uses clipboard, restores original clipboard content)",
-        'pyperclip_all': "Pyperclip All (fastest, uses clipboard, leaves typed text on clipboard)"
+        'pyperclip_all': "Pyperclip All (fastest, uses clipboard, leaves typed text on clipboard)",
+        'pyperclip_batch': "Pyperclip Batch (pastes several newline-separated entries at once, only for targets that accept multi-line input)"
     }
     while True:
         clear_terminal()
         print(settings['menu_titles']['typing_options_menu'])
         print(f"{settings['menu_options']['typing_options_menu_1']} (Current: {typing_methods.get(settings['typing_method'], 'Unknown')})")
         print(f"{settings['menu_options']['typing_options_menu_2']} (Current: {settings['pyautogui_global_pause']} seconds)")
+        print(f"{settings['menu_options']['typing_options_menu_3']} (Current: {settings['output_backend']})")
+        print(f"{settings['menu_options']['typing_options_menu_4']} (Current: {settings['producer_queue_depth']} candidates, 0 = disabled)")
+        print(settings['menu_options']['typing_options_menu_5'])
         print(settings['menu_options']['typing_options_menu_B'])
 
         choice = input("Enter your choice: ").strip().upper()
@@ -1472,6 +4268,16 @@ def show_typing_options_menu():
                 if 0 <= index < len(sorted_methods):
                     selected_key = sorted_methods[index][0]
                     settings['typing_method'] = selected_key
+                    if selected_key == 'pyperclip_batch':
+                        try:
+                            batch_size = int(input(f"How many entries per paste? (Current: {settings['clipboard_batch_size']}): ").strip() or settings['clipboard_batch_size'])
+                            if batch_size >= 1:
+                                settings['clipboard_batch_size'] = batch_size
+                            else:
+                                print("[ERROR] Batch size must be at least 1. Keeping current value.")
+                        except ValueError:
+                            print("[ERROR] Invalid input. Keeping current batch size.")
+                            debug_print("Non-integer input for clipboard batch size.")
                     save_settings(settings['settings_file_path'], settings)
                     print(f"[INFO] Typing method set to: {typing_methods[selected_key]}.")
                     debug_print(f"Typing method set to '{selected_key}'.")
@@ -1499,6 +4305,68 @@ def show_typing_options_menu():
                 print("[ERROR] Invalid input. Please enter a number.")
                 debug_print("Non-numeric input for global pause.")
             handle_enter_to_continue()
+        elif choice == '3':
+            print("\n--- Change Output Backend ---")
+            print("1. pyautogui (real keystrokes, clicks and clipboard - normal use)")
+            print("2. recording (no real input; logs every action with a timestamp, for testing/benchmarking)")
+            print("3. null (no real input; only counts actions, for benchmarking at full speed)")
+            backend_choice = input("Enter your choice: ").strip()
+            if backend_choice in ['1', '2', '3']:
+                settings['output_backend'] = OUTPUT_BACKEND_NAMES[int(backend_choice) - 1]
+                if settings['output_backend'] == 'recording':
+                    log_path = input("Enter a JSONL file to log actions to (leave empty to keep them in memory only): ").strip()
+                    settings['recording_backend_log_path'] = log_path
+                save_settings(settings['settings_file_path'], settings)
+                print(f"[INFO] Output backend set to '{settings['output_backend']}'.")
+                debug_print(f"Output backend set to '{settings['output_backend']}'.")
+            else:
+                print("[ERROR] Invalid choice. Please try again.")
+                debug_print(f"Invalid output backend choice: {backend_choice}.")
+            handle_enter_to_continue()
+        elif choice == '4':
+            try:
+                new_depth = int(input("Enter how many candidates to generate ahead of typing (0 disables the background producer): ").strip())
+                if new_depth < 0:
+                    print("[ERROR] Queue depth cannot be negative.")
+                    debug_print("Negative producer queue depth entered.")
+                else:
+                    settings['producer_queue_depth'] = new_depth
+                    save_settings(settings['settings_file_path'], settings)
+                    print(f"[INFO] Producer queue depth set to {new_depth}.")
+                    debug_print(f"Producer queue depth set to {new_depth}.")
+            except ValueError:
+                print("[ERROR] Invalid input. Please enter an integer.")
+                debug_print("Non-integer input for producer queue depth.")
+            handle_enter_to_continue()
+        elif choice == '5':
+            print("\n--- Change Rate Limits ---")
+            rate_limits = settings['rate_limits']
+            for i, action_class in enumerate(RATE_LIMIT_ACTION_CLASSES):
+                limit = rate_limits.get(action_class) or {'rate': 0.0, 'burst': 1}
+                current = "unlimited" if not limit['rate'] else f"{limit['rate']} per second, bursts of {limit['burst']}"
+                print(f"{i+1}. {action_class} (Current: {current})")
+            print("B. Back")
+            class_choice = input("Enter your choice: ").strip().upper()
+            if class_choice in ['1', '2', '3']:
+                action_class = RATE_LIMIT_ACTION_CLASSES[int(class_choice) - 1]
+                try:
+                    new_rate = float(input(f"Enter the sustained rate for '{action_class}' (actions per second, 0 for unlimited): ").strip())
+                    new_burst = int(input("Enter the burst size (actions allowed back to back before the rate applies): ").strip() or 1)
+                    if new_rate < 0 or new_burst < 1:
+                        print("[ERROR] Rate cannot be negative and burst size must be at least 1.")
+                        debug_print("Invalid rate limit entered.")
+                    else:
+                        settings['rate_limits'] = dict(rate_limits, **{action_class: {'rate': new_rate, 'burst': new_burst}})
+                        save_settings(settings['settings_file_path'], settings)
+                        print(f"[INFO] Rate limit for '{action_class}' set to {new_rate} per second, bursts of {new_burst}.")
+                        debug_print(f"Rate limit for '{action_class}' set to {new_rate}/s, burst {new_burst}.")
+                except ValueError:
+                    print("[ERROR] Invalid input. Please enter a number.")
+                    debug_print("Non-numeric input for rate limit.")
+            elif class_choice != 'B':
+                print("[ERROR] Invalid choice. Please try again.")
+                debug_print(f"Invalid rate limit choice: {class_choice}.")
+            handle_enter_to_continue()
         elif choice == 'B':
             break
         else:
@@ -1506,6 +4374,160 @@ def show_typing_options_menu():
             debug_print(f"Invalid choice in typing options menu: {choice}.")
             handle_enter_to_continue()
 
+def change_macro_schedule():
+    """Shows and changes the per-item macro click schedule."""
+    print("\n--- Macro Click Schedule ---")
+    click_data = settings['macro_click_data']
+    if click_data:
+        for i, click in enumerate(click_data):
+            if click is None:
+                print(f"  Click {i+1}: not captured")
+            else:
+                print(f"  Click {i+1}: ({click['x']}, {click['y']}) {click.get('click_type', 'left')}")
+    else:
+        print("  No macro clicks are captured yet (they are set up the first time you run with macro clicks).")
+    current = format_macro_schedule(settings['macro_schedule'])
+    print(f"Current schedule: {current or 'none (all clicks once before typing starts)'}")
+    print("Format: 'before|after <every N entries>: <click numbers>' rules separated by ';'.")
+    print("Example: 'before 1: 1; after 1: 2; after 500: 3' clicks 1 before every entry, 2 after every entry and 3 after every 500th.")
+    text = input("Enter the new schedule ('-' to clear, leave empty to keep): ").strip()
+    if not text:
+        print("[INFO] Macro click schedule unchanged.")
+    elif text == '-':
+        settings['macro_schedule'] = []
+        save_settings(settings['settings_file_path'], settings)
+        print("[INFO] Macro click schedule cleared.")
+    else:
+        try:
+            settings['macro_schedule'] = parse_macro_schedule(text)
+            save_settings(settings['settings_file_path'], settings)
+            print(f"[INFO] Macro click schedule set to: {format_macro_schedule(settings['macro_schedule'])}")
+            debug_print(f"Macro schedule set to {settings['macro_schedule']}.")
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+    handle_enter_to_continue()
+
+def format_candidate_filter(rules):
+    """Short description of the candidate filter rules for menus."""
+    if not rules.get('enabled'):
+        return 'disabled'
+    parts = []
+    if rules.get('regex'):
+        parts.append(f"match '{rules['regex']}'")
+    if rules.get('exclude_regex'):
+        parts.append(f"exclude '{rules['exclude_regex']}'")
+    class_limits = rules.get('class_limits') or {}
+    for class_name, limits in (class_limits.items() if isinstance(class_limits, dict) else ()):
+        if isinstance(limits, dict):
+            parts.append(f"{class_name} {limits.get('min') or 0}-{limits['max'] if limits.get('max') is not None else 'any'}")
+        else:
+            parts.append(f"{class_name} {limits!r} (invalid)")
+    if rules.get('max_repeat'):
+        parts.append(f"max repeat {rules['max_repeat']}")
+    if rules.get('blocklist_path'):
+        parts.append(f"blocklist '{rules['blocklist_path']}'")
+    return ', '.join(parts) or 'enabled, no rules'
+
+def change_candidate_filter():
+    """Shows and changes the candidate filter rules, which skip combinations and custom list entries before typing."""
+    print("\n--- Candidate Filter ---")
+    rules = dict(DEFAULT_SETTINGS['candidate_filter'], **settings['candidate_filter'])
+    print(f"Current: {format_candidate_filter(rules)}")
+    print("For each rule, leave empty to keep the current value or enter '-' to clear it.")
+    enabled = input(f"Enable the filter? (y/n, current: {'y' if rules['enabled'] else 'n'}): ").strip().lower()
+    if enabled in ('y', 'n'):
+        rules['enabled'] = enabled == 'y'
+    if rules['enabled']:
+        for key, prompt in (('regex', "Keep only entries matching this regular expression"),
+                            ('exclude_regex', "Skip entries matching this regular expression"),
+                            ('blocklist_path', "Blocklist file (one entry per line to skip)")):
+            text = input(f"{prompt} (current: '{rules[key]}'): ").strip()
+            if text:
+                rules[key] = '' if text == '-' else text
+        print(f"Character class limits as 'class:min-max' separated by spaces (classes: {', '.join(CANDIDATE_CHAR_CLASSES)}).")
+        print("Example: 'digit:1-3 symbol:0-0' needs 1 to 3 digits and no symbols. 'upper:1-' needs at least one uppercase letter.")
+        class_limits_text = input("Class limits: ").strip()
+        max_repeat_text = input(f"Longest allowed run of one repeated character (0 = no limit, current: {rules['max_repeat']}): ").strip()
+        try:
+            if class_limits_text == '-':
+                rules['class_limits'] = {}
+            elif class_limits_text:
+                class_limits = {}
+                for rule in class_limits_text.split():
+                    class_name, _, bounds = rule.partition(':')
+                    minimum, _, maximum = bounds.partition('-')
+                    class_limits[class_name.strip().lower()] = {'min': int(minimum or 0), 'max': int(maximum) if maximum else None}
+                rules['class_limits'] = class_limits
+            if max_repeat_text:
+                rules['max_repeat'] = 0 if max_repeat_text == '-' else int(max_repeat_text)
+        except ValueError:
+            print("[ERROR] Invalid input. Please enter whole numbers for the limits. The candidate filter was not changed.")
+            debug_print(f"Non-integer candidate filter limits: '{class_limits_text}', '{max_repeat_text}'.")
+            handle_enter_to_continue()
+            return
+        try:
+            compile_candidate_filter(rules) # Validate before saving
+        except ValueError as e:
+            print(f"[ERROR] {e} The candidate filter was not changed.")
+            debug_print(f"Invalid candidate filter rules: {e}.")
+            handle_enter_to_continue()
+            return
+    settings['candidate_filter'] = rules
+    save_settings(settings['settings_file_path'], settings)
+    print(f"[INFO] Candidate filter: {format_candidate_filter(rules)}.")
+    debug_print(f"Candidate filter set to {rules}.")
+    handle_enter_to_continue()
+
+def show_macro_recorder_menu():
+    """Displays the macro recorder menu: record a macro to a file and replay it."""
+    while True:
+        clear_terminal()
+        print(settings['menu_titles']['macro_recorder_menu'])
+        print(f"{settings['menu_options']['macro_recorder_menu_1']} (File: {settings['macro_recording_path']})")
+        print(settings['menu_options']['macro_recorder_menu_2'])
+        speed = settings['macro_replay_speed']
+        print(f"{settings['menu_options']['macro_recorder_menu_3']} (Current: {'max' if speed <= 0 else f'{speed}x'})")
+        print(f"{settings['menu_options']['macro_recorder_menu_4']} (Current: {settings['macro_simplify_tolerance']} pixels, 0 = off)")
+        print(settings['menu_options']['macro_recorder_menu_B'])
+
+        choice = input("Enter your choice: ").strip().upper()
+
+        if choice == '1':
+            file_path = input(f"Save the macro to (leave empty for '{settings['macro_recording_path']}'): ").strip() or settings['macro_recording_path']
+            if record_macro_to_file(file_path):
+                settings['macro_recording_path'] = file_path
+                save_settings(settings['settings_file_path'], settings)
+            handle_enter_to_continue()
+        elif choice == '2':
+            file_path = input(f"Macro file to replay (leave empty for '{settings['macro_recording_path']}'): ").strip() or settings['macro_recording_path']
+            repetitions = get_repetitions_input(prompt="How many times do you want to replay the macro? (Enter 0 for infinite): ")
+            if repetitions is not None:
+                replay_macro_file(file_path, repetitions=repetitions)
+            handle_enter_to_continue()
+        elif choice in ['3', '4']:
+            try:
+                if choice == '3':
+                    new_value = float(input("Enter replay speed (1 = as recorded, 2 = twice as fast, 0 = as fast as possible): ").strip())
+                else:
+                    new_value = float(input("Enter move simplification tolerance in pixels (0 keeps every recorded move): ").strip())
+                if new_value < 0:
+                    print("[ERROR] Value cannot be negative.")
+                    debug_print("Negative macro recorder value entered.")
+                else:
+                    settings['macro_replay_speed' if choice == '3' else 'macro_simplify_tolerance'] = new_value
+                    save_settings(settings['settings_file_path'], settings)
+                    print(f"[INFO] {'Replay speed' if choice == '3' else 'Move simplification tolerance'} set to {new_value}.")
+            except ValueError:
+                print("[ERROR] Invalid input. Please enter a number.")
+                debug_print("Non-numeric input in macro recorder menu.")
+            handle_enter_to_continue()
+        elif choice == 'B':
+            break
+        else:
+            print("[ERROR] Invalid choice. Please try again.")
+            debug_print(f"Invalid choice in macro recorder menu: {choice}.")
+            handle_enter_to_continue()
+
 def show_combo_gen_settings_menu():
     """Displays and handles combination generator settings."""
     while True:
@@ -1515,6 +4537,11 @@ def show_combo_gen_settings_menu():
         max_len_display = f"{settings['max_combination_length']} (0 for infinite)" if settings['max_combination_length'] >= 0 else "N/A (Infinite)"
         print(f"{settings['menu_options']['combo_gen_settings_menu_2']} (Current: {max_len_display})")
         print(settings['menu_options']['combo_gen_settings_menu_3'])
+        print(f"{settings['menu_options']['combo_gen_settings_menu_4']} (Current: '{settings['mask'] or 'None (uses character set)'}')")
+        custom_sets_display = ', '.join(f"?{key}='{value}'" for key, value in sorted(settings['mask_custom_charsets'].items()) if value) or 'None'
+        print(f"{settings['menu_options']['combo_gen_settings_menu_5']} (Current: {custom_sets_display})")
+        print(settings['menu_options']['combo_gen_settings_menu_6'])
+        print(f"{settings['menu_options']['combo_gen_settings_menu_7']} (Current: {format_candidate_filter(settings['candidate_filter'])})")
         print(settings['menu_options']['combo_gen_settings_menu_B'])
 
         choice = input("Enter your choice: ").strip().upper()
@@ -1558,6 +4585,50 @@ def show_combo_gen_settings_menu():
             handle_enter_to_continue()
         elif choice == '3':
             change_character_set() # Reuse existing function
+        elif choice == '4':
+            print("\nMask placeholders: ?l = a-z, ?u = A-Z, ?d = 0-9, ?s = space and symbols, ?a = all of these,")
+            print("?h = 0-9a-f, ?H = 0-9A-F, ?1-?4 = custom sets, ?? = a literal '?'. Any other character is typed as-is.")
+            print("Example: ?u?l?l?l?l?d?d (Uppercase + 4 lowercase + 2 digits). Min/max length use the first N positions.")
+            new_mask = input("Enter new mask (leave empty to disable the mask and use the character set): ").strip()
+            if new_mask:
+                try:
+                    position_charsets = parse_mask(new_mask, settings['mask_custom_charsets'])
+                except ValueError as e:
+                    print(f"[ERROR] {e}")
+                    debug_print(f"Invalid mask entered: '{new_mask}'.")
+                    handle_enter_to_continue()
+                    continue
+                settings['mask'] = new_mask
+                save_settings(settings['settings_file_path'], settings)
+                _, min_len, max_len = get_combination_space()
+                print(f"[INFO] Mask set to '{new_mask}' ({len(position_charsets)} positions). Keyspace size: {get_keyspace_size(position_charsets, min_len, max_len)}.")
+                debug_print(f"Mask set to '{new_mask}'.")
+            else:
+                settings['mask'] = ''
+                save_settings(settings['settings_file_path'], settings)
+                print("[INFO] Mask disabled. The character set is used for every position.")
+                debug_print("Mask disabled.")
+            handle_enter_to_continue()
+        elif choice == '5':
+            set_key = input("Which custom set do you want to change? (1-4): ").strip()
+            if set_key in MASK_CUSTOM_CHARSET_KEYS:
+                new_set = input(f"Enter the characters for ?{set_key} (leave empty to clear it): ").strip()
+                settings['mask_custom_charsets'] = dict(settings['mask_custom_charsets'], **{set_key: new_set})
+                save_settings(settings['settings_file_path'], settings)
+                print(f"[INFO] Custom set ?{set_key} set to '{new_set}'.")
+                debug_print(f"Custom mask set ?{set_key} set to '{new_set}'.")
+            else:
+                print("[ERROR] Invalid choice. Please enter a number from 1 to 4.")
+                debug_print(f"Invalid custom mask set choice: {set_key}.")
+            handle_enter_to_continue()
+        elif choice == '6':
+            try:
+                print_run_plan(plan_combination_run(ACTIVE_SHARD))
+            except ValueError as e:
+                print(f"[ERROR] {e}")
+            handle_enter_to_continue()
+        elif choice == '7':
+            change_candidate_filter()
         elif choice == 'B':
             break
         else:
@@ -1566,8 +4637,7 @@ def show_combo_gen_settings_menu():
             handle_enter_to_continue()
 
 def register_stop_hotkey():
-    """Registers the global hotkey to stop the script."""
-    global STOP_SCRIPT
+    """Registers the global hotkey that sets STOP_EVENT to stop the script."""
     # Unhook any existing hotkeys first to avoid conflicts
     try:
         keyboard.unhook_all()
@@ -1577,8 +4647,8 @@ def register_stop_hotkey():
 
     hotkey = settings.get('stop_hotkey', DEFAULT_SETTINGS['stop_hotkey'])
     try:
-        # Use a lambda to ensure STOP_SCRIPT is accessed correctly within the handler
-        keyboard.add_hotkey(hotkey, lambda: globals().update(STOP_SCRIPT=True))
+        # Setting the event wakes up any wait in progress, so the stop takes effect immediately
+        keyboard.add_hotkey(hotkey, request_stop)
         debug_print(f"Registered stop hotkey: '{hotkey}'.")
     except Exception as e:
         print(f"[ERROR] Could not register stop hotkey '{hotkey}': {e}. Please choose a different hotkey in settings or ensure it's not in use.")
@@ -1613,18 +4683,18 @@ def main_menu():
             # Ask for repetitions for combination generator with clicks
             repetitions = get_repetitions_input()
             if repetitions is not None: # If user didn't cancel
-                run_automation_loop(include_macro_clicks=True, repetitions=repetitions)
+                run_automation_loop(include_macro_clicks=True, repetitions=repetitions, shard=ACTIVE_SHARD)
         elif choice == '2':
             # Ask for repetitions for combination generator without clicks
             repetitions = get_repetitions_input()
             if repetitions is not None: # If user didn't cancel
-                run_automation_loop(include_macro_clicks=False, repetitions=repetitions)
+                run_automation_loop(include_macro_clicks=False, repetitions=repetitions, shard=ACTIVE_SHARD)
         elif choice == '3':
             show_settings_menu()
         elif choice == '4':
-            reset_progress(settings['progress_file_path'])
+            reset_progress(get_combination_progress_file_path(ACTIVE_SHARD))
         elif choice == '5':
-            custom_list_path = input("Enter the full path to your text file (e.g., C:\\Users\\User\\list.txt): ").strip()
+            custom_list_path = input("Enter the full path to your text file (e.g., C:\\Users\\User\\list.txt or list.txt.gz): ").strip()
             if os.path.exists(custom_list_path) and os.path.isfile(custom_list_path):
                 # Ask for repetitions for custom list processor (0 for infinite if it were relevant, but typically 1 for full list)
                 # For custom list, repetitions mean how many times to process the *entire* list.
@@ -1648,13 +4718,13 @@ def main_menu():
                     if get_clicks_for_setup(): # If setup is successful (even if no clicks were defined)
                         # Now, re-run 'only macro clicks' with repetitions
                         print("\n[INFO] Macro click setup complete. Starting macro click automation.")
-                        run_automation_loop(include_macro_clicks=True, repetitions=repetitions)
+                        run_macro_clicks_only(repetitions)
                     else:
                         print("[INFO] Macro click setup cancelled. Returning to main menu.")
                         debug_print("Macro click setup cancelled.")
                         handle_enter_to_continue()
                 else:
-                    run_automation_loop(include_macro_clicks=True, repetitions=repetitions)
+                    run_macro_clicks_only(repetitions)
         elif choice == '8':
             show_credits_page()
         elif choice == '9':
@@ -1693,7 +4763,7 @@ def show_credits_page():
     print("Project Idea & Guidance: MrCookie")
     print("\n--- Libraries Used ---")
     print(" - pyautogui: For controlling mouse and keyboard.")
-    print(" - pynput: For global hotkey listening (used for STOP_SCRIPT).")
+    print(" - pynput: For global hotkey listening (used for the stop hotkey).")
     print(" - pyperclip: For clipboard operations (used in typing methods).")
     print(" - itertools: For efficient combination generation.")
     print("\n--- Special Thanks ---")
@@ -1759,10 +4829,570 @@ def initial_setup():
     # Register the stop hotkey once at the end of setup
     register_stop_hotkey()
 
+# --- Headless Jobs (command line / job file) ---
+# A job describes one unattended run, so it can be started by a scheduler or on many machines
+# without the menus. Job files are JSON (or YAML if PyYAML is installed), for example:
+#   {"mode": "combinations", "repetitions": 0, "shard": "3/16", "backend": "pyautogui",
+#    "pacing": {"target_items_per_second": 20, "initial_delay": 5}, "settings": {"chars": "abc123"}}
+JOB_MODES = ('combinations', 'custom_list', 'macro_only')
+JOB_KEYS = ('mode', 'macro_clicks', 'custom_list', 'repetitions', 'shard', 'pacing', 'backend', 'settings')
+# Job 'pacing' keys and the settings they set
+JOB_PACING_SETTINGS = {
+    'target_items_per_second': 'target_items_per_second',
+    'delay_between_repetitions': 'delay_between_repetitions',
+    'initial_delay': 'initial_delay_before_automation',
+    'adaptive_delay': 'adaptive_delay_enabled',
+    'adaptive_delay_max': 'adaptive_delay_max',
+    'rate_limits': 'rate_limits',
+}
+# Process exit codes of --job / --run
+EXIT_COMPLETED = 0 # The job finished its work
+EXIT_FAILED = 1 # An error, the fail-safe or invalid settings stopped the job
+EXIT_USAGE = 2 # Invalid command line or job file; nothing was run
+EXIT_STOPPED = 3 # Stopped by the stop hotkey, Ctrl+C or SIGTERM; progress is saved and the job can be re-run to resume
+RUN_OUTCOME_EXIT_CODES = {RUN_COMPLETED: EXIT_COMPLETED, RUN_STOPPED: EXIT_STOPPED, RUN_FAILED: EXIT_FAILED}
+
+def load_job_file(file_path):
+    """Reads a job file (.json, or .yaml/.yml with PyYAML). Raises ValueError if it cannot be read."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError as e:
+        raise ValueError(f"Could not read job file '{file_path}': {e}.")
+    is_yaml = file_path.lower().endswith(('.yaml', '.yml'))
+    if is_yaml and yaml is None:
+        raise ValueError("YAML job files need PyYAML (pip install pyyaml). Use a .json job file instead.")
+    try:
+        job = yaml.safe_load(text) if is_yaml else json.loads(text)
+    except Exception as e:
+        raise ValueError(f"Job file '{file_path}' is not valid: {e}.")
+    if not isinstance(job, dict):
+        raise ValueError(f"Job file '{file_path}' must contain a mapping of job keys ({', '.join(JOB_KEYS)}).")
+    return job
+
+def parse_setting_override(override):
+    """Parses a --set KEY=VALUE option into (key, raw text). The value is converted by coerce_setting_value()."""
+    key, separator, value = override.partition('=')
+    if not separator or not key.strip():
+        raise ValueError(f"Invalid --set '{override}'. Expected KEY=VALUE, e.g. --set chars=abc123.")
+    return key.strip(), value
+
+def coerce_setting_value(key, value):
+    """
+    Converts a job or --set value to the type of the setting's default and returns it. Text is kept
+    as-is for text settings and read as JSON (numbers, true/false, lists, objects) for the others.
+    Raises ValueError if the value does not fit the setting.
+    """
+    expected_type = type(DEFAULT_SETTINGS[key])
+    if isinstance(value, str) and expected_type is not str:
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValueError(f"Invalid value '{value}' for setting '{key}': expected {expected_type.__name__}.")
+    if expected_type is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if not isinstance(value, expected_type) or (expected_type is int and isinstance(value, bool)):
+        raise ValueError(f"Invalid value {value!r} for setting '{key}': expected {expected_type.__name__}, got {type(value).__name__}.")
+    return value
+
+def parse_setting_overrides(overrides):
+    """Parses --set KEY=VALUE options into {key: value}, converted to the settings' types. Raises ValueError if one is invalid."""
+    parsed = {}
+    for override in overrides:
+        key, value = parse_setting_override(override)
+        if key not in DEFAULT_SETTINGS:
+            raise ValueError(f"Unknown setting '{key}' in --set '{override}'.")
+        parsed[key] = coerce_setting_value(key, value)
+    return parsed
+
+def build_job(args):
+    """
+    Builds the job to run from the --job file (if any) and the command line options, which take
+    precedence over it. Validates it and returns the normalized job. Raises ValueError if it is invalid.
+    """
+    job = load_job_file(args.job) if args.job else {}
+    unknown_keys = sorted(set(job) - set(JOB_KEYS))
+    if unknown_keys:
+        raise ValueError(f"Unknown job key(s): {', '.join(unknown_keys)}. Valid keys: {', '.join(JOB_KEYS)}.")
+    pacing = dict(job.get('pacing') or {})
+    job_settings = dict(job.get('settings') or {})
+    if args.run:
+        job['mode'] = args.run
+    if args.macro_clicks:
+        job['macro_clicks'] = True
+    if args.list:
+        job['custom_list'] = args.list
+    if args.repetitions is not None:
+        job['repetitions'] = args.repetitions
+    if args.shard:
+        job['shard'] = args.shard
+    if args.backend:
+        job['backend'] = args.backend
+    for option, pacing_key in ((args.rate, 'target_items_per_second'), (args.delay, 'delay_between_repetitions'), (args.initial_delay, 'initial_delay')):
+        if option is not None:
+            pacing[pacing_key] = option
+    for override in args.set or []:
+        key, value = parse_setting_override(override)
+        job_settings[key] = value
+
+    mode = job.get('mode')
+    if mode not in JOB_MODES:
+        raise ValueError(f"Invalid job mode '{mode}'. Use one of: {', '.join(JOB_MODES)}.")
+    repetitions = job.get('repetitions', 1 if mode == 'custom_list' else 0)
+    if not isinstance(repetitions, int) or isinstance(repetitions, bool) or repetitions < 0:
+        raise ValueError(f"Invalid repetitions '{repetitions}'. Use 0 for infinite or a positive whole number.")
+    shard = job.get('shard')
+    if shard is not None:
+        if mode != 'combinations':
+            raise ValueError("A shard can only be set for the 'combinations' mode.")
+        if isinstance(shard, (list, tuple)) and len(shard) == 2:
+            shard = f"{shard[0]}/{shard[1]}"
+        shard = parse_shard_spec(str(shard))
+    custom_list = job.get('custom_list')
+    if mode == 'custom_list':
+        if not custom_list:
+            raise ValueError("The 'custom_list' mode needs the path of the list ('custom_list' in the job, or --list).")
+        if not os.path.isfile(custom_list):
+            raise ValueError(f"Custom list file not found at '{custom_list}'.")
+    backend = job.get('backend')
+    if backend is not None and backend not in OUTPUT_BACKEND_NAMES:
+        raise ValueError(f"Invalid backend '{backend}'. Use one of: {', '.join(OUTPUT_BACKEND_NAMES)}.")
+    unknown_pacing = sorted(set(pacing) - set(JOB_PACING_SETTINGS))
+    if unknown_pacing:
+        raise ValueError(f"Unknown pacing key(s): {', '.join(unknown_pacing)}. Valid keys: {', '.join(JOB_PACING_SETTINGS)}.")
+    unknown_settings = sorted(set(job_settings) - set(DEFAULT_SETTINGS))
+    if unknown_settings:
+        raise ValueError(f"Unknown setting(s): {', '.join(unknown_settings)}.")
+    job_settings = {key: coerce_setting_value(key, value) for key, value in job_settings.items()}
+    pacing = {pacing_key: coerce_setting_value(JOB_PACING_SETTINGS[pacing_key], value) for pacing_key, value in pacing.items()}
+    return {
+        'mode': mode,
+        'macro_clicks': bool(job.get('macro_clicks', False)),
+        'custom_list': custom_list,
+        'repetitions': repetitions,
+        'shard': shard,
+        'backend': backend,
+        'pacing': pacing,
+        'settings': job_settings,
+    }
+
+def apply_job_settings(job):
+    """Applies the job's settings, pacing and backend to the in-memory settings (the settings file is not changed)."""
+    settings.update(job['settings'])
+    for pacing_key, value in job['pacing'].items():
+        settings[JOB_PACING_SETTINGS[pacing_key]] = value
+    if job['backend']:
+        settings['output_backend'] = job['backend']
+    settings['press_enter_to_exit_enabled'] = False # Nobody is there to press Enter
+    settings['clear_screen_on_menu_display'] = False
+
+def run_job(job):
+    """
+    Runs a job without any prompts (the first-launch setup is skipped). Ctrl+C and SIGTERM stop it
+    like the stop hotkey, so progress is saved. Returns the process exit code (see EXIT_COMPLETED etc.).
+    """
+    apply_job_settings(job)
+    global DEBUG_MODE
+    DEBUG_MODE = settings.get('debug_mode', DEFAULT_SETTINGS['debug_mode'])
+    for signal_name in ('SIGINT', 'SIGTERM'):
+        if hasattr(signal, signal_name):
+            signal.signal(getattr(signal, signal_name), lambda signal_number, frame: request_stop())
+    if settings['output_backend'] == 'pyautogui':
+        register_stop_hotkey() # Headless backends run without a display, so no global hotkey is needed
+        update_pyautogui_failsafe_points()
+    description = job['mode'] + (' with macro clicks' if job['macro_clicks'] else '')
+    if job['shard']:
+        description += f", shard {job['shard'][0]}/{job['shard'][1]}"
+    print(f"[INFO] Running job: {description}, repetitions: {job['repetitions'] or 'infinite'}, backend: '{settings['output_backend']}'.")
+
+    if job['mode'] == 'macro_only':
+        outcome = run_macro_clicks_only(job['repetitions'])
+    elif job['mode'] == 'custom_list':
+        initialize_custom_list_progress_file()
+        outcome = run_automation_loop(job['macro_clicks'], process_custom_list=True, custom_list_path=job['custom_list'], repetitions=job['repetitions'])
+    else:
+        outcome = run_automation_loop(job['macro_clicks'], repetitions=job['repetitions'], shard=job['shard'])
+    print(f"[INFO] Job {outcome}. Exit code: {RUN_OUTCOME_EXIT_CODES[outcome]}.")
+    return RUN_OUTCOME_EXIT_CODES[outcome]
+
+# --- Benchmarks ---
+def benchmark_combination_generators(total_combinations=1000000):
+    """
+    Measures combination throughput of the itertools.product generator against the NumPy
+    block generator (with and without decoding to strings) and prints the results.
+    """
+    print(f"\n--- Combination Generator Benchmark ({total_combinations} combinations) ---")
+    results = {}
+
+    start_time = time.perf_counter()
+    for _ in itertools.islice(generate_all_combinations(), total_combinations):
+        pass
+    results['itertools.product (strings)'] = time.perf_counter() - start_time
+
+    if np is None:
+        print("[WARNING] NumPy is not installed. Skipping the block generator benchmark.")
+    else:
+        start_time = time.perf_counter()
+        for _ in generate_combination_blocks(0, total_combinations):
+            pass
+        results[f'NumPy blocks of {COMBINATION_BLOCK_SIZE} (index arrays)'] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for _, digits in generate_combination_blocks(0, total_combinations):
+            decode_combination_block(digits)
+        results[f'NumPy blocks of {COMBINATION_BLOCK_SIZE} (decoded to strings)'] = time.perf_counter() - start_time
+
+    print()
+    for name, elapsed in results.items():
+        print(f"  {name}: {elapsed:.3f}s ({total_combinations / elapsed:,.0f} combinations/s)")
+    return results
+
+def _benchmark_result(items, seconds, unit, **extra):
+    """One benchmark measurement: item count, seconds and the rate, plus any extra fields."""
+    result = {'items': items, 'seconds': seconds, 'unit': unit, 'per_second': items / seconds if seconds > 0 else None}
+    result.update(extra)
+    return result
+
+@contextlib.contextmanager
+def _quiet_benchmark_output():
+    """Discards the script's own output (one line per typed entry) while a benchmark runs."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def _git_commit_of_script():
+    """The git commit the script is checked out at, if it is in a git repository (else None)."""
+    import subprocess # Only the benchmarks need it; kept out of the startup path
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, timeout=5, check=True).stdout.strip() or None
+    except Exception:
+        return None
+
+def _write_benchmark_list(list_path, size_bytes):
+    """Writes a custom list of about size_bytes bytes of distinct 'entryNNNNNNNNNN' lines. Returns the line count."""
+    lines_per_block = 65536
+    line_count = 0
+    written = 0
+    with open(list_path, 'w', encoding='utf-8') as f:
+        while written < size_bytes:
+            block = ''.join(f"entry{line_count + i:010d}\n" for i in range(lines_per_block))
+            f.write(block)
+            written += len(block)
+            line_count += lines_per_block
+    return line_count
+
+def benchmark_generator_resume(combinations, resume_combination):
+    """Times generate_all_combinations from the start and resumed at resume_combination."""
+    results = {}
+    with _quiet_benchmark_output():
+        start_time = time.perf_counter()
+        for _ in itertools.islice(generate_all_combinations(), combinations):
+            pass
+        results['generator_fresh'] = _benchmark_result(combinations, time.perf_counter() - start_time, 'combinations')
+
+        start_time = time.perf_counter()
+        generator = generate_all_combinations(start_combination=resume_combination)
+        next(generator)
+        time_to_first = time.perf_counter() - start_time
+        for _ in itertools.islice(generator, combinations - 1):
+            pass
+        results['generator_deep_resume'] = _benchmark_result(combinations, time.perf_counter() - start_time, 'combinations',
+                                                             resume_from=resume_combination, time_to_first_seconds=time_to_first)
+    return results
+
+def benchmark_custom_list(list_path, name):
+    """Times streaming a custom list from the start, and resuming it half way (byte offset seek)."""
+    file_size = os.path.getsize(list_path)
+    start_time = time.perf_counter()
+    lines = 0
+    middle_offset = middle_line = 0
+    for _, line_number, next_offset in iter_custom_list_entries(list_path):
+        lines += 1
+        if not middle_offset and next_offset >= file_size // 2:
+            middle_offset, middle_line = next_offset, line_number
+    elapsed = time.perf_counter() - start_time
+    results = {name: _benchmark_result(lines, elapsed, 'lines', file_bytes=file_size, megabytes_per_second=file_size / elapsed / 1e6 if elapsed > 0 else None)}
+
+    start_time = time.perf_counter()
+    next(iter_custom_list_entries(list_path, middle_offset, middle_line), None)
+    results[name + '_resume'] = {'seconds': time.perf_counter() - start_time, 'resume_offset': middle_offset, 'unit': 'time to first line'}
+    return results
+
+def benchmark_checkpoints(directory, writes):
+    """Times save_progress (atomic rewrite + fsync) and a synchronous journal checkpoint, per call."""
+    progress_path = os.path.join(directory, 'benchmark_progress.txt')
+    start_time = time.perf_counter()
+    for index in range(writes):
+        save_progress(progress_path, 'abcdefgh', index)
+    results = {'save_progress': _benchmark_result(writes, time.perf_counter() - start_time, 'saves')}
+
+    checkpointer = ProgressCheckpointer(progress_path, lambda position: save_progress(progress_path, position['combination'], position['index']),
+                                        every_items=1, every_seconds=0, background=False)
+    start_time = time.perf_counter()
+    for index in range(writes):
+        checkpointer.record({'combination': 'abcdefgh', 'index': index}, 1)
+    results['journal_checkpoint'] = _benchmark_result(writes, time.perf_counter() - start_time, 'checkpoints',
+                                                      compact_every=JOURNAL_COMPACT_INTERVAL)
+    checkpointer.close()
+    return results
+
+def benchmark_automation_loop(directory, combinations, list_path, list_lines):
+    """
+    Times run_automation_loop end to end (generation, printing to /dev/null, typing, checkpoints)
+    for each typing method against the 'null' backend, so only the script's own cost is measured.
+    """
+    results = {}
+    settings['progress_file_path'] = os.path.join(directory, 'benchmark_loop_progress.txt')
+    settings['progress_file_for_custom_list_path'] = os.path.join(directory, 'benchmark_loop_list_progress.txt')
+    runs = [('combinations', method, False) for method in ('pyautogui_write', 'pyperclip_safe', 'pyperclip_batch')]
+    runs.append(('custom_list', 'pyperclip_safe', True))
+    for mode, typing_method, process_custom_list in runs:
+        for path in (settings['progress_file_path'], settings['progress_file_for_custom_list_path']):
+            clear_progress_journal(path)
+            if os.path.exists(path):
+                os.remove(path)
+        settings['typing_method'] = typing_method
+        backend = NullBackend()
+        set_output_backend(backend)
+        start_time = time.perf_counter()
+        with _quiet_benchmark_output():
+            run_automation_loop(False, process_custom_list=process_custom_list, custom_list_path=list_path,
+                                repetitions=0 if process_custom_list else combinations)
+        elapsed = time.perf_counter() - start_time
+        results[f'automation_loop_{mode}_{typing_method}'] = _benchmark_result(list_lines if process_custom_list else combinations, elapsed, 'entries',
+                                                                              backend_actions=sum(backend.action_counts.values()))
+    set_output_backend(None)
+    return results
+
+def benchmark_startup(runs=5):
+    """
+    Times how long a fresh interpreter takes to import the script with no display available
+    (DISPLAY unset), and checks that no GUI, input or optional heavy library was imported.
+    """
+    import subprocess
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    environment = {key: value for key, value in os.environ.items() if key not in ('DISPLAY', 'WAYLAND_DISPLAY')}
+    probe = ("import time; start = time.perf_counter(); import Booty, sys; elapsed = time.perf_counter() - start; "
+             "print(elapsed, ','.join(name for name in ('pyautogui', 'pynput', 'keyboard', 'pyperclip', 'numpy', 'zstandard') if name in sys.modules))")
+    import_times, process_times = [], []
+    loaded_modules = ''
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', probe], cwd=script_dir, env=environment, capture_output=True, text=True, timeout=60)
+        process_times.append(time.perf_counter() - start_time)
+        if completed.returncode != 0:
+            print(f"[ERROR] Startup benchmark failed: {completed.stderr.strip()}")
+            return {}
+        import_time, _, loaded_modules = completed.stdout.strip().partition(' ')
+        import_times.append(float(import_time))
+    return {
+        'startup_import': {'seconds': statistics.median(import_times), 'unit': 'module import (median)', 'heavy_modules_loaded': loaded_modules.split(',') if loaded_modules else []},
+        'startup_process': {'seconds': statistics.median(process_times), 'unit': 'interpreter start + import (median)'},
+    }
+
+def run_benchmark_suite(output_path=None, combinations=200000, large_list_megabytes=256, save_progress_writes=200):
+    """
+    Runs the headless benchmark suite (no display or real input needed) with fixed settings and
+    writes the results as JSON to output_path, so runs can be compared across commits and hosts:
+    headless startup time, generator throughput (fresh and deep resume, plus the NumPy block generator), custom list
+    streaming (small and large_list_megabytes files), checkpoint costs and end-to-end
+    run_automation_loop throughput per typing method against the 'null' backend.
+    Returns the results dictionary.
+    """
+    saved_settings = dict(settings)
+    STOP_EVENT.clear()
+    settings.update({
+        'chars': string.ascii_lowercase + string.digits, 'mask': '', 'min_combination_length': 1, 'max_combination_length': 0,
+        'initial_delay_before_automation': 0, 'delay_between_repetitions': 0, 'target_items_per_second': 0.0,
+        'adaptive_delay_enabled': False, 'pyautogui_global_pause': 0.0, 'pyautogui_write_interval': 0.0,
+        'press_enter_to_exit_enabled': False, 'shutdown_on_completion': False,
+        'rate_limits': {}, 'metrics_summary_interval': 0, 'metrics_summary_path': '',
+    })
+    import tempfile
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix='booty_benchmark_') as directory:
+            print(f"\n--- Benchmark Suite ({combinations} combinations, {large_list_megabytes} MB list) ---")
+            print("[INFO] Startup (headless import)...")
+            results.update(benchmark_startup())
+            print("[INFO] Generator (fresh start and deep resume)...")
+            results.update(benchmark_generator_resume(combinations, 'mmmmmmmm'))
+            with _quiet_benchmark_output():
+                generator_results = benchmark_combination_generators(combinations)
+            for name, elapsed in generator_results.items():
+                results['combination_generators: ' + name] = _benchmark_result(combinations, elapsed, 'combinations')
+
+            print("[INFO] Custom lists...")
+            small_list_path = os.path.join(directory, 'small_list.txt')
+            small_list_lines = _write_benchmark_list(small_list_path, 1024 * 1024)
+            results.update(benchmark_custom_list(small_list_path, 'custom_list_small'))
+            large_list_path = os.path.join(directory, 'large_list.txt')
+            _write_benchmark_list(large_list_path, large_list_megabytes * 1024 * 1024)
+            results.update(benchmark_custom_list(large_list_path, 'custom_list_large'))
+            os.remove(large_list_path)
+
+            print("[INFO] Checkpoints...")
+            results.update(benchmark_checkpoints(directory, save_progress_writes))
+
+            print("[INFO] End-to-end automation loop ('null' backend)...")
+            results.update(benchmark_automation_loop(directory, combinations, small_list_path, small_list_lines))
+    finally:
+        settings.clear()
+        settings.update(saved_settings)
+        set_output_backend(None)
+
+    print()
+    for name, result in results.items():
+        if result.get('heavy_modules_loaded'):
+            print(f"[WARNING] Importing the script loaded {', '.join(result['heavy_modules_loaded'])}; startup is no longer lazy.")
+        if result.get('per_second') is not None:
+            print(f"  {name}: {result['per_second']:,.0f} {result['unit']}/s ({result['seconds']:.3f}s)")
+        else:
+            print(f"  {name}: {result['seconds'] * 1000:.2f} ms ({result['unit']})")
+
+    report = {
+        'version': BENCHMARK_RESULTS_VERSION,
+        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit_of_script(),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__ if np is not None else None,
+        'parameters': {'combinations': combinations, 'large_list_megabytes': large_list_megabytes, 'save_progress_writes': save_progress_writes},
+        'results': results,
+    }
+    if output_path:
+        try:
+            atomic_write_text(output_path, json.dumps(report, indent=4))
+            print(f"\n[INFO] Benchmark results saved to '{output_path}'.")
+        except Exception as e:
+            print(f"[ERROR] Could not write benchmark results to '{output_path}': {e}")
+    return report
+
 # --- Entry Point ---
+def parse_command_line_args(argv=None):
+    """Parses the command line options."""
+    parser = argparse.ArgumentParser(description="Python Combination Generator & Automation Script")
+    parser.add_argument('--shard', metavar='K/N',
+                        help="Only work on shard K of N of the combination keyspace, with its own progress file (e.g. 3/16).")
+    parser.add_argument('--shard-status', metavar='N', type=int,
+                        help="Report the progress of all N shards and the total keyspace coverage, then exit.")
+    parser.add_argument('--index-list', metavar='PATH',
+                        help="Build the sidecar line index (PATH.idx) for a custom list file, then exit.")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Run the headless benchmark suite (generators, custom lists, checkpoints, automation loop) and exit.")
+    parser.add_argument('--benchmark-output', metavar='PATH', default='benchmark_results.json',
+                        help="JSON file for the --benchmark results (default: benchmark_results.json).")
+    parser.add_argument('--benchmark-combinations', metavar='N', type=int, default=200000,
+                        help="Combinations per generator and automation loop benchmark (default: 200000).")
+    parser.add_argument('--benchmark-list-mb', metavar='MB', type=int, default=256,
+                        help="Size of the large custom list benchmark file in MB, e.g. 4096 for a multi-GB list (default: 256).")
+    parser.add_argument('--record-macro', metavar='PATH',
+                        help="Record a macro (mouse moves, clicks, drags, scrolls, keys) to PATH until the stop hotkey is pressed, then exit.")
+    parser.add_argument('--replay-macro', metavar='PATH',
+                        help="Replay a recorded macro file, then exit.")
+    parser.add_argument('--replay-speed', metavar='X', type=float,
+                        help="Replay speed for --replay-macro: 1 = as recorded, N = N times faster, 0 = as fast as possible.")
+    parser.add_argument('--simplify', metavar='PIXELS', type=float,
+                        help="Simplify recorded mouse paths for --replay-macro to within PIXELS (Ramer-Douglas-Peucker).")
+    job_group = parser.add_argument_group("headless runs", "Run without menus or prompts. Options override the values in --job. "
+                                          "Exit codes: 0 completed, 1 failed, 2 invalid job, 3 stopped (progress saved).")
+    job_group.add_argument('--job', metavar='PATH',
+                           help="Run the job described in a JSON (or YAML) job file, then exit.")
+    job_group.add_argument('--run', choices=JOB_MODES,
+                           help="Run this mode without menus, then exit.")
+    job_group.add_argument('--macro-clicks', action='store_true',
+                           help="Perform the macro clicks (or macro click schedule) during a combinations or custom_list run.")
+    job_group.add_argument('--list', metavar='PATH',
+                           help="Custom list file for the custom_list mode.")
+    job_group.add_argument('--repetitions', metavar='N', type=int,
+                           help="Entries (combinations), passes (custom_list) or rounds (macro_only) to run; 0 = infinite.")
+    job_group.add_argument('--backend', choices=OUTPUT_BACKEND_NAMES,
+                           help="Output backend for the run (overrides the 'output_backend' setting).")
+    job_group.add_argument('--rate', metavar='ITEMS_PER_SECOND', type=float,
+                           help="Target typing rate (sets 'target_items_per_second').")
+    job_group.add_argument('--delay', metavar='SECONDS', type=float,
+                           help="Delay between entries or rounds (sets 'delay_between_repetitions').")
+    job_group.add_argument('--initial-delay', metavar='SECONDS', type=float,
+                           help="Delay before the run starts (sets 'initial_delay_before_automation').")
+    job_group.add_argument('--plan', action='store_true',
+                           help="Print the keyspace size, remaining work and projected duration of the run (default: combinations), then exit without running.")
+    job_group.add_argument('--set', metavar='KEY=VALUE', action='append',
+                           help="Override any setting for this run only, e.g. --set chars=abc123 --set max_combination_length=6. Repeatable.")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_command_line_args()
     # Load settings at the very beginning
     settings = load_settings(DEFAULT_SETTINGS_FILE)
+    if not (args.job or args.run or args.plan):
+        run_options = [option for option, value in (('--macro-clicks', args.macro_clicks), ('--list', args.list), ('--repetitions', args.repetitions),
+                                                    ('--backend', args.backend), ('--rate', args.rate), ('--delay', args.delay),
+                                                    ('--initial-delay', args.initial_delay)) if value not in (None, False)]
+        if run_options:
+            print(f"[ERROR] Option(s) {', '.join(run_options)} only apply to a headless run. Add --run MODE, --job PATH or --plan.")
+            sys.exit(EXIT_USAGE)
+        if args.set:
+            if not (args.shard_status is not None or args.index_list or args.benchmark or args.record_macro or args.replay_macro):
+                # The menus save the settings file, which would make the overrides permanent
+                print("[ERROR] --set only applies to a headless run (--run, --job or --plan) or a command that exits, such as --shard-status. Change settings in the menus instead.")
+                sys.exit(EXIT_USAGE)
+            try:
+                settings.update(parse_setting_overrides(args.set)) # In memory only; the settings file is not changed
+            except ValueError as e:
+                print(f"[ERROR] {e}")
+                sys.exit(EXIT_USAGE)
+    if args.shard_status is not None:
+        if args.shard_status < 1:
+            print("[ERROR] The number of shards must be at least 1.")
+            sys.exit(2)
+        sys.exit(0 if show_shard_status(args.shard_status) else 1)
+    if args.index_list:
+        if not os.path.isfile(args.index_list):
+            print(f"[ERROR] File not found at '{args.index_list}'.")
+            sys.exit(2)
+        build_custom_list_index(args.index_list)
+        sys.exit(0)
+    if args.benchmark:
+        run_benchmark_suite(args.benchmark_output, combinations=args.benchmark_combinations, large_list_megabytes=args.benchmark_list_mb)
+        sys.exit(0)
+    if args.record_macro:
+        register_stop_hotkey()
+        sys.exit(0 if record_macro_to_file(args.record_macro) else 1)
+    if args.replay_macro:
+        register_stop_hotkey()
+        sys.exit(0 if replay_macro_file(args.replay_macro, speed=args.replay_speed, simplify_tolerance=args.simplify) else 1)
+    if args.job or args.run or args.plan:
+        if args.plan and not (args.job or args.run):
+            args.run = 'combinations'
+        try:
+            job = build_job(args)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(EXIT_USAGE)
+        if args.plan:
+            if job['mode'] == 'macro_only':
+                print("[ERROR] A 'macro_only' run types nothing, so there is no keyspace or list to plan.")
+                sys.exit(EXIT_USAGE)
+            apply_job_settings(job)
+            try:
+                if job['mode'] == 'custom_list':
+                    progress = load_custom_list_progress(job['custom_list']) or {'byte_offset': 0, 'line_number': 0}
+                    print_run_plan(plan_custom_list_run(job['custom_list'], progress['byte_offset'], progress['line_number']))
+                else:
+                    print_run_plan(plan_combination_run(job['shard'], job['repetitions']))
+            except (ValueError, OSError) as e:
+                print(f"[ERROR] Could not plan the run: {e}")
+                sys.exit(EXIT_USAGE)
+            sys.exit(EXIT_COMPLETED)
+        sys.exit(run_job(job))
+    if args.shard:
+        try:
+            ACTIVE_SHARD = parse_shard_spec(args.shard)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(2)
+        print(f"[INFO] Working on shard {ACTIVE_SHARD[0]}/{ACTIVE_SHARD[1]}. Progress file: '{get_combination_progress_file_path(ACTIVE_SHARD)}'.")
     # Ensure progress files are initialized on startup if they don't exist
     initialize_custom_list_progress_file()
     # Call the main menu function to start the application
@@ -0,0 +1,50 @@
+import itertools
+
+import pytest
+
+import Booty
+
+RULES = [
+    {'class_limits': {'digit': {'min': 1}}},
+    {'class_limits': {'lower': {'max': 1}, 'upper': {'min': 1}}},
+    {'max_repeat': 1},
+    {'class_limits': {'digit': {'min': 2, 'max': 2}}, 'max_repeat': 2, 'exclude_regex': 'A$'},
+]
+POSITION_SETS = [['ab1A'] * 4, ['a1', 'bA', 'ab1A', '1']]
+
+
+def brute_force(candidate_filter, position_sets, start_rank=0, end_rank=None):
+    combinations = [''.join(combo) for combo in itertools.product(*position_sets)]
+    ranked = list(enumerate(combinations))[start_rank:end_rank]
+    return [(rank, combination) for rank, combination in ranked if candidate_filter.accepts(combination)], len(ranked)
+
+
+@pytest.mark.parametrize('rules', RULES)
+@pytest.mark.parametrize('position_sets', POSITION_SETS)
+def test_pruning_matches_brute_force(rules, position_sets):
+    expected, checked = brute_force(Booty.CandidateFilter(**rules), position_sets)
+    candidate_filter = Booty.CandidateFilter(**rules)
+    assert candidate_filter.can_prune
+    assert list(candidate_filter.iter_product(position_sets)) == expected
+    assert candidate_filter.passed == len(expected)
+    assert candidate_filter.rejected == checked - len(expected) # Pruned subtrees count every skipped combination
+
+
+@pytest.mark.parametrize('start_rank, end_rank', [(0, 1), (5, 17), (17, 5), (100, None), (255, 256), (0, 10 ** 6)])
+def test_pruning_within_a_rank_range(start_rank, end_rank):
+    rules = RULES[0]
+    position_sets = POSITION_SETS[0]
+    expected, checked = brute_force(Booty.CandidateFilter(**rules), position_sets, start_rank, end_rank)
+    candidate_filter = Booty.CandidateFilter(**rules)
+    assert list(candidate_filter.iter_product(position_sets, start_rank, end_rank)) == expected
+    assert candidate_filter.passed + candidate_filter.rejected == checked
+
+
+def test_stop_request_ends_the_walk():
+    candidate_filter = Booty.CandidateFilter(regex='^$', class_limits={'digit': {'min': 1}}) # Rejects everything
+    Booty.request_stop()
+    try:
+        assert list(candidate_filter.iter_product(['abc1'] * 12)) == []
+        assert candidate_filter.passed + candidate_filter.rejected < 4 ** 12
+    finally:
+        Booty.clear_stop_request()
@@ -0,0 +1,51 @@
+import itertools
+import string
+
+import pytest
+
+import Booty
+
+
+def all_combinations(chars_set, min_len, max_len):
+    """The generator's order, built the slow way: every length, then itertools.product."""
+    for length in range(min_len, max_len + 1):
+        for combo in itertools.product(*Booty._position_charsets(chars_set, length)):
+            yield ''.join(combo)
+
+
+@pytest.mark.parametrize('chars_set, min_len, max_len', [
+    ('abc', 1, 4),
+    ('01', 3, 6),
+    (['ab', '0123', 'xyz'], 1, 3), # A mask: one character set per position
+])
+def test_rank_and_unrank_match_generation_order(chars_set, min_len, max_len):
+    for index, combination in enumerate(all_combinations(chars_set, min_len, max_len)):
+        assert Booty.combination_to_index(combination, chars_set, min_len) == index
+        assert Booty.index_to_combination(index, chars_set, min_len) == combination
+
+
+def test_rank_of_combination_outside_the_space():
+    assert Booty.combination_to_index('abd', 'abc', 1) is None # Character not in the set
+    assert Booty.combination_to_index('a', 'abc', 2) is None # Shorter than the minimum length
+    assert Booty.combination_to_index('a0xy', ['ab', '0123', 'xyz'], 1) is None # Longer than the mask
+
+
+def test_unrank_rejects_invalid_indexes():
+    with pytest.raises(ValueError):
+        Booty.index_to_combination(-1, 'abc', 1)
+    with pytest.raises(ValueError):
+        Booty.index_to_combination(2 + 2 * 4 + 2 * 4 * 3, ['ab', '0123', 'xyz'], 1) # One past the last combination
+
+
+def test_rank_and_unrank_huge_index():
+    chars_set = string.ascii_letters + string.digits
+    combination = 'Zz9' * 20
+    index = Booty.combination_to_index(combination, chars_set, 1)
+    assert Booty.index_to_combination(index, chars_set, 1) == combination
+
+
+@pytest.mark.parametrize('chars_set, length', [('abc', 1), ('abc', 3), (['ab', '0123', 'xyz'], 3)])
+def test_combinations_from_every_start(chars_set, length):
+    expected = list(all_combinations(chars_set, length, length))
+    for position, start in enumerate(expected):
+        assert list(Booty._combinations_from(chars_set, start)) == expected[position:]
@@ -0,0 +1,51 @@
+import math
+
+import Booty
+
+
+def moves(points, start_time=0.0):
+    return [(start_time + i * 0.01, 'move', x, y) for i, (x, y) in enumerate(points)]
+
+
+def distance_to_segment(point, start, end):
+    (px, py), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if not dx and not dy:
+        return math.hypot(px - x1, py - y1)
+    t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+def test_straight_line_keeps_only_its_ends():
+    events = moves([(i, 2 * i) for i in range(50)])
+    assert Booty.simplify_macro_moves(events, 1.0) == [events[0], events[-1]]
+
+
+def test_zero_tolerance_keeps_everything():
+    events = moves([(i, 2 * i) for i in range(10)])
+    assert Booty.simplify_macro_moves(events, 0) == events
+
+
+def test_corners_above_the_tolerance_are_kept():
+    events = moves([(0, 0), (5, 0), (10, 0), (10, 5), (10, 10)])
+    assert Booty.simplify_macro_moves(events, 1.0) == [events[0], events[2], events[4]]
+
+
+def test_dropped_points_stay_within_the_tolerance():
+    tolerance = 2.0
+    events = moves([(i, 20 * math.sin(i / 7.0)) for i in range(200)])
+    kept = Booty.simplify_macro_moves(events, tolerance)
+    assert len(kept) < len(events)
+    kept_positions = [events.index(event) for event in kept]
+    for first, last in zip(kept_positions, kept_positions[1:]):
+        for event in events[first + 1:last]:
+            assert distance_to_segment(event[2:], events[first][2:], events[last][2:]) <= tolerance
+
+
+def test_other_events_are_untouched_and_split_the_moves():
+    first_drag = moves([(i, 0) for i in range(10)])
+    second_drag = moves([(9, i) for i in range(10)], start_time=1.0)
+    press, release = (0.5, 'down', 9, 0, 'left'), (2.0, 'up', 9, 9, 'left')
+    key = (2.1, 'key_down', 'a')
+    simplified = Booty.simplify_macro_moves(first_drag + [press] + second_drag + [release, key], 0.5)
+    assert simplified == [first_drag[0], first_drag[-1], press, second_drag[0], second_drag[-1], release, key]
@@ -0,0 +1,56 @@
+import json
+
+import Booty
+
+
+def write_journal(progress_path, text):
+    with open(Booty.get_progress_journal_path(str(progress_path)), 'w') as f:
+        f.write(text)
+
+
+def test_no_journal(tmp_path):
+    assert Booty.read_progress_journal(str(tmp_path / 'progress.txt')) is None
+
+
+def test_newest_journal_record_wins(tmp_path):
+    progress_path = tmp_path / 'progress.txt'
+    write_journal(progress_path, json.dumps({'combination': 'ab', 'index': 5}) + '\n' + json.dumps({'combination': 'ac', 'index': 6}) + '\n')
+    assert Booty.read_progress_journal(str(progress_path)) == {'combination': 'ac', 'index': 6}
+
+
+def test_torn_last_journal_line_is_skipped(tmp_path):
+    progress_path = tmp_path / 'progress.txt'
+    write_journal(progress_path, json.dumps({'combination': 'ab', 'index': 5}) + '\n{"combination": "ac", "ind')
+    assert Booty.read_progress_journal(str(progress_path)) == {'combination': 'ab', 'index': 5}
+
+
+def test_journal_with_only_a_torn_line(tmp_path):
+    progress_path = tmp_path / 'progress.txt'
+    write_journal(progress_path, '{"combin')
+    assert Booty.read_progress_journal(str(progress_path)) is None
+
+
+def test_progress_record_from_the_progress_file(tmp_path):
+    progress_path = tmp_path / 'progress.txt'
+    progress_path.write_text('abc\n42\n')
+    assert Booty.read_progress_record(str(progress_path)) == ('abc', '42')
+
+
+def test_newer_journal_record_is_used(tmp_path):
+    progress_path = tmp_path / 'progress.txt'
+    progress_path.write_text('abc\n42\n')
+    assert Booty.read_progress_record(str(progress_path), {'combination': 'abd', 'index': 43}) == ('abd', '43')
+
+
+def test_stale_journal_record_is_ignored(tmp_path):
+    # A crash right after the progress file was rewritten leaves a journal record at or before it
+    progress_path = tmp_path / 'progress.txt'
+    progress_path.write_text('abc\n42\n')
+    assert Booty.read_progress_record(str(progress_path), {'combination': 'abb', 'index': 41}) == ('abc', '42')
+    assert Booty.read_progress_record(str(progress_path), {'combination': 'abc', 'index': 42}) == ('abc', '42')
+
+
+def test_journal_record_without_a_progress_file(tmp_path):
+    progress_path = tmp_path / 'progress.txt'
+    assert Booty.read_progress_record(str(progress_path), {'combination': 'abd', 'index': 43}) == ('abd', '43')
+    assert Booty.read_progress_record(str(progress_path), {'combination': 'abd'}) == ('abd', '')
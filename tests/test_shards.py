@@ -0,0 +1,18 @@
+import pytest
+
+import Booty
+
+
+@pytest.mark.parametrize('keyspace_size, shard_count', [(0, 1), (1, 3), (10, 3), (97, 16), (16, 16), (10 ** 30 + 7, 7)])
+def test_shards_are_disjoint_and_cover_the_keyspace(keyspace_size, shard_count):
+    ranges = [Booty.get_shard_range(shard_number, shard_count, keyspace_size) for shard_number in range(1, shard_count + 1)]
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == keyspace_size
+    for (_, end_index), (next_start, _) in zip(ranges, ranges[1:]):
+        assert end_index == next_start
+    sizes = [end_index - start_index for start_index, end_index in ranges]
+    assert max(sizes) - min(sizes) <= 1 # As even as possible
+
+
+def test_single_shard_is_the_whole_keyspace():
+    assert Booty.get_shard_range(1, 1, 12345) == (0, 12345)